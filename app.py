@@ -1,75 +1,259 @@
 # -*- coding: utf-8 -*-
 import os
+import argparse
 import logging
-import nltk
-from nltk.sentiment import SentimentIntensityAnalyzer
-from typing import Dict, Tuple, Optional
+import numpy as np
+from typing import Dict, Iterable, List, Tuple, Optional
 import re
 from responses.response_generator import ResponseGenerator
-
-# Download required NLTK data
-nltk.download('vader_lexicon', quiet=True)
+from models.lexicon import create_sentiment_analyzer, load_vader_snapshot
+from models.rule_matcher import RuleMatcher
+from models.vader_batch import BatchVaderScorer
+from utils.emotion_cache import EmotionCache
+from config import EMOTION_CACHE_ENABLED
 
 class EmotionAnalyzer:
-    def __init__(self):
-        self.sia = SentimentIntensityAnalyzer()
+    def __init__(self, cache: Optional[EmotionCache] = None):
+        # VADER is loaded on first use from the offline lexicon snapshot
+        self._vader = None
+        self._sia = None
+        self._batch_scorer = None
         self.response_generator = ResponseGenerator()
         
+        # Results of repeated messages are served from the cache when enabled
+        if cache is None and EMOTION_CACHE_ENABLED:
+            cache = EmotionCache()
+        self.cache = cache
+        
         # Initialize patterns
         self._initialize_patterns()
+
+    @property
+    def vader(self) -> Dict:
+        """Parsed VADER lexicon and constants, loaded without network access."""
+        if self._vader is None:
+            self._vader = load_vader_snapshot()
+        return self._vader
+
+    @property
+    def sia(self):
+        """nltk's VADER analyzer, for callers that need the full polarity scores."""
+        if self._sia is None:
+            self._sia = create_sentiment_analyzer(self.vader['lexicon'].to_dict())
+        return self._sia
+
+    @property
+    def batch_scorer(self) -> BatchVaderScorer:
+        """Vectorized VADER scorer; gives the same scores as sia."""
+        if self._batch_scorer is None:
+            self._batch_scorer = BatchVaderScorer(self.vader['lexicon'], self.vader['constants'])
+        return self._batch_scorer
         
     def _initialize_patterns(self):
         """Initialize patterns for rule-based analysis."""
+        greeting_rules = {
+            'neutral': r'(hi|hello|hey)',
+            'excited': r'(hi+|hello+|hey+)!*'
+        }
+        curious_rule = r'(why|what|how|when|where|who)\??'
+        rhetorical_words = ['really', 'seriously', 'right']
+        strong_emotion_words = {
+            'angry': ['hate', 'angry', 'mad', 'furious'],
+            'happy': ['love', 'happy', 'joy', 'wonderful'],
+            'sad': ['sad', 'depressed', 'miserable']
+        }
+        
         self.greeting_patterns = {
-            'neutral': re.compile(r'^(hi|hello|hey)$', re.IGNORECASE),
-            'excited': re.compile(r'^(hi+|hello+|hey+)!*$', re.IGNORECASE)
+            emotion: re.compile(rf'^{rule}$', re.IGNORECASE)
+            for emotion, rule in greeting_rules.items()
         }
         
         self.question_patterns = {
-            'curious': re.compile(r'^(why|what|how|when|where|who)\??$', re.IGNORECASE),
+            'curious': re.compile(rf'^{curious_rule}$', re.IGNORECASE),
             'confused': re.compile(r'\?{2,}'),
-            'rhetorical': re.compile(r'(really\?|seriously\?|right\?)', re.IGNORECASE)
+            'rhetorical': re.compile(
+                '(' + '|'.join(rf'{word}\?' for word in rhetorical_words) + ')',
+                re.IGNORECASE
+            )
         }
         
         self.strong_emotion_patterns = {
-            'angry': re.compile(r'\b(hate|angry|mad|furious)\b', re.IGNORECASE),
-            'happy': re.compile(r'\b(love|happy|joy|wonderful)\b', re.IGNORECASE),
-            'sad': re.compile(r'\b(sad|depressed|miserable)\b', re.IGNORECASE)
+            emotion: re.compile(r'\b(' + '|'.join(words) + r')\b', re.IGNORECASE)
+            for emotion, words in strong_emotion_words.items()
         }
+        
+        # All of the above in one matcher that scans each message once,
+        # resolving hits in the same greeting > question > strong emotion order
+        self.rule_matcher = RuleMatcher(
+            message_rules=list(greeting_rules.items()) + [('curious', curious_rule)],
+            confused_emotion='confused',
+            rhetorical_emotion='rhetorical',
+            rhetorical_words=rhetorical_words,
+            keyword_rules=list(strong_emotion_words.items())
+        )
 
     def determine_emotion(self, text: str) -> str:
         """Determine emotion using pattern matching and VADER."""
-        # Check greetings
-        for emotion, pattern in self.greeting_patterns.items():
-            if pattern.match(text):
-                return emotion
-                
-        # Check questions
-        for emotion, pattern in self.question_patterns.items():
-            if pattern.search(text):
-                return emotion
-                
-        # Check strong emotions
-        for emotion, pattern in self.strong_emotion_patterns.items():
-            if pattern.search(text):
-                return emotion
+        if self.cache is None:
+            return self._determine_emotion(text)
+        
+        emotion = self.cache.get('emotion', text)
+        if emotion is None:
+            emotion = self._determine_emotion(text)
+            self.cache.put('emotion', text, emotion)
+        return emotion
+
+    def _determine_emotion(self, text: str) -> str:
+        emotion = self.rule_matcher.match(text)
+        if emotion is not None:
+            return emotion
         
         # Use VADER for general sentiment
-        sentiment = self.sia.polarity_scores(text)
+        compound = float(self.batch_scorer.compound_scores([text])[0])
         
         # Map sentiment to emotions
-        if sentiment['compound'] >= 0.5:
+        return self._emotion_from_compound(compound)
+
+    def determine_emotions(self, texts: Iterable[str]) -> List[str]:
+        """Determine emotions for a batch of texts.
+        
+        Returns the same labels as calling determine_emotion on every text,
+        but scores all texts that fall through to VADER in one vectorized pass.
+        """
+        return self._cached('emotion', list(texts), self._determine_emotions)
+
+    def _determine_emotions(self, texts: List[str]) -> List[str]:
+        emotions = [self.rule_matcher.match(text) for text in texts]
+        
+        # Score everything the rules did not decide in one batch
+        pending = [i for i, emotion in enumerate(emotions) if emotion is None]
+        if pending:
+            compound = self.batch_scorer.compound_scores(texts[i] for i in pending)
+            labels = np.select(
+                [compound >= 0.5, compound <= -0.5, np.abs(compound) <= 0.1, compound > 0.1],
+                ['happy', 'sad', 'neutral', 'positive'],
+                default='negative'
+            )
+            for i, label in zip(pending, labels.tolist()):
+                emotions[i] = label
+
+        return emotions
+
+    def polarity_scores(self, text: str) -> Dict[str, float]:
+        """VADER's neg/neu/pos/compound scores for text."""
+        return dict(self._cached('scores', [text], self.batch_scorer.polarity_scores)[0])
+
+    def analyze_batch(self, texts: Iterable[str]) -> List[Tuple[str, Dict[str, float]]]:
+        """Determine the emotion and the full VADER scores of every text."""
+        texts = list(texts)
+        scores = self._cached('scores', texts, self.batch_scorer.polarity_scores)
+        score_of = dict(zip(texts, scores))
+        emotions = self._cached('emotion', texts, lambda pending: [
+            self.rule_matcher.match(text) or self._emotion_from_compound(score_of[text]['compound'])
+            for text in pending
+        ])
+        return [(emotion, dict(score)) for emotion, score in zip(emotions, scores)]
+
+    def _cached(self, namespace: str, texts: List[str], compute) -> List:
+        """Serve texts from the cache, computing the misses in one batch."""
+        if self.cache is None:
+            return compute(texts)
+        
+        values = [self.cache.get(namespace, text) for text in texts]
+        missing = [i for i, value in enumerate(values) if value is None]
+        if missing:
+            for i, value in zip(missing, compute([texts[i] for i in missing])):
+                values[i] = value
+                self.cache.put(namespace, texts[i], value)
+        return values
+
+    @staticmethod
+    def _emotion_from_compound(compound: float) -> str:
+        """Map a VADER compound score to an emotion."""
+        if compound >= 0.5:
             return 'happy'
-        elif sentiment['compound'] <= -0.5:
+        elif compound <= -0.5:
             return 'sad'
-        elif -0.1 <= sentiment['compound'] <= 0.1:
+        elif -0.1 <= compound <= 0.1:
             return 'neutral'
-        elif sentiment['compound'] > 0.1:
+        elif compound > 0.1:
             return 'positive'
         else:
             return 'negative'
 
-def main():
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments; without a command the chat REPL starts."""
+    parser = argparse.ArgumentParser(description="Emotion Analyzer")
+    subparsers = parser.add_subparsers(dest='command')
+    
+    file_parser = subparsers.add_parser(
+        'analyze-file',
+        help="Label every message of a JSONL or CSV file"
+    )
+    file_parser.add_argument('input', help="JSONL or CSV file of messages")
+    file_parser.add_argument('-o', '--output', default='-', help="Output file (default: stdout)")
+    file_parser.add_argument('--format', choices=['jsonl', 'csv'], help="Input format (default: from extension)")
+    file_parser.add_argument('--text-field', default='text', help="Field or column holding the message")
+    file_parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    file_parser.add_argument('--chunk-size', type=int, default=1000, help="Messages per work unit")
+    file_parser.add_argument('--unordered', action='store_true', help="Write results as soon as they are ready")
+    
+    stream_parser = subparsers.add_parser(
+        'analyze-stream',
+        help="Analyze messages read line by line from stdin, writing JSONL results"
+    )
+    stream_parser.add_argument('--chunk-size', type=int, default=None, help="Messages per micro-batch")
+    stream_parser.add_argument('--no-response', action='store_true', help="Skip generating responses")
+    
+    server_parser = subparsers.add_parser(
+        'serve-semantic',
+        help="Hold the SemanticAnalyzer models and serve them to worker processes"
+    )
+    server_parser.add_argument('--socket', default=None, help="Unix socket path (default: SEMANTIC_SERVER_SOCKET)")
+    server_parser.add_argument('--backend', default=None, help="Inference backend (default: SEMANTIC_BACKEND)")
+    
+    head_parser = subparsers.add_parser(
+        'distill-emotion-head',
+        help="Fit the single-pass emotion head of SemanticAnalyzer to the zero-shot model"
+    )
+    head_parser.add_argument('input', help="Text file of sample messages, one per line")
+    head_parser.add_argument('-o', '--output', default=None,
+                             help="Head file to write (default: SEMANTIC_EMOTION_HEAD_PATH)")
+    head_parser.add_argument('--holdout', type=float, default=0.2, help="Share of messages kept out of the fit")
+    
+    memory_parser = subparsers.add_parser(
+        'migrate-memory',
+        help="Copy the turns of an emotional_memory.json file into the emotional memory store"
+    )
+    memory_parser.add_argument('input', nargs='?', default='emotional_memory.json', help="JSON memory file")
+    memory_parser.add_argument('-o', '--output', default=None, help="Store file (default: EMOTIONAL_MEMORY_PATH)")
+    memory_parser.add_argument('--session', default='default', help="Session the turns are filed under")
+    
+    export_parser = subparsers.add_parser(
+        'export-history',
+        help="Export the turns of the emotional memory store to day-partitioned columns for reports"
+    )
+    export_parser.add_argument('output', help="Directory of the columnar history")
+    export_parser.add_argument('--store', default=None, help="Store file (default: EMOTIONAL_MEMORY_PATH)")
+    export_parser.add_argument('--start', default=None, help="First day to export (YYYY-MM-DD)")
+    export_parser.add_argument('--end', default=None, help="Day to stop exporting at (YYYY-MM-DD)")
+    
+    http_parser = subparsers.add_parser(
+        'serve',
+        help="Serve the analyzer over HTTP (/analyze, /analyze_batch, /respond, /health)"
+    )
+    http_parser.add_argument('--host', default=None, help="Address to listen on (default: HTTP_HOST)")
+    http_parser.add_argument('--port', type=int, default=None, help="Port to listen on (default: HTTP_PORT)")
+    http_parser.add_argument('--workers', type=int, default=None, help="Analysis threads (default: HTTP_WORKERS)")
+    http_parser.add_argument('--semantic', choices=['none', 'local', 'server'], default='none',
+                             help="Semantic analysis for requests asking for it: none, a SemanticAnalyzer "
+                                  "of this process, or the shared model server (app.py serve-semantic)")
+    
+    return parser.parse_args(argv)
+
+def main(argv: Optional[List[str]] = None):
+    args = parse_args(argv)
+    
     # Configure logging
     logging.basicConfig(
         level=logging.INFO,
@@ -80,6 +264,115 @@ def main():
         ]
     )
     
+    if args.command == 'analyze-file':
+        from utils.file_analyzer import analyze_file
+        
+        analyze_file(
+            args.input,
+            output_path=args.output,
+            file_format=args.format,
+            text_field=args.text_field,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            ordered=not args.unordered
+        )
+        return
+    
+    if args.command == 'analyze-stream':
+        import json
+        import sys
+        from utils.stream_pipeline import analyze_stream
+        
+        options = {'respond': not args.no_response}
+        if args.chunk_size:
+            options['chunk_size'] = args.chunk_size
+        messages = (line.rstrip("\n") for line in sys.stdin)
+        for result in analyze_stream(messages, **options):
+            print(json.dumps(result._asdict(), ensure_ascii=False), flush=True)
+        return
+    
+    if args.command == 'serve-semantic':
+        from config import SEMANTIC_BACKEND, SEMANTIC_SERVER_SOCKET
+        from models.semantic_analyzer import SemanticAnalyzer
+        from utils.semantic_server import SemanticServer
+        
+        server = SemanticServer(
+            SemanticAnalyzer(backend=args.backend or SEMANTIC_BACKEND),
+            path=args.socket or SEMANTIC_SERVER_SOCKET
+        )
+        logging.info(f"Loading models and serving on {server.path}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+        return
+    
+    if args.command == 'distill-emotion-head':
+        from config import SEMANTIC_EMOTION_HEAD_PATH
+        from models.semantic_analyzer import SemanticAnalyzer
+        
+        output = args.output or SEMANTIC_EMOTION_HEAD_PATH
+        if not output:
+            print("No output file: pass -o or set SEMANTIC_EMOTION_HEAD_PATH")
+            return
+        with open(args.input, encoding='utf-8') as f:
+            messages = [line.strip() for line in f if line.strip()]
+        
+        zero_shot = SemanticAnalyzer(emotion_head_path=None).zero_shot
+        report = zero_shot.distill(messages, holdout=args.holdout)
+        zero_shot.save_head(output)
+        print(f"Fitted on {report['texts']} messages, checked on {report['holdout']}: "
+              f"mean score error {report['mean_abs_error']:.3f}, "
+              f"top emotion agreement {report['top_label_agreement']:.1%}")
+        print(f"Head written to {output}")
+        return
+    
+    if args.command == 'migrate-memory':
+        from config import EMOTIONAL_MEMORY_PATH
+        from utils.memory_store import EmotionalMemoryStore, migrate_json_memory
+        
+        with EmotionalMemoryStore(args.output or EMOTIONAL_MEMORY_PATH) as store:
+            count = migrate_json_memory(args.input, store, session=args.session)
+            print(f"Copied {count} turns of {args.input} to {store.path} "
+                  f"({store.count()} turns stored in total)")
+        return
+    
+    if args.command == 'export-history':
+        from datetime import datetime
+        from config import EMOTIONAL_MEMORY_PATH
+        from utils.history_export import export_history
+        from utils.memory_store import EmotionalMemoryStore
+        
+        # Whole days only, since exporting a day replaces its partition
+        start = datetime.strptime(args.start, "%Y-%m-%d") if args.start else None
+        end = datetime.strptime(args.end, "%Y-%m-%d") if args.end else None
+        with EmotionalMemoryStore(args.store or EMOTIONAL_MEMORY_PATH) as store:
+            written = export_history(store.turns(start=start, end=end), args.output)
+        print(f"Exported {sum(written.values())} turns over {len(written)} days to {args.output}")
+        return
+    
+    if args.command == 'serve':
+        from config import HTTP_HOST, HTTP_PORT, HTTP_WORKERS
+        from utils.http_service import AnalysisService, serve
+        
+        semantic_analyzer = None
+        if args.semantic == 'local':
+            from models.semantic_analyzer import SemanticAnalyzer
+            semantic_analyzer = SemanticAnalyzer()
+        elif args.semantic == 'server':
+            from utils.semantic_server import SemanticClient
+            semantic_analyzer = SemanticClient()
+        
+        service = AnalysisService(
+            EmotionAnalyzer(),
+            semantic_analyzer=semantic_analyzer,
+            workers=args.workers or HTTP_WORKERS
+        )
+        serve(service, host=args.host or HTTP_HOST, port=args.port or HTTP_PORT)
+        return
+    
     try:
         # Initialize analyzer
         analyzer = EmotionAnalyzer()
@@ -0,0 +1,131 @@
+"""
+SemanticAnalyzer on each inference backend (torch fp32, int8, onnx,
+onnx-int8): load time, analyze_batch throughput, resident and private
+memory after the run and peak memory, plus the accuracy drift of every
+backend against fp32 on the same fixed sample set.
+
+Each backend runs in a process of its own so memory figures don't mix.
+Private memory is what a replica costs on its own: the PyTorch backends
+map the model files, and those pages count as resident but are shared by
+all replicas through the page cache. ONNX graphs are exported to
+SEMANTIC_ONNX_CACHE_DIR by a separate process first, so the onnx figures
+are those of a replica starting from the cache. --samples takes a text
+file of messages, one per line, instead of the generated ones; --head a
+distilled emotion head to use on every backend.
+
+    python benchmarks/backend_benchmark.py --messages 32 --threads 4
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from semantic_benchmark import make_messages  # noqa: E402
+from models.inference_backend import BACKENDS, compare_analyses  # noqa: E402
+
+
+def memory_mb():
+    """Current resident and private (anonymous) memory, where /proc tells them"""
+    try:
+        with open("/proc/self/status") as f:
+            status = dict(line.split(":", 1) for line in f)
+    except OSError:
+        return float("nan"), float("nan")
+    return tuple(int(status[field].split()[0]) / 1024 for field in ("VmRSS", "RssAnon"))
+
+
+def run_backend(args, messages):
+    """Worker: analyze messages on args.worker and print the figures as JSON"""
+    from models.semantic_analyzer import SemanticAnalyzer
+
+    start = time.perf_counter()
+    analyzer = SemanticAnalyzer(num_threads=args.threads, emotion_head_path=args.head, backend=args.worker)
+    analyzer.analyze_batch(messages[:2])  # Warm up
+    load_time = time.perf_counter() - start
+    if args.prepare:
+        return
+
+    start = time.perf_counter()
+    analyses = analyzer.analyze_batch(messages, batch_size=args.batch_size)
+    elapsed = time.perf_counter() - start
+    resident, private = memory_mb()
+    print(json.dumps({
+        "load_time": load_time,
+        "messages_per_second": len(messages) / elapsed,
+        "resident_mb": resident,
+        "private_mb": private,
+        "peak_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "analyses": [{"sentiment": a["sentiment"], "emotions": a["emotions"]} for a in analyses]
+    }))
+
+
+def spawn(args, backend, prepare=False):
+    command = [sys.executable, os.path.abspath(__file__), "--worker", backend,
+               "--messages", str(args.messages), "--batch-size", str(args.batch_size)]
+    for option in ("threads", "samples", "head"):
+        if getattr(args, option) is not None:
+            command += [f"--{option}", str(getattr(args, option))]
+    if prepare:
+        command.append("--prepare")
+    output = subprocess.run(command, check=True, stdout=subprocess.PIPE, text=True).stdout
+    return None if prepare else json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--messages", type=int, default=32)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--samples", default=None, help="Text file of messages, one per line")
+    parser.add_argument("--head", default=None, help="Distilled emotion head to load")
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--worker", choices=BACKENDS, help=argparse.SUPPRESS)
+    parser.add_argument("--prepare", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.samples:
+        with open(args.samples, encoding="utf-8") as f:
+            messages = [line.strip() for line in f if line.strip()]
+    else:
+        messages = make_messages(args.messages)
+
+    if args.worker:
+        run_backend(args, messages)
+        return
+
+    backends = ["torch"] + [backend for backend in args.backends if backend != "torch"]
+    for backend in backends:
+        if backend.startswith("onnx"):
+            spawn(args, backend, prepare=True)
+    figures = {backend: spawn(args, backend) for backend in backends}
+
+    reference = figures["torch"]
+    print(f"{len(messages)} messages\n")
+    print(f"{'backend':>9} {'load s':>7} {'msg/s':>7} {'speedup':>8} {'RSS MB':>7} {'private MB':>11} {'peak MB':>8}")
+    for backend, result in figures.items():
+        print(
+            f"{backend:>9} {result['load_time']:7.1f} {result['messages_per_second']:7.2f} "
+            f"{result['messages_per_second'] / reference['messages_per_second']:7.1f}x "
+            f"{result['resident_mb']:7.0f} {result['private_mb']:11.0f} {result['peak_mb']:8.0f}"
+        )
+
+    print("\nAccuracy drift against torch fp32")
+    for backend, result in figures.items():
+        if backend == "torch":
+            continue
+        drift = compare_analyses(reference["analyses"], result["analyses"])
+        print(
+            f"{backend:>9}: sentiment max {drift['sentiment_max_error']:.1e} "
+            f"mean {drift['sentiment_mean_error']:.1e} agreement {drift['sentiment_agreement']:.1%}; "
+            f"emotions max {drift['emotion_max_error']:.1e} mean {drift['emotion_mean_error']:.1e} "
+            f"top agreement {drift['top_emotion_agreement']:.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Analysis batching benchmark: many threads call analyze_text at once, as
+a busy chat service would, against a stub API with a requests-per-second
+quota. The plain client sends one request per call; through
+AnalysisBatcher concurrent calls share multi-item requests, and repeated
+messages in flight are sent only once.
+
+    python benchmarks/batch_benchmark.py --calls 400 --threads 64 --quota 20
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from deepseek_client_benchmark import ANALYSIS, StubServer  # noqa: E402
+from utils.analysis_batcher import AnalysisBatcher  # noqa: E402
+from utils.deepseek_client import DeepSeekClient  # noqa: E402
+from utils.rate_limiter import TokenBucket  # noqa: E402
+
+
+def run(server, messages, threads, quota, batched):
+    client = DeepSeekClient("stub-key", rate_limiter=TokenBucket(quota * 60), cache_responses=False)
+    client.api_url = server.url
+    analyzer = AnalysisBatcher(client) if batched else client
+    context = {"conversation_history": [{"text": "hello", "reaction": "happy"}], "current_emotion": "happy"}
+
+    latencies = []
+
+    def call(text):
+        start = time.perf_counter()
+        result = analyzer.analyze_text(text, context)
+        latencies.append(time.perf_counter() - start)
+        return result
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(call, messages))
+    elapsed = time.perf_counter() - start
+    assert all(result == ANALYSIS for result in results)
+
+    stats = analyzer.stats() if batched else None
+    if batched:
+        analyzer.close()
+    latencies.sort()
+    return elapsed, latencies[len(latencies) // 2], client.metrics(), stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--unique", type=int, default=300, help="Distinct messages among the calls")
+    parser.add_argument("--threads", type=int, default=64)
+    parser.add_argument("--quota", type=float, default=20.0, help="Stub quota in requests per second")
+    parser.add_argument("--latency", type=float, default=0.3, help="Stub response time in seconds")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    pool = [f"message number {i}" for i in range(args.unique)]
+    messages = [rng.choice(pool) for _ in range(args.calls)]
+
+    for name, batched in [("one per call", False), ("batched", True)]:
+        server = StubServer(args.latency, rate=args.quota)
+        elapsed, median, metrics, stats = run(server, messages, args.threads, args.quota, batched)
+        line = (
+            f"{name:>12}: {args.calls} calls in {elapsed:5.1f}s ({args.calls / elapsed:6.1f}/s), "
+            f"median latency {median * 1000:6.0f} ms, {metrics['requests']} API requests, "
+            f"{metrics['rate_limited']} got 429"
+        )
+        if stats:
+            line += f", {stats['deduplicated']} deduplicated, {stats['mean_batch_size']:.1f} per batch"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
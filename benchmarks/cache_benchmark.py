@@ -0,0 +1,82 @@
+"""
+Emotion cache benchmark: repetitive chat traffic analyzed with and without
+the content-addressed cache, one message at a time and in batches.
+
+Traffic is drawn from a Zipf-like distribution over a pool of messages,
+so a few short messages ("hi", "thanks", "why?") dominate like they do in
+real chats. --unique sets the share of never repeated messages.
+
+    python benchmarks/cache_benchmark.py --messages 100000 --unique 0.2
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import EmotionAnalyzer  # noqa: E402
+from utils.emotion_cache import EmotionCache  # noqa: E402
+
+COMMON = [
+    "hi", "thanks", "why?", "ok", "thank you so much!", "lol", "what??",
+    "I love this", "this is so frustrating", "no worries", "really?",
+    "Buy cheap followers now!!! best deal, click here", "good morning",
+    "I am not sure about that", "that is awful", "great job everyone",
+]
+WORDS = "the movie was good bad great terrible not very so but really happy day work".split()
+
+
+def make_traffic(count, unique_share, seed=0):
+    rng = random.Random(seed)
+    pool = COMMON + [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 12))) for _ in range(2000)
+    ]
+    weights = [1.0 / (rank + 1) for rank in range(len(pool))]
+    traffic = rng.choices(pool, weights=weights, k=count)
+    for i in range(count):
+        if rng.random() < unique_share:
+            traffic[i] = f"{traffic[i]} #{i}"
+    return traffic
+
+
+def timed(function, count):
+    start = time.perf_counter()
+    function()
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--unique", type=float, default=0.2, help="Share of never repeated messages")
+    parser.add_argument("--cache-size", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=256)
+    args = parser.parse_args()
+
+    traffic = make_traffic(args.messages, args.unique)
+    batches = [traffic[i:i + args.batch_size] for i in range(0, len(traffic), args.batch_size)]
+
+    plain = EmotionAnalyzer()
+    cached = EmotionAnalyzer(cache=EmotionCache(max_size=args.cache_size))
+    plain.determine_emotion("warm up")
+
+    for name, analyzer in (("no cache", plain), ("cache", cached)):
+        single = timed(lambda: [analyzer.determine_emotion(text) for text in traffic], len(traffic))
+        batch = timed(lambda: [analyzer.determine_emotions(chunk) for chunk in batches], len(traffic))
+        scores = timed(lambda: [analyzer.analyze_batch(chunk) for chunk in batches], len(traffic))
+        print(
+            f"{name:>9}: determine_emotion {single:>9.0f}/s   "
+            f"determine_emotions {batch:>9.0f}/s   analyze_batch {scores:>9.0f}/s"
+        )
+
+    stats = cached.cache.stats()
+    print(
+        f"cache: {stats['hit_rate']:.1%} hit rate, {stats['size']} entries, "
+        f"{stats['evictions']} evictions"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+"""
+Conversation context memory and throughput for --sessions concurrent
+sessions, each updated --turns times in an interleaved order:
+  dict of trackers  what keeping a ContextTracker per session cost before:
+                    a dict per turn, two lists shortened with pop(0) and
+                    an instance __dict__
+  ContextStore      slotted trackers holding tuple turns in ring buffers
+                    and a rendered prompt history, with LRU/TTL
+                    bookkeeping and a memory estimate
+
+Reports updates per second, the memory each keeps per session as
+tracemalloc sees it (the texts it holds on to included) and how close the
+store's own estimate comes. Checks that the store's context summaries
+hold everything the old ones did. Needs no models.
+
+    python benchmarks/context_store_benchmark.py --sessions 100000 --turns 8
+"""
+import argparse
+import gc
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.context_store import ContextStore  # noqa: E402
+
+REACTIONS = ["joy", "sadness", "anger", "fear", "surprise", "neutral"]
+WORDS = "I think we should talk about what happened yesterday at the office today".split()
+
+
+class DictTracker:
+    """ContextTracker as it was: dict turns in lists trimmed with pop(0)"""
+
+    def __init__(self, memory_length=5):
+        self.conversation_history = []
+        self.emotion_history = []
+        self.memory_length = memory_length
+        self.current_emotion = "neutral"
+        self.current_topic = None
+
+    def update(self, user_input, sentiment_result, machine_reaction):
+        self.conversation_history.append({
+            "user_input": user_input,
+            "literal_meaning": sentiment_result.get("meaning", ""),
+            "sentiment": sentiment_result.get("sentiment", "neutral"),
+            "sentiment_score": sentiment_result.get("sentiment_score", 0.0),
+            "machine_reaction": machine_reaction,
+            "timestamp": time.time()
+        })
+        if len(self.conversation_history) > self.memory_length:
+            self.conversation_history.pop(0)
+        self.emotion_history.append(machine_reaction)
+        if len(self.emotion_history) > self.memory_length:
+            self.emotion_history.pop(0)
+        self.current_emotion = machine_reaction
+        entities = sentiment_result.get("entities", [])
+        if entities:
+            self.current_topic = entities[0]
+
+    def get_context_summary(self):
+        if not self.conversation_history:
+            return {
+                "current_emotion": self.current_emotion,
+                "current_topic": None,
+                "conversation_summary": "This is the beginning of the conversation."
+            }
+        return {
+            "current_emotion": self.current_emotion,
+            "current_topic": self.current_topic,
+            "conversation_history": [
+                {"user_input": entry["user_input"], "machine_reaction": entry["machine_reaction"]}
+                for entry in self.conversation_history
+            ],
+            "emotion_history": self.emotion_history
+        }
+
+
+class DictOfTrackers:
+    def __init__(self):
+        self.sessions = {}
+
+    def update(self, session_id, user_input, sentiment_result, machine_reaction):
+        tracker = self.sessions.get(session_id)
+        if tracker is None:
+            tracker = self.sessions[session_id] = DictTracker()
+        tracker.update(user_input, sentiment_result, machine_reaction)
+
+    def get_context_summary(self, session_id):
+        return self.sessions[session_id].get_context_summary()
+
+
+def make_updates(sessions, turns, seed=0):
+    """(session id, text, sentiment result, reaction) for every turn, the
+    sessions' turns interleaved"""
+    rng = random.Random(seed)
+    updates = []
+    for turn in range(turns):
+        for session in rng.sample(range(sessions), sessions):
+            text = " ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 15)))
+            score = rng.uniform(-1, 1)
+            result = {
+                "meaning": text,
+                "sentiment": "positive" if score > 0 else "negative",
+                "sentiment_score": score,
+                "entities": []
+            }
+            updates.append((f"session-{session}", text, result, rng.choice(REACTIONS)))
+    return updates
+
+
+def measure(make_store, args):
+    """Updates per second, and bytes the store holds on to at the end,
+    texts included; returns the last store"""
+    updates = make_updates(args.sessions, args.turns)
+    store = make_store()
+    start = time.perf_counter()
+    for session_id, text, result, reaction in updates:
+        store.update(session_id, text, result, reaction)
+    rate = len(updates) / (time.perf_counter() - start)
+
+    # Again under tracemalloc, which slows allocation down; whatever the
+    # store does not keep is freed along with the updates
+    del store, updates
+    tracemalloc.start()
+    updates = make_updates(args.sessions, args.turns)
+    store = make_store()
+    for session_id, text, result, reaction in updates:
+        store.update(session_id, text, result, reaction)
+    sessions = {update[0] for update in updates}
+    del updates
+    gc.collect()
+    held = tracemalloc.get_traced_memory()[0] - sys.getsizeof(sessions)
+    tracemalloc.stop()
+    return rate, held, store, sessions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=100000)
+    parser.add_argument("--turns", type=int, default=8)
+    args = parser.parse_args()
+
+    stores = [
+        ("dict of trackers", DictOfTrackers),
+        ("ContextStore", lambda: ContextStore(max_sessions=args.sessions, ttl=None, memory_budget=None))
+    ]
+    results = []
+    for name, make_store in stores:
+        rate, held, store, sessions = measure(make_store, args)
+        results.append(store)
+        print(f"{name:>16}: {rate:9.0f} updates/s, {held / len(sessions):6.0f} bytes/session, "
+              f"{held / 2 ** 20:6.1f} MB for {len(sessions)} sessions")
+    print(f"{'':>16}  its estimate: {results[1].memory_usage() / 2 ** 20:.1f} MB")
+
+    # The store's summaries add what the old ones lacked, e.g. sentiment_trend
+    same = all(
+        results[0].get_context_summary(session_id).items() <= results[1].get_context_summary(session_id).items()
+        for session_id in sessions
+    )
+    print(f"{'':>16}  summaries {'consistent' if same else 'DIFFERENT'}")
+
+
+if __name__ == "__main__":
+    main()
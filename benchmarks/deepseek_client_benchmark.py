@@ -0,0 +1,293 @@
+"""
+DeepSeek client benchmark against a local stub of the chat completions API.
+
+The stub answers every request after --latency seconds, like a slow LLM
+would, and counts the TCP connections requests arrive on. Given a rate,
+it also enforces a quota, answering 429 with Retry-After beyond it. The blocking client
+sends the requests one after another; the async client keeps up to
+--concurrency of them in flight over pooled keep-alive connections.
+Multi-item analysis prompts get one result per ITEM. Replies are
+generated one word per --token-delay, and streamed as server-sent events
+when the request asks for it.
+
+Then checks the failure paths against stubs: 5xx answers, refused
+connections, connect and read timeouts must all end in the fallback
+results, within the timeouts, and the async client must keep no more
+than max_concurrency requests in flight.
+
+    python benchmarks/deepseek_client_benchmark.py --requests 500 --latency 0.2
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import re
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from aiohttp import web  # noqa: E402
+from utils.async_deepseek_client import AsyncDeepSeekClient  # noqa: E402
+from utils.deepseek_client import DeepSeekClient  # noqa: E402
+from utils.rate_limiter import TokenBucket  # noqa: E402
+
+# The stub has no quota here, so neither should the clients; responses are
+# never cached so every call reaches the stub
+UNLIMITED = float("inf")
+
+ANALYSIS = {
+    "meaning": "stub", "sentiment": "positive", "sentiment_score": 0.5,
+    "machine_reaction": "happy", "confidence": 0.9, "entities": [], "intent": "statement"
+}
+
+
+class StubServer:
+    """Chat completions stub running its own event loop in a thread"""
+
+    def __init__(self, latency, rate=None, burst=5, token_delay=0.0, reply=" stub reply ", status=200,
+                 stream_fault=None):
+        self.latency = latency
+        self.status = status
+        self.stream_fault = stream_fault  # None, "cut" or "malformed"
+        self.token_delay = token_delay
+        self.reply = reply
+        self.peers = set()
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.accepted = 0
+        self.rejected = 0
+        self.in_flight = 0
+        self.peak = 0  # Most requests in flight at once
+        with socket.socket() as probe:
+            probe.bind(("127.0.0.1", 0))
+            self.port = probe.getsockname()[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+        self.ready = threading.Event()
+        threading.Thread(target=self._run, daemon=True).start()
+        self.ready.wait()
+
+    async def _completions(self, request):
+        # Every connection comes from its own client port
+        self.peers.add(request.transport.get_extra_info("peername"))
+        body = await request.json()
+        if not self._take_token():
+            self.rejected += 1
+            return web.json_response({"error": "rate limited"}, status=429, headers={"Retry-After": "1"})
+        if self.status != 200:
+            return web.json_response({"error": "stub failure"}, status=self.status, headers={"Retry-After": "0"})
+        self.accepted += 1
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.in_flight -= 1
+        prompt = body["messages"][-1]["content"]
+        items = re.findall(r"^ITEM (\d+):$", prompt, re.MULTILINE)
+        if body.get("response_format") and items:
+            content = json.dumps({"results": [dict(ANALYSIS, id=int(i)) for i in items]})
+        elif body.get("response_format"):
+            content = json.dumps(ANALYSIS)
+        elif body.get("stream"):
+            return await self._stream(request)
+        else:
+            await asyncio.sleep(self.token_delay * len(self._words()))
+            content = self.reply
+        return web.json_response({"choices": [{"message": {"content": content}}]})
+
+    def _words(self):
+        return re.findall(r"\s*\S+\s*", self.reply)
+
+    async def _stream(self, request):
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        try:
+            await response.write(b": keep-alive\n\n")
+            words = self._words()
+            for i, word in enumerate(words):
+                if i == len(words) // 2 and self.stream_fault == "cut":
+                    # Drop the connection mid-reply, without a [DONE]
+                    request.transport.close()
+                    return response
+                if i == len(words) // 2 and self.stream_fault == "malformed":
+                    await response.write(b'data: {"choices": [{"delta"\n\n')
+                event = {"choices": [{"delta": {"content": word}}]}
+                await response.write(f"data: {json.dumps(event)}\n\n".encode("utf-8"))
+                await asyncio.sleep(self.token_delay)
+            await response.write(b"data: [DONE]\n\n")
+        except ConnectionResetError:
+            pass  # The client stopped reading early
+        return response
+
+    def _take_token(self):
+        if self.rate is None:
+            return True
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def _run(self):
+        loop = asyncio.new_event_loop()
+        app = web.Application()
+        app.router.add_post("/chat/completions", self._completions)
+        runner = web.AppRunner(app, access_log=None)
+        loop.run_until_complete(runner.setup())
+        site = web.TCPSite(runner, "127.0.0.1", self.port, backlog=1024)
+        loop.run_until_complete(site.start())
+        self.ready.set()
+        loop.run_forever()
+
+
+def run_sync(url, count):
+    client = DeepSeekClient("stub-key", rate_limiter=TokenBucket(UNLIMITED), cache_responses=False)
+    client.api_url = url
+    start = time.perf_counter()
+    results = [client.analyze_text(f"message {i}") for i in range(count)]
+    return results, time.perf_counter() - start
+
+
+async def run_async(url, count, concurrency):
+    limiter = TokenBucket(UNLIMITED)
+    async with AsyncDeepSeekClient(
+        "stub-key", max_concurrency=concurrency, rate_limiter=limiter, cache_responses=False
+    ) as client:
+        client.api_url = url
+        start = time.perf_counter()
+        results = await asyncio.gather(*(client.analyze_text(f"message {i}") for i in range(count)))
+        replies = await asyncio.gather(*(client.generate_text("hello") for _ in range(10)))
+        elapsed = time.perf_counter() - start
+    assert set(replies) == {"stub reply"}
+    return results, elapsed
+
+
+def closed_port():
+    """A port nothing listens on: connections are refused"""
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+@contextlib.contextmanager
+def unanswered_port():
+    """A port whose accept queue is full, so connecting hangs until the
+    client's connect timeout"""
+    listener = socket.socket()
+    listener.bind(("127.0.0.1", 0))
+    listener.listen(0)
+    port = listener.getsockname()[1]
+    fillers = []
+    for _ in range(3):
+        filler = socket.socket()
+        filler.setblocking(False)
+        with contextlib.suppress(BlockingIOError):
+            filler.connect(("127.0.0.1", port))
+        fillers.append(filler)
+    time.sleep(0.1)
+    try:
+        yield port
+    finally:
+        for sock in fillers + [listener]:
+            sock.close()
+
+
+def check_failures():
+    """Assert the fallback results and limits of both clients on failures"""
+    options = {"rate_limiter": TokenBucket(UNLIMITED), "cache_responses": False,
+               "connect_timeout": 0.3, "read_timeout": 0.3}
+    reference = DeepSeekClient("stub-key", **options)
+    fallback_analysis = reference._parse_analysis_response(reference._get_fallback_response(json_output=True))
+    fallback_text = reference._get_fallback_response(json_output=False)
+
+    def sync_calls(url, attempts):
+        client = DeepSeekClient("stub-key", max_attempts=attempts, **options)
+        client.api_url = url
+        start = time.perf_counter()
+        results = (client.analyze_text("hello"), client.generate_text("hello"))
+        return results, time.perf_counter() - start, client.metrics()
+
+    def async_calls(url, attempts):
+        async def run():
+            async with AsyncDeepSeekClient("stub-key", max_attempts=attempts, **options) as client:
+                client.api_url = url
+                start = time.perf_counter()
+                results = (await client.analyze_text("hello"), await client.generate_text("hello"))
+                return results, time.perf_counter() - start, client.metrics()
+        return asyncio.run(run())
+
+    failing = StubServer(0.0, status=503)
+    slow = StubServer(2.0)
+    with unanswered_port() as port:
+        cases = [
+            ("5xx", failing.url, 2),
+            ("refused", f"http://127.0.0.1:{closed_port()}", 1),
+            ("connect timeout", f"http://127.0.0.1:{port}", 1),
+            ("read timeout", slow.url, 1),
+        ]
+        for name, url, attempts in cases:
+            for kind, calls in (("sync", sync_calls), ("async", async_calls)):
+                with contextlib.redirect_stdout(io.StringIO()):
+                    results, elapsed, metrics = calls(url, attempts)
+                assert results == (fallback_analysis, fallback_text), (name, kind, results)
+                assert metrics["failures"] == 2, (name, kind, metrics)
+                # Two calls, each given up on after its timeouts
+                assert elapsed < 2 * attempts * 1.0, (name, kind, elapsed)
+                if name == "5xx":
+                    assert metrics["server_errors"] == 4 and metrics["retries"] == 2, (kind, metrics)
+                print(f"  {name + ' (' + kind + ')':>23}: fallback results after {elapsed:.2f}s")
+
+    limited = StubServer(0.05)
+
+    async def crowd():
+        async with AsyncDeepSeekClient("stub-key", max_concurrency=4, **options) as client:
+            client.api_url = limited.url
+            return await asyncio.gather(*(client.analyze_text(f"message {i}") for i in range(40)))
+
+    results = asyncio.run(crowd())
+    assert all(result == ANALYSIS for result in results)
+    assert 0 < limited.peak <= 4, limited.peak
+    print(f"  {'concurrency limit':>23}: at most {limited.peak} of 40 requests in flight")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--sync-requests", type=int, default=20, help="Requests for the slow blocking run")
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub response time in seconds")
+    parser.add_argument("--concurrency", type=int, default=256)
+    args = parser.parse_args()
+
+    server = StubServer(args.latency)
+
+    results, elapsed = run_sync(server.url, args.sync_requests)
+    assert all(result == ANALYSIS for result in results)
+    sync_connections = len(server.peers)
+    print(
+        f"   sync: {len(results)} requests in {elapsed:.2f}s "
+        f"({len(results) / elapsed:.1f} req/s, {sync_connections} connections)"
+    )
+
+    results, elapsed = asyncio.run(run_async(server.url, args.requests, args.concurrency))
+    assert all(result == ANALYSIS for result in results)
+    print(
+        f"  async: {len(results)} requests in {elapsed:.2f}s "
+        f"({len(results) / elapsed:.1f} req/s, {len(server.peers) - sync_connections} connections)"
+    )
+
+    print("failure paths:")
+    check_failures()
+    print("all checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,153 @@
+"""
+EmotionMapper on generated turns:
+  if/elif   what map_sentiment_to_emotion did before: if/elif chains and
+            a scan of every category list per lookup
+  lookup    map_sentiment_to_emotion, one lookup in the compiled dict
+  map_batch all turns at once, as arrays, with the previous emotions as
+            names and as ids (as a replay of exported history has them)
+
+Two sets of turns: "random" turns follow any previous emotion (or none),
+and "conversations" follow the emotion the mapper gave the turn before
+in the same conversation, as they do in use. Each way runs --repeat
+times and the best run counts. Checks that every way maps every turn to
+the same emotion. Needs no models.
+
+    python benchmarks/emotion_mapper_benchmark.py --turns 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from responses.emotion_mapper import EmotionMapper  # noqa: E402
+
+
+class Context:
+    """The parts of ContextTracker the mapper reads"""
+
+    def __init__(self, current_emotion):
+        self.current_emotion = current_emotion
+        self.emotion_history = [current_emotion] if current_emotion else []
+
+
+def map_if_elif(mapper, sentiment_data, context):
+    """map_sentiment_to_emotion as it was"""
+    sentiment = sentiment_data.get('sentiment', 'neutral')
+    intensity = sentiment_data.get('intensity', 0)
+    is_subjective = sentiment_data.get('is_subjective', False)
+    if sentiment == "positive":
+        base_emotion = "excited" if intensity > 0.5 else "happy"
+    elif sentiment == "negative":
+        base_emotion = "angry" if intensity > 0.5 else "sad"
+    else:
+        base_emotion = "neutral"
+    if is_subjective:
+        if base_emotion == "neutral":
+            base_emotion = "calm"
+        elif base_emotion == "happy":
+            base_emotion = "excited"
+        elif base_emotion == "sad":
+            base_emotion = "frustrated"
+    if not context or not context.emotion_history:
+        return base_emotion
+    previous_emotion = context.current_emotion
+    if previous_emotion in mapper.transition_rules:
+        transition_map = mapper.transition_rules[previous_emotion]
+        category = "neutral"
+        for name, emotions in mapper.emotion_map.items():
+            if base_emotion in emotions:
+                category = name
+                break
+        if category in transition_map:
+            return transition_map[category]
+    return base_emotion
+
+
+def make_data(rng):
+    return {
+        "sentiment": rng.choice(["positive", "negative", "neutral", "mixed"]),
+        "intensity": rng.choice([0.0, 0.5, rng.random()]),
+        "is_subjective": rng.random() < 0.5
+    }
+
+
+def make_turns(count, mapper, seed=0):
+    """Turns, each after a random previous emotion"""
+    rng = random.Random(seed)
+    previous = [None, "", "unknown"] + mapper.emotions
+    return [(make_data(rng), rng.choice(previous)) for _ in range(count)]
+
+
+def make_conversations(count, mapper, length=20, seed=0):
+    """Turns of conversations of length turns, each after the emotion
+    the one before it was mapped to"""
+    rng = random.Random(seed)
+    turns, previous = [], None
+    for i in range(count):
+        if i % length == 0:
+            previous = None
+        data = make_data(rng)
+        turns.append((data, previous))
+        previous = map_if_elif(mapper, data, Context(previous))
+    return turns
+
+
+def best_of(function, repeat):
+    """The result of function and its shortest time of repeat runs"""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+
+def compare(name, mapper, turns, repeat):
+    contexts = [Context(previous) for _, previous in turns]
+    columns = {
+        "sentiments": np.array([data["sentiment"] for data, _ in turns]),
+        "intensities": np.array([data["intensity"] for data, _ in turns]),
+        "subjective": np.array([data["is_subjective"] for data, _ in turns]),
+        "previous": [previous for _, previous in turns]
+    }
+    previous_ids = mapper.emotion_codes(columns["previous"])
+
+    expected, base_time = best_of(lambda: [
+        map_if_elif(mapper, data, context) for (data, _), context in zip(turns, contexts)
+    ], repeat)
+    runs = [
+        ("lookup", lambda: [
+            mapper.map_sentiment_to_emotion(data, context) for (data, _), context in zip(turns, contexts)
+        ]),
+        ("map_batch", lambda: mapper.map_batch(**columns)),
+        ("ids", lambda: mapper.map_batch(**dict(columns, previous=previous_ids))),
+    ]
+    print(f"{name}:")
+    print(f"{'if/elif':>11}: {len(turns) / base_time:10.0f} turns/s")
+    for run_name, run in runs:
+        results, elapsed = best_of(run, repeat)
+        if run_name in ("map_batch", "ids"):
+            results = np.array(mapper.emotions)[results].tolist()
+        same = results == expected
+        print(f"{run_name:>11}: {len(turns) / elapsed:10.0f} turns/s ({base_time / elapsed:5.1f}x), "
+              f"{'identical' if same else 'DIFFERENT'}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--turns", type=int, default=1000000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    mapper = EmotionMapper()
+    compare("random", mapper, make_turns(args.turns, mapper), args.repeat)
+    compare("conversations", mapper, make_conversations(args.turns, mapper), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Smoothed emotions (EmotionMapper.map_smoothed) of --sessions sessions
+over --turns generated turns, interleaved:
+  per turn   map_smoothed for each turn
+  batch      map_smoothed_batch over all turns at once, as a replay would
+
+Checks that both show the same emotion after every turn, and that turns
+given as NumPy scalars map as Python ones do, and reports how
+often the shown emotion changed against the base emotion and the memory
+the states take per session. Needs no models.
+
+    python benchmarks/emotion_states_benchmark.py --sessions 100000 --turns 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from responses.emotion_mapper import EmotionMapper  # noqa: E402
+
+
+def make_turns(count, sessions, seed=0):
+    """(session, sentiment data) pairs; each session leans to one sentiment"""
+    rng = random.Random(seed)
+    leanings = [rng.choice(["positive", "negative", "neutral"]) for _ in range(sessions)]
+    turns = []
+    for _ in range(count):
+        session = rng.randrange(sessions)
+        sentiment = leanings[session] if rng.random() < 0.7 else rng.choice(["positive", "negative", "neutral"])
+        turns.append((f"session-{session}", {
+            "sentiment": sentiment,
+            "intensity": rng.random(),
+            "is_subjective": rng.random() < 0.3
+        }))
+    return turns
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def changes(sessions, emotions):
+    """How often a session's emotion differs from the one before it"""
+    last, changed = {}, 0
+    for session, emotion in zip(sessions, emotions):
+        changed += last.get(session, emotion) != emotion
+        last[session] = emotion
+    return changed
+
+
+def numpy_turns_match(turns):
+    """Whether turns with NumPy scalar values map as their Python values do"""
+    python_mapper, numpy_mapper = EmotionMapper(), EmotionMapper()
+    for i, (session, data) in enumerate(turns):
+        scalar = np.float64 if i % 2 else np.float32
+        numpy_data = {
+            "sentiment": np.str_(data["sentiment"]),
+            "intensity": scalar(data["intensity"]),
+            "is_subjective": np.bool_(data["is_subjective"])
+        }
+        if (numpy_mapper.map_smoothed(session, numpy_data) != python_mapper.map_smoothed(session, data)
+                or numpy_mapper.map_sentiment_to_emotion(numpy_data, None)
+                != python_mapper.map_sentiment_to_emotion(data, None)):
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--sessions", type=int, default=100000)
+    parser.add_argument("--turns", type=int, default=1000000)
+    args = parser.parse_args()
+
+    turns = make_turns(args.turns, args.sessions)
+    sessions = [session for session, _ in turns]
+    columns = {
+        "sentiments": np.array([data["sentiment"] for _, data in turns]),
+        "intensities": np.array([data["intensity"] for _, data in turns]),
+        "subjective": np.array([data["is_subjective"] for _, data in turns])
+    }
+
+    mapper = EmotionMapper()
+    expected, turn_time = timed(lambda: [mapper.map_smoothed(session, data) for session, data in turns])
+    states = mapper.states
+    batch_mapper = EmotionMapper()
+    shown, batch_time = timed(lambda: batch_mapper.map_smoothed_batch(sessions, **columns))
+    results = [batch_mapper.states.emotions[i] for i in shown]
+    same = results == expected and np.array_equal(
+        states.probabilities[:len(states)], batch_mapper.states.probabilities[:len(states)]
+    )
+
+    base = [mapper.emotions[i] for i in mapper.map_batch(**columns)]
+    per_session = (states.probabilities.nbytes + states.current.nbytes + states.last_seen.nbytes) / len(states)
+    print(f"{len(turns)} turns of {len(states)} sessions")
+    print(f"per turn: {len(turns) / turn_time:10.0f} turns/s")
+    print(f"   batch: {len(turns) / batch_time:10.0f} turns/s ({turn_time / batch_time:4.1f}x), "
+          f"{'identical' if same else 'DIFFERENT'}")
+    print(f"emotion changes: {changes(sessions, expected)} smoothed, {changes(sessions, base)} unsmoothed")
+    print(f"state arrays: {per_session:.0f} bytes per session (with the arrays' spare rows)")
+    numpy_same = numpy_turns_match(turns[:10000])
+    print(f"NumPy scalar turns: {'same emotions' if numpy_same else 'DIFFERENT emotions'}")
+    assert same and numpy_same
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""
+Emotion reports over --days days of conversation turns, --per-day turns a
+day:
+  nested dicts  every turn read from the EmotionalMemoryStore as a dict
+                and the reports computed over those
+  columnar      the turns exported once with export_history, the reports
+                computed by EmotionHistory over its columns
+
+The reports are the user emotion histogram, the transition matrix of
+consecutive emotions within a session and a rolling mean of the compound
+score. Checks that both ways agree, that turns exported out of day
+order all end up in the export, and that an export in order holds one
+day in memory at a time. Needs no models.
+
+    python benchmarks/history_export_benchmark.py --days 90 --per-day 10000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.history_export import EmotionHistory, export_history  # noqa: E402
+from utils.memory_store import EmotionalMemoryStore  # noqa: E402
+
+EMOTIONS = ["neutral", "happy", "excited", "pleased", "sad", "angry", "furious", "curious", "calm"]
+START = 1.7e9
+WINDOW = 50
+
+
+def make_turns(days, per_day, sessions=2000, seed=0):
+    """(session, turn) pairs spread evenly over the days"""
+    rng = random.Random(seed)
+    step = 86400 / per_day
+    for i in range(days * per_day):
+        emotion = rng.choice(EMOTIONS)
+        neg, pos = round(rng.random() / 2, 3), round(rng.random() / 2, 3)
+        yield f"session-{rng.randrange(sessions)}", {
+            "timestamp": START + i * step,
+            "user_input": f"message {i}",
+            "user_emotion": emotion,
+            "machine_emotion": rng.choice(EMOTIONS),
+            "sentiment_data": {
+                "sentiment": "positive" if pos > neg else "negative",
+                "emotion": emotion,
+                "scores": {"neg": neg, "neu": round(1 - neg - pos, 3), "pos": pos,
+                           "compound": round(pos - neg, 4)},
+                "text": f"message {i}"
+            }
+        }
+
+
+def nested_reports(store):
+    """The reports computed from every turn as a dict"""
+    turns = list(store.turns())
+    histogram = Counter(turn["user_emotion"] for turn in turns)
+
+    by_session = defaultdict(list)
+    for turn in turns:
+        by_session[turn["session"]].append(turn)
+    transitions = Counter()
+    for session_turns in by_session.values():
+        for before, after in zip(session_turns, session_turns[1:]):
+            transitions[before["user_emotion"], after["user_emotion"]] += 1
+
+    compound = [turn["sentiment_data"]["scores"]["compound"] for turn in turns]
+    rolling, total = [], 0.0
+    for i, value in enumerate(compound):
+        total += value
+        if i >= WINDOW:
+            total -= compound[i - WINDOW]
+        rolling.append(total / min(i + 1, WINDOW))
+    return dict(histogram), transitions, rolling
+
+
+def columnar_reports(history):
+    histogram = history.emotion_histogram()
+    labels, matrix = history.transition_matrix()
+    transitions = Counter({
+        (labels[i], labels[j]): int(matrix[i, j]) for i, j in zip(*np.nonzero(matrix))
+    })
+    _, rolling = history.rolling_compound_mean(WINDOW)
+    return histogram, transitions, rolling
+
+
+def shuffled_export_complete(days, root):
+    """Whether turns of interleaved days, or of days in order followed by
+    late turns of earlier days, exported in that order, are all in the
+    export"""
+    turns = [turn for _, turn in make_turns(days, 100)]
+    shuffled = random.Random(1).sample(turns, len(turns))
+    late = turns[::2] + turns[1::2]
+    for i, order in enumerate([shuffled, late]):
+        path = os.path.join(root, str(i))
+        written = export_history(order, path)
+        columns, _ = EmotionHistory(path).columns(["timestamp"])
+        if (sum(written.values()) != len(turns)
+                or not np.array_equal(columns["timestamp"], [turn["timestamp"] for turn in turns])):
+            return False
+    return True
+
+
+def export_peak_mb(days, per_day, root):
+    """Peak memory tracemalloc sees while exporting days in order"""
+    tracemalloc.start()
+    export_history((turn for _, turn in make_turns(days, per_day)), root)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak / 2 ** 20
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--per-day", type=int, default=10000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = EmotionalMemoryStore(os.path.join(tmp, "memory.sqlite"))
+        store.append_many(make_turns(args.days, args.per_day))
+        history = EmotionHistory(os.path.join(tmp, "history"))
+
+        expected, nested_time = timed(lambda: nested_reports(store))
+        written, export_time = timed(lambda: export_history(store.turns(), history.root))
+        results, columnar_time = timed(lambda: columnar_reports(history))
+        store.close()
+        complete = shuffled_export_complete(min(args.days, 7), os.path.join(tmp, "shuffled"))
+        peak_days = min(args.days, 7)
+        one_day_mb = export_peak_mb(1, args.per_day, os.path.join(tmp, "one-day"))
+        many_days_mb = export_peak_mb(peak_days, args.per_day, os.path.join(tmp, "many-days"))
+
+    turns = sum(written.values())
+    same = (expected[0] == results[0] and expected[1] == results[1]
+            and np.allclose(expected[2], results[2], atol=1e-6))
+    print(f"{turns} turns over {len(written)} days")
+    print(f"nested dicts: {nested_time:7.2f}s")
+    print(f"export:       {export_time:7.2f}s (once)")
+    print(f"columnar:     {columnar_time:7.2f}s ({nested_time / columnar_time:.0f}x), "
+          f"{'same reports' if same else 'DIFFERENT reports'}")
+    print(f"out of order: {'every turn exported' if complete else 'TURNS LOST'}")
+    print(f"in order:     {one_day_mb:.1f} MB peak for 1 day, {many_days_mb:.1f} MB for {peak_days} days")
+    assert complete and same and many_days_mb < 1.5 * one_day_mb
+
+
+if __name__ == "__main__":
+    main()
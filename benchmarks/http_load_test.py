@@ -0,0 +1,139 @@
+"""
+Load test of the HTTP service (app.py serve): --connections clients, each
+on a keep-alive connection of its own, send requests back to back for
+--duration seconds. Reports requests per second, latency percentiles,
+rejected (503) and failed requests, and how the service batched them.
+
+Starts a server of its own unless --url points at one already running.
+
+    python benchmarks/http_load_test.py --connections 2000 --duration 30
+    python benchmarks/http_load_test.py --url http://10.0.0.5:8080 --endpoint respond
+"""
+import argparse
+import asyncio
+import os
+import random
+import resource
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import aiohttp
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MESSAGES = [
+    "I'm so happy about my new job!", "This is making me really angry", "I feel sad about what happened",
+    "hello", "why?", "The meeting went fine I guess", "I hate waiting in line",
+    "What a wonderful day it has been", "Seriously? Again?", "I'm not sure how I feel about this",
+]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def wait_for_server(url, server, timeout=120):
+    deadline = time.monotonic() + timeout
+    async with aiohttp.ClientSession() as session:
+        while True:
+            if server is not None and server.poll() is not None:
+                raise RuntimeError("The server exited")
+            try:
+                async with session.get(f"{url}/health") as response:
+                    if response.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError("The server did not come up")
+            await asyncio.sleep(0.2)
+
+
+async def client(session, url, args, deadline, latencies, statuses, number):
+    rng = random.Random(number)
+    while time.monotonic() < deadline:
+        endpoint = args.endpoint if args.endpoint != "mixed" else rng.choice(["analyze", "respond"])
+        body = {"text": rng.choice(MESSAGES)}
+        if endpoint != "analyze_batch":
+            body["session_id"] = f"session-{rng.randrange(args.sessions)}"
+        else:
+            body = {"texts": [rng.choice(MESSAGES) for _ in range(args.batch_texts)]}
+        start = time.perf_counter()
+        try:
+            async with session.post(f"{url}/{endpoint}", json=body) as response:
+                await response.read()
+                statuses[response.status] = statuses.get(response.status, 0) + 1
+                if response.status == 200:
+                    latencies.append(time.perf_counter() - start)
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            statuses["error"] = statuses.get("error", 0) + 1
+
+
+async def run(args, url):
+    # Every connection needs a file descriptor, on both ends
+    _, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+    connector = aiohttp.TCPConnector(limit=args.connections)
+    timeout = aiohttp.ClientTimeout(total=60)
+    latencies, statuses = [], {}
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        deadline = time.monotonic() + args.duration
+        start = time.monotonic()
+        await asyncio.gather(*(
+            client(session, url, args, deadline, latencies, statuses, number)
+            for number in range(args.connections)
+        ))
+        elapsed = time.monotonic() - start
+        async with session.get(f"{url}/health") as response:
+            health = await response.json()
+
+    latencies.sort()
+    served = len(latencies)
+    print(f"{args.connections} connections, {args.endpoint}, {elapsed:.1f}s")
+    print(f"  {served / elapsed:8.0f} requests/s served, statuses {statuses}")
+    if served:
+        for share in (0.5, 0.9, 0.99):
+            print(f"  p{int(share * 100):<3} {latencies[min(served - 1, int(served * share))] * 1000:8.1f} ms")
+    print(f"  server: {health['batches']} batches of {health['mean_batch_size']:.1f} texts, "
+          f"{health['sessions']} sessions, {health['rejected']} rejected")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--url", default=None, help="Server to test (default: start one)")
+    parser.add_argument("--connections", type=int, default=2000)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--endpoint", choices=["analyze", "respond", "analyze_batch", "mixed"], default="mixed")
+    parser.add_argument("--sessions", type=int, default=10000)
+    parser.add_argument("--batch-texts", type=int, default=16, help="Texts per /analyze_batch request")
+    parser.add_argument("--workers", type=int, default=None, help="Analysis threads of the started server")
+    args = parser.parse_args()
+
+    server, url = None, args.url
+    if url is None:
+        port = free_port()
+        url = f"http://127.0.0.1:{port}"
+        command = [sys.executable, os.path.join(ROOT, "app.py"), "serve", "--port", str(port)]
+        if args.workers:
+            command += ["--workers", str(args.workers)]
+        # In a scratch directory, where the server writes its log
+        workdir = tempfile.TemporaryDirectory()
+        server = subprocess.Popen(command, cwd=workdir.name, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        asyncio.run(wait_for_server(url, server))
+        asyncio.run(run(args, url))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+            workdir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
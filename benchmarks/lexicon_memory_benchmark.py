@@ -0,0 +1,110 @@
+"""
+Per-worker memory and scoring speed of the VADER lexicon: a private
+dictionary per process (nltk's SentimentIntensityAnalyzer) against the
+shared memory-mapped snapshot.
+
+Workers are forked after nltk is imported, so only the lexicon itself
+shows up in their private memory. Linux only (reads /proc/self/smaps_rollup).
+
+    python benchmarks/lexicon_memory_benchmark.py --workers 8
+"""
+import argparse
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.lexicon import VaderLexicon, load_vader_snapshot
+from models.vader_batch import BatchVaderScorer
+from nltk.sentiment import SentimentIntensityAnalyzer
+
+SAMPLE = [
+    "I really love how this turned out!",
+    "This is not good at all, honestly pretty terrible",
+    "meh, it was ok I guess",
+    "The service was slow but the food was great",
+    "never so happy to see the weekend :)",
+] * 200
+
+
+def private_kb():
+    """Private (unshared) resident memory of this process in kB"""
+    total = 0
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            if line.startswith(("Private_Clean:", "Private_Dirty:")):
+                total += int(line.split()[1])
+    return total
+
+
+def dict_worker(_):
+    before = private_kb()
+    sia = SentimentIntensityAnalyzer()
+    loaded = private_kb()
+    for text in SAMPLE:
+        sia.polarity_scores(text)
+    return loaded - before, private_kb() - before
+
+
+def store_worker(_):
+    before = private_kb()
+    snapshot = load_vader_snapshot()
+    scorer = BatchVaderScorer(snapshot["lexicon"], snapshot["constants"])
+    loaded = private_kb()
+    scorer.compound_scores(SAMPLE)
+    return loaded - before, private_kb() - before
+
+
+def lookup_speed(lexicon, words, rounds=50):
+    """Nanoseconds per word for a bulk lookup"""
+    start = time.perf_counter()
+    for _ in range(rounds):
+        lexicon.lookup(words)
+    return (time.perf_counter() - start) / rounds / len(words) * 1e9
+
+
+def dict_speed(lexicon, words, rounds=50):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        [lexicon.get(word, 0.0) for word in words]
+    return (time.perf_counter() - start) / rounds / len(words) * 1e9
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--workers", type=int, default=8, help="Worker processes to fork")
+    args = parser.parse_args()
+
+    # Make sure the snapshot exists before the workers map it
+    snapshot = load_vader_snapshot()
+
+    context = multiprocessing.get_context("fork")
+    for name, worker in (("dict", dict_worker), ("mmap", store_worker)):
+        with context.Pool(args.workers) as pool:
+            deltas = pool.map(worker, range(args.workers), chunksize=1)
+        loaded = sum(delta[0] for delta in deltas) / len(deltas)
+        scored = sum(delta[1] for delta in deltas) / len(deltas)
+        print(f"{name:<5} private memory per worker: {loaded:6.0f} kB after loading "
+              f"({loaded * 32 / 1024:.1f} MB across 32 workers), "
+              f"{scored:6.0f} kB after scoring {len(SAMPLE)} messages")
+
+    lexicon = snapshot["lexicon"]
+    as_dict = lexicon.to_dict()
+    words = list({word.lower().strip(".,!?") for text in SAMPLE for word in text.split()})
+    words += list(as_dict)[:1000]
+    print(f"dict lookup: {dict_speed(as_dict, words):6.0f} ns/word")
+    print(f"mmap lookup: {lookup_speed(lexicon, words):6.0f} ns/word (bulk)")
+
+    in_memory = BatchVaderScorer(VaderLexicon.from_dict(as_dict), snapshot["constants"])
+    mapped = BatchVaderScorer(lexicon, snapshot["constants"])
+    for name, scorer in (("in-memory", in_memory), ("mmap", mapped)):
+        start = time.perf_counter()
+        scorer.compound_scores(SAMPLE)
+        elapsed = (time.perf_counter() - start) / len(SAMPLE) * 1e6
+        print(f"{name:<9} batch scoring: {elapsed:6.1f} us/message")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Cost of remembering one more turn as the emotional memory grows to
+--turns turns:
+  JSON file  emotional_memory.json kept as one document, rewritten on
+             every turn (only up to --json-turns, as it gets slow)
+  store      EmotionalMemoryStore.append, one committed insert per turn
+
+At each size, appends --sample turns one at a time and reports the mean
+time per turn; the turns in between are added in bulk. Then times
+streaming reads of one session, one emotion and one hour, and checks that
+migrating an emotional_memory.json file again copies no turn twice.
+
+    python benchmarks/memory_store_benchmark.py --turns 1000000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.memory_store import EmotionalMemoryStore, migrate_json_memory  # noqa: E402
+
+EMOTIONS = ["neutral", "happy", "excited", "pleased", "sad", "angry", "furious", "curious", "calm"]
+START = 1.7e9
+
+
+def make_turns(count, first=0, sessions=1000, seed=0):
+    """(session, turn) pairs shaped like emotional_memory.json entries, one
+    second apart"""
+    rng = random.Random(seed + first)
+    for i in range(first, first + count):
+        emotion = rng.choice(EMOTIONS)
+        compound = round(rng.uniform(-1, 1), 4)
+        text = f"message {i} about something that happened"
+        yield f"session-{rng.randrange(sessions)}", {
+            "timestamp": START + i,
+            "user_input": text,
+            "user_emotion": emotion,
+            "machine_emotion": rng.choice(EMOTIONS),
+            "sentiment_data": {
+                "sentiment": "positive" if compound > 0 else "negative",
+                "emotion": emotion,
+                "scores": {"neg": 0.0, "neu": 0.5, "pos": 0.5, "compound": compound},
+                "text": text
+            }
+        }
+
+
+def sizes(limit):
+    size = 1000
+    while size < limit:
+        yield size
+        size *= 10
+    yield limit
+
+
+def time_json(path, turns, sample):
+    """Mean seconds per turn of rewriting a memory of len(turns) turns"""
+    memory = {"memory": [turn for _, turn in turns]}
+    start = time.perf_counter()
+    for _, turn in make_turns(sample, len(turns)):
+        memory["memory"].append(turn)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(memory, f)
+    return (time.perf_counter() - start) / sample
+
+
+def time_store(store, first, sample):
+    start = time.perf_counter()
+    for session, turn in make_turns(sample, first):
+        store.append(session, turn)
+    return (time.perf_counter() - start) / sample
+
+
+def time_read(label, read):
+    start = time.perf_counter()
+    count = sum(1 for _ in read())
+    elapsed = time.perf_counter() - start
+    print(f"{label:>22}: {count:8d} turns in {elapsed * 1000:8.1f} ms")
+
+
+def check_migration(tmp):
+    """Migrating a file again copies only what was appended, with and
+    without timestamps, and after it was trimmed"""
+    for timestamps in (True, False):
+        path = os.path.join(tmp, f"emotional_memory_{timestamps}.json")
+        store = EmotionalMemoryStore(os.path.join(tmp, f"migrated_{timestamps}.sqlite"))
+        memory = [turn for _, turn in make_turns(10)]
+        if not timestamps:
+            for turn in memory:
+                del turn["timestamp"]
+
+        def migrate(turns):
+            with open(path, "w") as f:
+                json.dump({"memory": turns}, f)
+            return migrate_json_memory(path, store)
+
+        copied = [migrate(memory[:6]), migrate(memory[:6]), migrate(memory)]
+        if timestamps:
+            copied.append(migrate(memory[7:] + [turn for _, turn in make_turns(2, 10)]))
+        assert copied == ([6, 0, 4, 2] if timestamps else [6, 0, 4]), copied
+        stored = [turn["user_input"] for turn in store.turns()]
+        assert len(stored) == len(set(stored)) == sum(copied), stored
+        store.close()
+        print(f"migrating again ({'with' if timestamps else 'without'} timestamps): "
+              f"copied {copied}, no turn twice")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--turns", type=int, default=1000000)
+    parser.add_argument("--json-turns", type=int, default=100000)
+    parser.add_argument("--sample", type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = EmotionalMemoryStore(os.path.join(tmp, "memory.sqlite"))
+        stored = 0
+        print(f"{'turns':>10} {'JSON file':>12} {'store':>12}")
+        for size in sizes(args.turns):
+            store.append_many(make_turns(size - stored, stored))
+            store_time = time_store(store, size, args.sample)
+            stored = size + args.sample
+
+            json_time = None
+            if size <= args.json_turns:
+                turns = list(make_turns(size))
+                json_time = time_json(os.path.join(tmp, "memory.json"), turns, max(1, args.sample // 100))
+            json_text = f"{json_time * 1000:9.2f} ms" if json_time is not None else f"{'-':>12}"
+            print(f"{size:>10} {json_text} {store_time * 1000:9.3f} ms")
+
+        print()
+        time_read("one session", lambda: store.turns(session="session-7"))
+        time_read("one emotion", lambda: store.turns(emotion="furious"))
+        time_read("one hour", lambda: store.turns(start=START + stored // 2, end=START + stored // 2 + 3600))
+        store.close()
+
+        print()
+        check_migration(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""
+Model memory per host: --workers processes each analyzing their share of
+the same messages, either with a SemanticAnalyzer of their own or through
+one shared SemanticServer (app.py serve-semantic). Reports wall time and
+the private memory of every process involved, plus what constructing a
+SemanticAnalyzer costs a process that never analyzes now that the models
+load lazily.
+
+Private memory is what each extra process costs the host. With the torch
+backend the model weights are memory-mapped and already shared through
+the page cache, so a worker's own share is mostly the PyTorch runtime and
+activations; with --backend int8 or onnx-int8 the weights are private too.
+
+    python benchmarks/model_server_benchmark.py --workers 4 --messages 32 --backend onnx-int8
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# A process that builds an analyzer but never analyzes, then loads it
+CONSTRUCT = """
+import json, time
+from model_server_benchmark import private_mb
+from models.semantic_analyzer import SemanticAnalyzer
+start = time.perf_counter()
+analyzer = SemanticAnalyzer()
+constructed = time.perf_counter() - start
+private = private_mb()
+analyzer.load()
+print(json.dumps([constructed, private, time.perf_counter() - start, private_mb()]))
+"""
+
+
+def private_mb(pid="self"):
+    """Private (anonymous) resident memory of a process"""
+    with open(f"/proc/{pid}/status") as f:
+        status = dict(line.split(":", 1) for line in f)
+    return int(status["RssAnon"].split()[0]) / 1024
+
+
+def run_worker(mode, texts, socket_path):
+    """Worker: analyze texts and print its private memory"""
+    if mode == "local":
+        from models.semantic_analyzer import SemanticAnalyzer
+        analyzer = SemanticAnalyzer()
+    else:
+        from utils.semantic_server import SemanticClient
+        analyzer = SemanticClient(socket_path)
+    for text in texts:
+        analyzer.analyze(text)
+    print(json.dumps(private_mb()))
+
+
+def run_workers(args, messages, mode, socket_path=None):
+    shares = [messages[i::args.workers] for i in range(args.workers)]
+    start = time.perf_counter()
+    workers = [
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--worker", mode, "--socket", socket_path or "",
+             "--texts", json.dumps(share)],
+            stdout=subprocess.PIPE, text=True, env=args.env
+        )
+        for share in shares
+    ]
+    private = [json.loads(worker.communicate()[0].strip().splitlines()[-1]) for worker in workers]
+    return time.perf_counter() - start, private
+
+
+def wait_for_socket(path, server, timeout=600):
+    deadline = time.monotonic() + timeout
+    while not os.path.exists(path):
+        if server.poll() is not None or time.monotonic() > deadline:
+            raise RuntimeError("Semantic server did not come up")
+        time.sleep(0.2)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--messages", type=int, default=32)
+    parser.add_argument("--backend", default=None, help="Inference backend (default: SEMANTIC_BACKEND)")
+    parser.add_argument("--worker", choices=["local", "client"], help=argparse.SUPPRESS)
+    parser.add_argument("--socket", help=argparse.SUPPRESS)
+    parser.add_argument("--texts", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, json.loads(args.texts), args.socket)
+        return
+
+    args.env = dict(os.environ)
+    if args.backend:
+        args.env["SEMANTIC_BACKEND"] = args.backend
+    probe_env = dict(args.env, PYTHONPATH=os.pathsep.join([ROOT, os.path.join(ROOT, "benchmarks")]))
+    output = subprocess.run([sys.executable, "-c", CONSTRUCT], env=probe_env, check=True,
+                            stdout=subprocess.PIPE, text=True).stdout
+    constructed, constructed_mb, loaded, loaded_mb = json.loads(output.strip().splitlines()[-1])
+    print(f"SemanticAnalyzer(): {constructed:.2f}s, {constructed_mb:.0f} MB private; "
+          f"after load(): {loaded:.1f}s, {loaded_mb:.0f} MB private\n")
+
+    # Imported here, since it imports torch and client workers must not
+    from semantic_benchmark import make_messages
+
+    messages = make_messages(args.messages)
+    elapsed, private = run_workers(args, messages, "local")
+    print(f"{args.workers} workers with their own models: {elapsed:6.1f}s, "
+          f"{sum(private):6.0f} MB private in total")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        socket_path = os.path.join(tmp, "semantic.sock")
+        server = subprocess.Popen([sys.executable, os.path.join(ROOT, "app.py"), "serve-semantic",
+                                   "--socket", socket_path], cwd=tmp, env=args.env, stderr=subprocess.DEVNULL)
+        try:
+            wait_for_socket(socket_path, server)
+            elapsed, private = run_workers(args, messages, "client", socket_path)
+            server_mb = private_mb(server.pid)
+        finally:
+            server.terminate()
+            server.wait()
+    print(f"{args.workers} workers sharing a server:     {elapsed:6.1f}s, "
+          f"{sum(private) + server_mb:6.0f} MB private in total "
+          f"(server {server_mb:.0f} MB, workers {sum(private) / len(private):.0f} MB each)")
+
+
+if __name__ == "__main__":
+    main()
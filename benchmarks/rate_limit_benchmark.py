@@ -0,0 +1,68 @@
+"""
+Rate limit benchmark: a burst of analyze_text calls against a stub API
+that enforces a requests-per-second quota and answers 429 beyond it.
+
+Three async clients are compared:
+  no limit, no retry  what DeepSeekClient used to do (fallback on first 429)
+  retry only          jittered backoff honoring Retry-After, no pacing
+  limit + retry       token bucket matching the quota, plus retries
+
+    python benchmarks/rate_limit_benchmark.py --requests 200 --quota 20
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from deepseek_client_benchmark import ANALYSIS, StubServer  # noqa: E402
+from utils.async_deepseek_client import AsyncDeepSeekClient  # noqa: E402
+from utils.rate_limiter import TokenBucket  # noqa: E402
+
+
+async def run(url, count, rate_per_minute, max_attempts):
+    limiter = TokenBucket(rate_per_minute, burst=5)
+    client = AsyncDeepSeekClient(
+        "stub-key", rate_limiter=limiter, max_attempts=max_attempts, cache_responses=False
+    )
+    client.api_url = url
+    start = time.perf_counter()
+    # The client prints every failed call; keep the report readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = await asyncio.gather(*(client.analyze_text(f"message {i}") for i in range(count)))
+    elapsed = time.perf_counter() - start
+    await client.close()
+    return sum(result == ANALYSIS for result in results), elapsed, client.metrics()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--quota", type=float, default=20.0, help="Stub quota in requests per second")
+    parser.add_argument("--latency", type=float, default=0.05)
+    args = parser.parse_args()
+
+    modes = [
+        ("no limit, no retry", float("inf"), 1),
+        ("retry only", float("inf"), 8),
+        ("limit + retry", args.quota * 60, 8),
+    ]
+    for name, rate_per_minute, max_attempts in modes:
+        server = StubServer(args.latency, rate=args.quota)
+        succeeded, elapsed, metrics = asyncio.run(
+            run(server.url, args.requests, rate_per_minute, max_attempts)
+        )
+        wasted = metrics["rate_limited"] / max(metrics["requests"], 1)
+        print(
+            f"{name:>18}: {succeeded}/{args.requests} succeeded in {elapsed:5.1f}s, "
+            f"{metrics['requests']} calls sent, {metrics['rate_limited']} got 429 ({wasted:.0%}), "
+            f"{metrics['retries']} retries, {metrics['throttled']} throttled"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Response cache benchmark: replays a conversation with repeated messages
+through DeepSeekClient.analyze_text against a stub API, with and without
+the persistent response cache, then once more with a fresh client on the
+same cache file to show it survives restarts.
+
+    python benchmarks/response_cache_benchmark.py --messages 200 --unique 40
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from deepseek_client_benchmark import ANALYSIS, UNLIMITED, StubServer  # noqa: E402
+from utils.deepseek_client import DeepSeekClient  # noqa: E402
+from utils.rate_limiter import TokenBucket  # noqa: E402
+from utils.response_cache import ResponseCache  # noqa: E402
+
+
+def replay(server, messages, cache):
+    client = DeepSeekClient(
+        "stub-key", rate_limiter=TokenBucket(UNLIMITED),
+        response_cache=cache, cache_responses=cache is not None
+    )
+    client.api_url = server.url
+    context = {"conversation_history": [{"text": "hello", "reaction": "happy"}], "current_emotion": "happy"}
+    start = time.perf_counter()
+    results = [client.analyze_text(text, context) for text in messages]
+    elapsed = time.perf_counter() - start
+    assert all(result == ANALYSIS for result in results)
+    return elapsed, client.metrics()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--messages", type=int, default=200)
+    parser.add_argument("--unique", type=int, default=40, help="Distinct messages in the conversation")
+    parser.add_argument("--latency", type=float, default=0.05, help="Stub response time in seconds")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    pool = [f"message number {i}" for i in range(args.unique)]
+    messages = [rng.choice(pool) for _ in range(args.messages)]
+    server = StubServer(args.latency)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "responses.sqlite")
+        runs = [
+            ("no cache", None),
+            ("cold cache", ResponseCache(path)),
+            ("after restart", ResponseCache(path)),
+        ]
+        for name, cache in runs:
+            elapsed, metrics = replay(server, messages, cache)
+            print(
+                f"{name:>13}: {len(messages)} analyses in {elapsed:5.2f}s "
+                f"({elapsed / len(messages) * 1000:6.1f} ms each), "
+                f"{metrics['requests']} API calls, {metrics['cache_hits']} cache hits"
+            )
+            if cache is not None:
+                cache.close()
+
+        # Creative calls stay uncached
+        client = DeepSeekClient("stub-key", rate_limiter=TokenBucket(UNLIMITED), response_cache=ResponseCache(path))
+        client.api_url = server.url
+        client.generate_text("hello")
+        client.generate_text("hello")
+        print(f"generate_text: {client.metrics()['requests']} API calls for 2 identical prompts")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Analysis router benchmark: chat-like traffic through the rules/VADER ->
+semantic -> LLM cascade, reporting the share of messages each tier sees
+and answers and what that costs per message.
+
+The cheap tier runs for real. The expensive tiers are stand-ins that
+answer instantly, the semantic one unsure about --semantic-unsure of what
+it gets; their cost is charged at --semantic-ms and --llm-ms per message,
+typical CPU transformer and LLM API latencies.
+
+    python benchmarks/router_benchmark.py --messages 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cache_benchmark import make_traffic  # noqa: E402
+from app import EmotionAnalyzer  # noqa: E402
+from utils.analysis_router import TIERS, AnalysisRouter  # noqa: E402
+
+
+class SemanticStandIn:
+    """Answers like SemanticAnalyzer.analyze, without the models"""
+
+    def __init__(self, unsure, seed=0):
+        self.unsure = unsure
+        self.rng = random.Random(seed)
+
+    def analyze(self, text):
+        top = 0.3 if self.rng.random() < self.unsure else 0.9
+        return {"sentiment": {}, "emotions": {"joy": top, "neutral": 0.1}, "semantic_features": {}, "text": text}
+
+    def analyze_batch(self, texts):
+        return [self.analyze(text) for text in texts]
+
+
+class SentimentStandIn:
+    """Answers like SentimentAnalyzer.analyze, without the API"""
+
+    def analyze(self, text, context=None):
+        return {"sentiment": "positive", "sentiment_score": 0.5, "suggested_reaction": "happy", "confidence": 0.9}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--messages", type=int, default=100000)
+    parser.add_argument("--unique", type=float, default=0.2, help="Share of never repeated messages")
+    parser.add_argument("--semantic-unsure", type=float, default=0.3)
+    parser.add_argument("--semantic-ms", type=float, default=300.0)
+    parser.add_argument("--llm-ms", type=float, default=2000.0)
+    args = parser.parse_args()
+
+    traffic = make_traffic(args.messages, args.unique)
+    router = AnalysisRouter(EmotionAnalyzer(), SemanticStandIn(args.semantic_unsure), SentimentStandIn())
+
+    start = time.perf_counter()
+    for i in range(0, len(traffic), 1000):
+        router.route_batch(traffic[i:i + 1000])
+    cheap_ms = (time.perf_counter() - start) * 1000 / len(traffic)
+
+    stats = router.stats()
+    for tier in TIERS:
+        print(
+            f"{tier:>8}: saw {stats['reached'][tier] / stats['messages']:6.1%}, "
+            f"answered {stats['handled_fraction'][tier]:6.1%}"
+        )
+
+    routed = cheap_ms + (
+        stats["reached"]["semantic"] * args.semantic_ms + stats["reached"]["llm"] * args.llm_ms
+    ) / stats["messages"]
+    print(f"\nmean cost per message: routed {routed:7.1f} ms, "
+          f"semantic for all {args.semantic_ms:7.1f} ms, LLM for all {args.llm_ms:7.1f} ms "
+          f"(rules/VADER tier itself: {cheap_ms * 1000:.1f} us)")
+
+
+if __name__ == "__main__":
+    main()
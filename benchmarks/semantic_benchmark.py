@@ -0,0 +1,83 @@
+"""
+SemanticAnalyzer benchmark on the same mixed-length chat messages:
+  per message   what analyze used to do: one pipeline call per message,
+                each of its label pairs a forward pass of its own
+  analyze loop  analyze, one message at a time
+  analyze_batch all messages at once, batched within length buckets
+
+Needs the DistilBERT and BART-large-MNLI models (downloaded by
+transformers on first use). --threads sets the intra-op thread count.
+
+    python benchmarks/semantic_benchmark.py --messages 64 --batch-size 32
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.semantic_analyzer import SemanticAnalyzer  # noqa: E402
+
+WORDS = (
+    "the movie was good bad great terrible not very so but really happy day work "
+    "I think we should talk about what happened yesterday at the office because"
+).split()
+
+
+def make_messages(count, seed=0):
+    """Chat-like lengths: mostly short, some long"""
+    rng = random.Random(seed)
+    return [
+        " ".join(rng.choice(WORDS) for _ in range(int(rng.paretovariate(1.2) * 4)))
+        for _ in range(count)
+    ]
+
+
+def analyze_per_message(analyzer, text):
+    """The emotion scores as analyze computed them before batching"""
+    result = analyzer.emotion_classifier(text, candidate_labels=analyzer.emotion_categories, multi_label=True)
+    analyzer.sentiment_analyzer([text])
+    return {"emotions": dict(zip(result["labels"], result["scores"]))}
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--messages", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, default=None)
+    args = parser.parse_args()
+
+    messages = make_messages(args.messages)
+    analyzer = SemanticAnalyzer(num_threads=args.threads)
+    analyzer.analyze_batch(messages[:2])  # Warm up
+
+    runs = [
+        ("per message", lambda: [analyze_per_message(analyzer, text) for text in messages]),
+        ("analyze loop", lambda: [analyzer.analyze(text) for text in messages]),
+        ("analyze_batch", lambda: analyzer.analyze_batch(messages, batch_size=args.batch_size)),
+    ]
+    baseline, base_time = None, None
+    for name, run in runs:
+        results, elapsed = timed(run)
+        if baseline is None:
+            baseline, base_time = results, elapsed
+        drift = max(
+            abs(a["emotions"][label] - b["emotions"][label])
+            for a, b in zip(baseline, results) for label in a["emotions"]
+        )
+        print(
+            f"{name:>13}: {len(messages) / elapsed:6.2f} messages/s ({base_time / elapsed:4.1f}x), "
+            f"largest emotion score difference {drift:.1e}"
+        )
+
+
+if __name__ == "__main__":
+    main()
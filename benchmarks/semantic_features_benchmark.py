@@ -0,0 +1,94 @@
+"""
+Semantic feature extraction benchmark on generated chat messages:
+  per feature   what SemanticAnalyzer did before: seven methods, each
+                lowercasing and splitting the text again and scanning its
+                cue list
+  extract       SemanticFeatureExtractor.extract, one text at a time
+  extract_batch all texts at once, as dicts
+  matrix        all texts at once, as a NumPy matrix
+
+Checks that every way gives the same features as the per-feature methods.
+Needs no models.
+
+    python benchmarks/semantic_features_benchmark.py --messages 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.semantic_features import FEATURES, PHRASE_CUES, WORD_CUES, SemanticFeatureExtractor  # noqa: E402
+
+FILLER = (
+    "the movie was good bad not so but really happy day work I think we should talk "
+    "about what happened yesterday at the office because nobody told me anything"
+).split()
+
+
+def make_messages(count, seed=0):
+    """Chat-like messages, a few of their words cues"""
+    rng = random.Random(seed)
+    cues = [cue for cues in list(WORD_CUES.values()) + list(PHRASE_CUES.values()) for cue in cues]
+    return [
+        " ".join(
+            rng.choice(cues) if rng.random() < 0.15 else rng.choice(FILLER)
+            for _ in range(max(1, int(rng.paretovariate(1.2) * 4)))
+        )
+        for _ in range(count)
+    ]
+
+
+def features_per_feature(text):
+    """The features as the seven SemanticAnalyzer methods computed them"""
+    features = {}
+    for feature in ("intensity", "formality", "certainty", "urgency", "ambiguity"):
+        words = text.lower().split()
+        count = sum(1 for word in words if word in WORD_CUES[feature])
+        ratio = min(1.0, count / len(words))
+        features[feature] = 1.0 - ratio if feature == "certainty" else ratio
+    for feature, cues in PHRASE_CUES.items():
+        text_lower = text.lower()
+        features[feature] = any(cue in text_lower for cue in cues)
+    return {feature: features[feature] for feature in FEATURES}
+
+
+def timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--messages", type=int, default=100000)
+    args = parser.parse_args()
+
+    messages = make_messages(args.messages)
+    extractor = SemanticFeatureExtractor()
+
+    baseline, base_time = timed(lambda: [features_per_feature(text) for text in messages])
+    runs = [
+        ("extract", lambda: [extractor.extract(text) for text in messages]),
+        ("extract_batch", lambda: extractor.extract_batch(messages)),
+        ("matrix", lambda: extractor.matrix(messages)),
+    ]
+    print(f"{'per feature':>13}: {len(messages) / base_time:10.0f} messages/s")
+    for name, run in runs:
+        results, elapsed = timed(run)
+        if name == "matrix":
+            results = [dict(zip(FEATURES, row)) for row in results.tolist()]
+        same = all(
+            float(result[feature]) == float(expected[feature])
+            for result, expected in zip(results, baseline) for feature in FEATURES
+        )
+        print(
+            f"{name:>13}: {len(messages) / elapsed:10.0f} messages/s ({base_time / elapsed:5.1f}x), "
+            f"{'identical' if same else 'DIFFERENT'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""
+SemanticServer under many workers at once, with a stub analyzer that
+takes --latency seconds per model call, so no models are needed:
+--clients SemanticClients in processes of their own connect at the same
+moment and each sends --requests analyses. Reports how many got through,
+the time taken and how many requests the server folded into each model
+call.
+
+Also checks the client's failure paths: a request that times out on a
+reused connection is not sent (and analyzed) a second time, and a server
+that isn't there raises ConnectionError.
+
+    python benchmarks/semantic_server_benchmark.py --clients 50 --requests 5
+"""
+import argparse
+import multiprocessing
+import os
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.semantic_server import SemanticClient, SemanticServer  # noqa: E402
+
+
+class StubAnalyzer:
+    """Takes latency seconds per analyze_batch call, slow_latency for "slow" """
+
+    def __init__(self, latency, slow_latency=0.5):
+        self.latency = latency
+        self.slow_latency = slow_latency
+        self.seen = []
+
+    def load(self):
+        pass
+
+    def analyze_batch(self, texts, batch_size=None):
+        self.seen.extend(texts)
+        time.sleep(self.slow_latency if "slow" in texts else self.latency)
+        return [{"text": text} for text in texts]
+
+
+def start_server(path, analyzer):
+    server = SemanticServer(analyzer, path=path)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    while not os.path.exists(path):
+        time.sleep(0.01)
+    return server
+
+
+def run_client(path, requests, start, results):
+    start.wait()
+    try:
+        with SemanticClient(path) as client:
+            for i in range(requests):
+                assert client.analyze(f"text {i}") == {"text": f"text {i}"}
+        results.put("ok")
+    except Exception as e:
+        results.put(f"{type(e).__name__}: {e}")
+
+
+def check_failures(root):
+    """A timed-out request is sent once; an absent server raises ConnectionError"""
+    path = os.path.join(root, "timeout.sock")
+    analyzer = StubAnalyzer(0.0)
+    server = start_server(path, analyzer)
+    try:
+        client = SemanticClient(path, timeout=0.2)
+        client.analyze("warm up")  # The next request goes over a reused connection
+        try:
+            client.analyze("slow")
+            raise AssertionError("a request outlasting the timeout returned")
+        except ConnectionError:
+            pass
+        time.sleep(analyzer.slow_latency)
+        assert analyzer.seen.count("slow") == 1, analyzer.seen
+        assert client.analyze("again") == {"text": "again"}  # Reconnects
+        client.close()
+    finally:
+        server.close()
+    print("timeout on a reused connection: analyzed once, then reconnected")
+
+    for name, path in [("no socket file", os.path.join(root, "missing.sock")),
+                       ("nothing listening", os.path.join(root, "stale.sock"))]:
+        if name == "nothing listening":
+            # A socket file left behind by a server that is gone
+            stale = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            stale.bind(path)
+            stale.close()
+        start = time.perf_counter()
+        try:
+            SemanticClient(path, connect_timeout=0.3).analyze("hello")
+            raise AssertionError(f"{name}: no ConnectionError")
+        except ConnectionError:
+            pass
+        print(f"{name}: ConnectionError after {(time.perf_counter() - start) * 1000:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--clients", type=int, default=50)
+    parser.add_argument("--requests", type=int, default=5, help="Analyses per client")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds per model call")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, "semantic.sock")
+        server = start_server(path, StubAnalyzer(args.latency))
+        context = multiprocessing.get_context("fork")
+        start, results = context.Event(), context.Queue()
+        workers = [context.Process(target=run_client, args=(path, args.requests, start, results))
+                   for _ in range(args.clients)]
+        for worker in workers:
+            worker.start()
+        began = time.perf_counter()
+        start.set()
+        outcomes = [results.get() for _ in workers]
+        elapsed = time.perf_counter() - began
+        for worker in workers:
+            worker.join()
+        server.close()
+
+        failures = [outcome for outcome in outcomes if outcome != "ok"]
+        stats = server.stats()
+        print(f"{args.clients} clients connecting at once: {args.clients - len(failures)} served "
+              f"in {elapsed:.2f}s, {stats['mean_batch_size']:.1f} requests per model call")
+        for failure in sorted(set(failures)):
+            print(f"  {failures.count(failure)} failed: {failure}")
+        assert not failures
+
+        check_failures(root)
+    print("all checks passed")
+
+
+if __name__ == "__main__":
+    main()
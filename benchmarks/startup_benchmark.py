@@ -0,0 +1,65 @@
+"""
+Startup-time benchmark: cold start (lexicon parsed from the nltk_data
+text file) against warm start (lexicon loaded from the snapshot).
+
+Each measurement runs in a fresh interpreter so import caches do not
+leak between runs.
+
+    python benchmarks/startup_benchmark.py --runs 10
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Time to import the analyzer and classify one message that reaches VADER
+PROBE = """
+import time
+start = time.perf_counter()
+from app import EmotionAnalyzer
+imported = time.perf_counter()
+EmotionAnalyzer().determine_emotion("what a pleasant afternoon")
+done = time.perf_counter()
+print(imported - start, done - start)
+"""
+
+
+def run_probe(snapshot_path):
+    env = dict(os.environ, VADER_SNAPSHOT_PATH=snapshot_path)
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout.split()
+    return float(output[0]), float(output[1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    parser.add_argument("--runs", type=int, default=5, help="Runs per scenario")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot_path = os.path.join(tmp, "vader_lexicon.pickle")
+
+        cold = []
+        for _ in range(args.runs):
+            if os.path.exists(snapshot_path):
+                os.remove(snapshot_path)
+            cold.append(run_probe(snapshot_path))
+
+        # The last cold run left a snapshot behind
+        warm = [run_probe(snapshot_path) for _ in range(args.runs)]
+
+    print(f"{'scenario':<8} {'import (ms)':>12} {'first result (ms)':>18}")
+    for name, runs in (("cold", cold), ("warm", warm)):
+        imports = statistics.median(run[0] for run in runs) * 1000
+        totals = statistics.median(run[1] for run in runs) * 1000
+        print(f"{name:<8} {imports:>12.1f} {totals:>18.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+"""
+Streaming benchmark: generate_text against generate_text_stream on a stub
+that takes --latency seconds before the first word and --token-delay
+seconds per word after it, like an LLM generating a reply.
+
+Without streaming the caller sees nothing until the whole reply is done;
+with it the first words arrive after roughly --latency.
+
+    python benchmarks/streaming_benchmark.py --words 100 --token-delay 0.02
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from deepseek_client_benchmark import UNLIMITED, StubServer  # noqa: E402
+from utils.async_deepseek_client import AsyncDeepSeekClient  # noqa: E402
+from utils.deepseek_client import DeepSeekClient  # noqa: E402
+from utils.rate_limiter import TokenBucket  # noqa: E402
+
+
+def run_sync(url, calls):
+    client = DeepSeekClient("stub-key", rate_limiter=TokenBucket(UNLIMITED))
+    client.api_url = url
+
+    blocking = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        reply = client.generate_text("hello")
+        blocking.append(time.perf_counter() - start)
+
+    streams = []
+    for _ in range(calls):
+        stream = client.generate_text_stream("hello")
+        assert "".join(stream) == reply and not stream.failed
+        streams.append(stream)
+    return blocking, streams
+
+
+async def run_async(url, calls):
+    async with AsyncDeepSeekClient("stub-key", rate_limiter=TokenBucket(UNLIMITED)) as client:
+        client.api_url = url
+
+        async def consume():
+            stream = client.generate_text_stream("hello")
+            async for _ in stream:
+                pass
+            return stream
+
+        return await asyncio.gather(*(consume() for _ in range(calls)))
+
+
+async def consume_async(url, prompt="hello"):
+    async with AsyncDeepSeekClient("stub-key", rate_limiter=TokenBucket(UNLIMITED), max_attempts=1) as client:
+        client.api_url = url
+        stream = client.generate_text_stream(prompt)
+        async for _ in stream:
+            pass
+        return stream
+
+
+def check_faults(reply):
+    """Every broken stream ends with the fallback generate_text returns"""
+    servers = {
+        "HTTP 503": StubServer(0.0, reply=reply, status=503),
+        "cut off mid-stream": StubServer(0.0, reply=reply, stream_fault="cut"),
+        "malformed event": StubServer(0.0, reply=reply, stream_fault="malformed"),
+    }
+    client = DeepSeekClient("stub-key", rate_limiter=TokenBucket(UNLIMITED), max_attempts=1)
+    for name, server in servers.items():
+        client.api_url = server.url
+        with contextlib.redirect_stdout(io.StringIO()):
+            fallback = client._get_fallback_response(json_output=False)
+            if server.status != 200:
+                assert client.generate_text("hello") == fallback
+            sync_stream = client.generate_text_stream("hello")
+            "".join(sync_stream)
+            async_stream = asyncio.run(consume_async(server.url))
+        for stream in (sync_stream, async_stream):
+            assert stream.failed, name
+            assert stream.text.endswith(fallback), (name, stream.text)
+            assert stream.time_to_first_token is not None and stream.latency is not None, name
+        print(f"{name:>18}: failed, ends with the fallback, "
+              f"first text after {sync_stream.time_to_first_token * 1000:.0f} ms, "
+              f"complete after {sync_stream.latency * 1000:.0f} ms (sync)")
+
+
+def report(name, first, total):
+    print(
+        f"{name:>18}: first text after {statistics.median(first) * 1000:6.0f} ms, "
+        f"complete after {statistics.median(total) * 1000:6.0f} ms (medians)"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--calls", type=int, default=5)
+    parser.add_argument("--concurrent", type=int, default=50, help="Streams in flight in the async run")
+    parser.add_argument("--words", type=int, default=100)
+    parser.add_argument("--latency", type=float, default=0.2, help="Seconds before the first word")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Seconds per word")
+    args = parser.parse_args()
+
+    reply = " " + " ".join(f"word{i}" for i in range(args.words)) + "\n"
+    server = StubServer(args.latency, token_delay=args.token_delay, reply=reply)
+
+    blocking, streams = run_sync(server.url, args.calls)
+    report("generate_text", blocking, blocking)
+    report("stream (sync)", [s.time_to_first_token for s in streams], [s.latency for s in streams])
+
+    streams = asyncio.run(run_async(server.url, args.concurrent))
+    assert all(s.text == reply.strip() for s in streams)
+    report(f"stream (async x{args.concurrent})",
+           [s.time_to_first_token for s in streams], [s.latency for s in streams])
+
+    # Nothing listens on the discard port: the fallback reply is yielded
+    client = DeepSeekClient("stub-key", rate_limiter=TokenBucket(UNLIMITED), max_attempts=1)
+    client.api_url = "http://127.0.0.1:9"
+    with contextlib.redirect_stdout(io.StringIO()):
+        stream = client.generate_text_stream("hello")
+        text = "".join(stream)
+    print(f"{'unreachable API':>18}: failed={stream.failed}, yielded {text!r}")
+
+    check_faults(reply)
+    print("all checks passed")
+
+
+if __name__ == "__main__":
+    main()
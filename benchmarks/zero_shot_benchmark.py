@@ -0,0 +1,70 @@
+"""
+Zero-shot emotion scoring of SemanticAnalyzer, three ways:
+  pipeline   the zero-shot-classification pipeline, as analyze_batch
+             called it before
+  exact      ZeroShotEmotionClassifier without a head: the same scores,
+             hypotheses tokenized once and all label pairs batched
+  distilled  the single-pass head, fitted here on --train messages that
+             are not among the timed ones
+
+Reports messages/s and, for the distilled head, how far its scores are
+from the exact ones. Needs the BART-large-MNLI model (downloaded by
+transformers on first use).
+
+    python benchmarks/zero_shot_benchmark.py --messages 32 --train 256
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+from transformers import pipeline  # noqa: E402
+from semantic_benchmark import make_messages, timed  # noqa: E402
+from models.zero_shot import ZeroShotEmotionClassifier  # noqa: E402
+
+LABELS = [
+    "joy", "sadness", "anger", "fear", "surprise", "disgust",
+    "trust", "anticipation", "neutral", "confusion"
+]
+
+
+def as_matrix(results):
+    """Scores of pipeline-format results, columns in LABELS order"""
+    return np.array([[dict(zip(r["labels"], r["scores"]))[label] for label in LABELS] for r in results])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--messages", type=int, default=32)
+    parser.add_argument("--train", type=int, default=256)
+    parser.add_argument("--batch-size", type=int, default=32)
+    args = parser.parse_args()
+
+    messages = make_messages(args.messages)
+    training = make_messages(args.train, seed=1)
+    classifier = pipeline("zero-shot-classification", model="facebook/bart-large-mnli")
+    zero_shot = ZeroShotEmotionClassifier(classifier.model, classifier.tokenizer, LABELS)
+
+    pipeline_results, pipeline_time = timed(lambda: classifier(
+        messages, candidate_labels=LABELS, multi_label=True, batch_size=args.batch_size * len(LABELS)
+    ))
+    exact, exact_time = timed(lambda: zero_shot.exact_scores(messages, args.batch_size))
+
+    report, fit_time = timed(lambda: zero_shot.distill(training, args.batch_size))
+    distilled, distilled_time = timed(lambda: zero_shot.distilled_scores(messages, args.batch_size))
+
+    for name, elapsed in (("pipeline", pipeline_time), ("exact", exact_time), ("distilled", distilled_time)):
+        print(f"{name:>9}: {len(messages) / elapsed:7.2f} messages/s ({pipeline_time / elapsed:5.1f}x)")
+    print(f"exact vs pipeline: largest score difference {np.abs(exact - as_matrix(pipeline_results)).max():.1e}")
+    print(
+        f"distilled vs exact: mean score error {np.abs(distilled - exact).mean():.3f}, "
+        f"top emotion agreement {(distilled.argmax(1) == exact.argmax(1)).mean():.1%} "
+        f"(holdout during the fit: {report['mean_abs_error']:.3f}, {report['top_label_agreement']:.1%}; "
+        f"fit took {fit_time:.0f}s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,25 +1,105 @@
 """
 Configuration settings for the sentiment analysis application
 """
+import os
 
 # Sentiment Analysis settings
 POLARITY_THRESHOLD = 0.1  # Lower threshold for more sensitive sentiment detection
 SUBJECTIVITY_THRESHOLD = 0.3  # Lower threshold for better subjectivity detection
 
+# Lexicon settings
+VADER_LEXICON_PATH = os.environ.get("VADER_LEXICON_PATH")  # Optional bundled vader_lexicon.txt
+VADER_SNAPSHOT_PATH = os.environ.get(
+    "VADER_SNAPSHOT_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "emotion_analyzer", "vader_lexicon.bin")
+)  # Memory-mapped lexicon snapshot shared by all worker processes
+VADER_ALLOW_DOWNLOAD = False  # Fall back to nltk.download when no local lexicon is found
+
+# Cache settings
+EMOTION_CACHE_ENABLED = False  # Cache emotions and VADER scores of repeated messages
+EMOTION_CACHE_SIZE = 10000  # Entries kept in memory; least recently used are evicted
+EMOTION_CACHE_TTL = None  # Seconds a cached entry stays valid; None keeps it until evicted
+EMOTION_CACHE_PATH = os.environ.get("EMOTION_CACHE_PATH")  # Optional SQLite file that keeps the cache across restarts
+EMOTION_CACHE_DISK_SIZE = 1000000  # Entries kept in the on-disk tier
+
+# Streaming settings
+STREAM_CHUNK_SIZE = 256  # Messages scored together in one micro-batch
+STREAM_QUEUE_SIZE = 4  # Micro-batches buffered between pipeline stages
+
+# Semantic analysis settings
+SEMANTIC_BATCH_SIZE = 32  # Texts per forward pass in SemanticAnalyzer.analyze_batch
+SEMANTIC_NUM_THREADS = None  # Intra-op CPU threads for the transformer models; None keeps torch's default
+SEMANTIC_BACKEND = os.environ.get("SEMANTIC_BACKEND", "torch")  # torch (fp32) or onnx-int8 (ONNX Runtime, int8 weights: faster, less memory); int8 and onnx are not recommended
+SEMANTIC_ONNX_CACHE_DIR = os.environ.get(
+    "SEMANTIC_ONNX_CACHE_DIR",
+    os.path.join(os.path.expanduser("~"), ".cache", "emotion_analyzer", "onnx")
+)  # Where the onnx backend keeps its exported graphs
+SEMANTIC_SERVER_SOCKET = os.environ.get(
+    "SEMANTIC_SERVER_SOCKET", "/tmp/emotion_analyzer_semantic.sock"
+)  # Unix socket of the shared model server (app.py serve-semantic)
+SEMANTIC_SERVER_TIMEOUT = 300.0  # Seconds a SemanticClient waits for the server's answer
+SEMANTIC_SERVER_BACKLOG = 1024  # Connections the server queues before accepting them (capped by the kernel's somaxconn)
+SEMANTIC_SERVER_CONNECT_TIMEOUT = 10.0  # Seconds a SemanticClient keeps retrying a busy or refusing server
+SEMANTIC_SERVER_MAX_TEXTS = 256  # Most texts of waiting requests the server analyzes in one call
+SEMANTIC_EMOTION_HEAD_PATH = os.environ.get("SEMANTIC_EMOTION_HEAD_PATH")  # Optional distilled emotion head (.npz); None runs the exact zero-shot model
+
+# Routing settings
+ROUTER_EMOTION_THRESHOLD = 0.6  # Rules/VADER confidence below which a message goes on to the semantic tier
+ROUTER_SEMANTIC_THRESHOLD = 0.5  # Semantic confidence below which a message goes on to the LLM
+ROUTER_COMPOUND_MARGIN = 0.1  # Distance of the VADER compound from a label boundary that counts as certain
+
 # Context settings
 MEMORY_LENGTH = 5  # Number of conversation turns to remember
 CONTEXT_DECAY_FACTOR = 0.8  # How quickly previous context loses importance
 MAX_CONTEXT_LENGTH = 1000  # Maximum characters to store in context
+CONTEXT_STORE_MAX_SESSIONS = 250000  # Conversations a ContextStore keeps; least recently used are evicted
+CONTEXT_STORE_TTL = 3600.0  # Seconds a conversation may stay idle before it is dropped; None keeps it
+CONTEXT_STORE_MEMORY_BUDGET = 512 * 2 ** 20  # Estimated bytes of all conversations before the least recently used are evicted
+EMOTIONAL_MEMORY_PATH = os.environ.get(
+    "EMOTIONAL_MEMORY_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "emotion_analyzer", "emotional_memory.sqlite")
+)  # Append-only store of conversation turns (app.py migrate-memory imports emotional_memory.json)
 
 # Emotion settings
 DEFAULT_EMOTION = "neutral"
 EMOTION_TRANSITION_THRESHOLD = 0.3  # Minimum score difference to trigger emotion change
 EMOTION_SMOOTHING_FACTOR = 0.7  # How quickly emotions transition
+EMOTION_MAPPER_CONFIG_PATH = os.environ.get("EMOTION_MAPPER_CONFIG_PATH")  # Optional JSON emotion_map/transition_rules for EmotionMapper
 SUPPORTED_EMOTIONS = [
     "happy", "sad", "angry", "neutral", "excited", "calm",
     "frustrated", "surprised", "worried", "confident"
 ]
 
+# HTTP service settings (app.py serve)
+HTTP_HOST = os.environ.get("HTTP_HOST", "127.0.0.1")
+HTTP_PORT = int(os.environ.get("HTTP_PORT", "8080"))
+HTTP_WORKERS = 4  # Executor threads running analyses, so the event loop never blocks
+HTTP_BATCH_SIZE = 256  # Most texts of concurrent requests analyzed in one executor call
+HTTP_MAX_PENDING = 20000  # Texts waiting for analysis before requests are turned away with 503
+HTTP_SEMANTIC_WORKERS = 1  # Threads of their own for semantic analyses, so they never hold up the VADER batches
+HTTP_MAX_SEMANTIC_PENDING = 256  # Texts waiting for semantic analysis before "semantic" requests get 503
+HTTP_MAX_BATCH_TEXTS = 1000  # Most texts one /analyze_batch request may send
+HTTP_BACKLOG = 4096  # Connections the listening socket queues before accepting
+HTTP_SHUTDOWN_TIMEOUT = 30.0  # Seconds requests in flight get to finish on shutdown
+
+# DeepSeek API settings
+DEEPSEEK_API_URL = os.environ.get("DEEPSEEK_API_URL", "https://api.deepseek.com")
+DEEPSEEK_MODEL = os.environ.get("DEEPSEEK_MODEL", "deepseek-chat")
+DEEPSEEK_CONNECT_TIMEOUT = 5.0  # Seconds to establish a connection
+DEEPSEEK_READ_TIMEOUT = 60.0  # Seconds to wait for data from the API
+DEEPSEEK_MAX_CONCURRENCY = 256  # Requests in flight at once per async client
+DEEPSEEK_CACHE_PATH = os.environ.get(
+    "DEEPSEEK_CACHE_PATH",
+    os.path.join(os.path.expanduser("~"), ".cache", "emotion_analyzer", "deepseek_responses.sqlite")
+)  # Persistent cache of deterministic analysis responses; empty disables it
+DEEPSEEK_CACHE_TTL = 7 * 24 * 3600  # Seconds a cached response stays valid; None keeps it until evicted
+DEEPSEEK_CACHE_MAX_ENTRIES = 100000  # Least recently used responses are evicted beyond this
+DEEPSEEK_CACHE_MAX_TEMPERATURE = 0.3  # Only JSON calls at or below this temperature are cached
+ANALYSIS_BATCH_WINDOW = 0.015  # Seconds concurrent analyze_text calls are collected into one request
+ANALYSIS_BATCH_SIZE = 8  # Most texts analyzed by one multi-item request
+ANALYSIS_BATCH_MAX_TOKENS = 8192  # Completion token cap of a multi-item request
+ANALYSIS_BATCH_WORKERS = 4  # Multi-item requests in flight at once
+
 # Response settings
 RESPONSE_TEMPERATURE = 0.7  # Controls randomness in response generation
 MAX_RESPONSE_LENGTH = 150  # Maximum length of generated responses
@@ -33,4 +113,7 @@ LOG_FILE = "emotion_analyzer.log"  # Log file path
 
 # Rate limiting
 MAX_REQUESTS_PER_MINUTE = 60  # Maximum API requests per minute
-REQUEST_DELAY = 1.0  # Delay between requests in seconds
\ No newline at end of file
+REQUEST_DELAY = 1.0  # Delay between requests in seconds; also the base of the retry backoff
+RATE_LIMIT_BURST = 5  # Requests that may start back to back before throttling kicks in
+RETRY_MAX_ATTEMPTS = 4  # Attempts per API call on 429, 5xx and connection errors
+RETRY_MAX_DELAY = 30.0  # Longest wait between two attempts in seconds
\ No newline at end of file
@@ -0,0 +1,148 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional
+from config import MEMORY_LENGTH, CONTEXT_STORE_MAX_SESSIONS, CONTEXT_STORE_TTL, CONTEXT_STORE_MEMORY_BUDGET
+from models.context_tracker import ContextTracker
+
+# Bytes an OrderedDict spends per key beyond the key itself (table slot
+# and linked-list node), measured on CPython 3.8-3.12
+_SESSION_OVERHEAD = 100
+
+
+class ContextStore:
+    """
+    Conversation context of many concurrent sessions, keyed by session id.
+
+    A session's ContextTracker is created on first use. Sessions are kept
+    in least recently used order: one idle for ttl seconds expires, and
+    past max_sessions sessions, or once their estimated memory exceeds
+    memory_budget bytes, the least recently used are evicted. Both happen
+    as the store is used, from the idle end, so finding them costs nothing
+    per live session.
+
+    The memory estimate counts each tracker, its turns and their texts;
+    a text shared by several turns or fields is counted every time, so it
+    errs high.
+    Update sessions through update() so that it stays current.
+    """
+
+    def __init__(self, max_sessions: int = CONTEXT_STORE_MAX_SESSIONS,
+                 ttl: Optional[float] = CONTEXT_STORE_TTL,
+                 memory_budget: Optional[int] = CONTEXT_STORE_MEMORY_BUDGET,
+                 memory_length: int = MEMORY_LENGTH):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.memory_budget = memory_budget
+        self.memory_length = memory_length
+        self._sessions: "OrderedDict[Hashable, ContextTracker]" = OrderedDict()
+        self._memory = sys.getsizeof(self._sessions)
+        self._lock = threading.Lock()
+
+        self.created = 0
+        self.evicted = 0
+        self.expired = 0
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, session_id):
+        return session_id in self._sessions
+
+    def get(self, session_id: Hashable) -> ContextTracker:
+        """The session's tracker, started if the session is new"""
+        with self._lock:
+            tracker = self._touch(session_id)
+            self._evict()
+            return tracker
+
+    def update(self, session_id: Hashable, user_input, sentiment_result, machine_reaction) -> ContextTracker:
+        """
+        Update a session's context with new input, sentiment and machine reaction
+        """
+        with self._lock:
+            tracker = self._touch(session_id)
+            before = tracker.memory
+            tracker.update(user_input, sentiment_result, machine_reaction)
+            self._memory += tracker.memory - before
+            self._evict()
+            return tracker
+
+    def get_context_summary(self, session_id: Hashable) -> Dict:
+        """
+        Return a summary of a session's context for response generation
+        """
+        with self._lock:
+            if session_id not in self._sessions:
+                # Not worth starting a session for
+                return ContextTracker(0).get_context_summary()
+            return self._touch(session_id).get_context_summary()
+
+    def drop(self, session_id: Hashable) -> bool:
+        """Forget a session; False if there was none"""
+        with self._lock:
+            tracker = self._sessions.pop(session_id, None)
+            if tracker is None:
+                return False
+            self._release(session_id, tracker)
+            return True
+
+    def evict_idle(self) -> int:
+        """Drop every expired session now; returns how many"""
+        with self._lock:
+            before = self.expired
+            self._expire(time.monotonic())
+            return self.expired - before
+
+    def memory_usage(self) -> int:
+        """Estimated bytes held by the sessions"""
+        return self._memory
+
+    def stats(self) -> Dict:
+        """Live sessions, their estimated memory and how many came and went"""
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "memory_bytes": self._memory,
+                "created": self.created,
+                "evicted": self.evicted,
+                "expired": self.expired
+            }
+
+    def _touch(self, session_id: Hashable) -> ContextTracker:
+        """The session's tracker, now the most recently used"""
+        now = time.monotonic()
+        self._expire(now)
+        tracker = self._sessions.get(session_id)
+        if tracker is None:
+            tracker = ContextTracker(self.memory_length)
+            self._sessions[session_id] = tracker
+            self._memory += tracker.memory + sys.getsizeof(session_id) + _SESSION_OVERHEAD
+            self.created += 1
+        else:
+            self._sessions.move_to_end(session_id)
+        tracker.last_seen = now
+        return tracker
+
+    def _expire(self, now: float):
+        if self.ttl is None:
+            return
+        while self._sessions:
+            session_id = next(iter(self._sessions))
+            if now - self._sessions[session_id].last_seen < self.ttl:
+                return
+            self._release(session_id, self._sessions.pop(session_id))
+            self.expired += 1
+
+    def _evict(self):
+        # The most recently used session stays, however large it is
+        while len(self._sessions) > 1 and (
+            len(self._sessions) > self.max_sessions
+            or (self.memory_budget is not None and self._memory > self.memory_budget)
+        ):
+            self._release(*self._sessions.popitem(last=False))
+            self.evicted += 1
+
+    def _release(self, session_id: Hashable, tracker: ContextTracker):
+        self._memory -= tracker.memory + sys.getsizeof(session_id) + _SESSION_OVERHEAD
@@ -1,43 +1,181 @@
+import sys
 import time
+from typing import List, NamedTuple, Optional
+from config import MEMORY_LENGTH, CONTEXT_DECAY_FACTOR, MAX_CONTEXT_LENGTH
+
+
+class ContextEntry(NamedTuple):
+    """One conversation turn; a tuple, so it carries no per-turn dict"""
+    user_input: str
+    literal_meaning: str
+    sentiment: str
+    sentiment_score: float
+    machine_reaction: str
+    timestamp: float
+
+
+# Bytes of a turn besides its texts: the tuple and its two floats (the
+# sentiment label is one of a few shared strings)
+_TURN_SIZE = sys.getsizeof(ContextEntry("", "", "", 0.0, "", 0.0)) + 2 * sys.getsizeof(0.0)
+
+
+# A turn as it appears in analysis prompts, numbered from the start of
+# the conversation; _line_length must give the length of what it renders
+_LINE = "[{number}] User: {text}\n    Machine reaction: {reaction}\n"
+_LINE_CHARS = len(_LINE.format(number="", text="", reaction=""))
+
+
+def _entry_size(entry: ContextEntry) -> int:
+    """Bytes of a turn, counting texts shared with other turns in full"""
+    return (_TURN_SIZE + sys.getsizeof(entry.user_input) + sys.getsizeof(entry.literal_meaning)
+            + sys.getsizeof(entry.machine_reaction))
+
 
 class ContextTracker:
-    def __init__(self, memory_length=5):
-        self.conversation_history = []
-        self.emotion_history = []
+    """
+    Context of one conversation: its last memory_length turns, the current
+    emotion and topic.
+
+    The turns are kept in a ring buffer (a list of at most memory_length
+    entries and the position of the oldest), so a new turn replaces the
+    oldest in place. With __slots__, a tracker holds no dict either, which
+    keeps many thousands of them cheap (see ContextStore).
+
+    What analysis needs of the context is kept up to date as turns come
+    and go, without going over the history again:
+    - sentiment_trend: the mean sentiment score of the remembered turns,
+      each weighted by decay_factor per turn since, as running sums;
+    - prompt_history: the conversation history section of an analysis
+      prompt, the most recent turns that fit in max_context_length
+      characters. A new turn's line is appended and the lines of turns
+      left behind are cut off the front by their known lengths.
+    """
+
+    __slots__ = (
+        "memory_length", "decay_factor", "max_context_length", "current_emotion", "current_topic",
+        "last_seen", "memory", "turns", "prompt_history", "_turns", "_oldest", "_prompt_turns",
+        "_trend_sum", "_trend_weight"
+    )
+
+    def __init__(self, memory_length=MEMORY_LENGTH,
+                 decay_factor: float = CONTEXT_DECAY_FACTOR,
+                 max_context_length: int = MAX_CONTEXT_LENGTH):
         self.memory_length = memory_length
+        self.decay_factor = decay_factor
+        self.max_context_length = max_context_length
         self.current_emotion = "neutral"
         self.current_topic = None
-        
+        self.last_seen = 0.0
+        self.turns = 0  # Turns so far, remembered or not
+        self.prompt_history = ""
+        self._turns: List[ContextEntry] = []
+        self._oldest = 0
+        self._prompt_turns = 0  # Most recent turns in prompt_history
+        self._trend_sum = 0.0
+        self._trend_weight = 0.0
+        # Estimated bytes held: the tracker, its buffer, its turns and
+        # prompt_history
+        self.memory = (sys.getsizeof(self) + sys.getsizeof([None] * max(memory_length, 0))
+                       + sys.getsizeof(self.prompt_history))
+
+    @property
+    def conversation_history(self) -> List[ContextEntry]:
+        """The remembered turns, oldest first"""
+        return self._turns[self._oldest:] + self._turns[:self._oldest]
+
+    @property
+    def emotion_history(self) -> List[str]:
+        """The machine reactions of the remembered turns, oldest first"""
+        return [entry.machine_reaction for entry in self.conversation_history]
+
+    @property
+    def sentiment_trend(self) -> float:
+        """Decay-weighted mean sentiment score of the remembered turns"""
+        return self._trend_sum / self._trend_weight if self._trend_weight > 0 else 0.0
+
     def update(self, user_input, sentiment_result, machine_reaction):
         """
         Update conversation context with new input, sentiment and machine reaction
         """
-        # Store the full context tuple
-        context_entry = {
-            "user_input": user_input,
-            "literal_meaning": sentiment_result.get("meaning", ""),
-            "sentiment": sentiment_result.get("sentiment", "neutral"),
-            "sentiment_score": sentiment_result.get("sentiment_score", 0.0),
-            "machine_reaction": machine_reaction,
-            "timestamp": time.time()
-        }
-        
-        # Update conversation history
-        self.conversation_history.append(context_entry)
-        if len(self.conversation_history) > self.memory_length:
-            self.conversation_history.pop(0)
-            
-        # Update emotion history
-        self.emotion_history.append(machine_reaction)
-        if len(self.emotion_history) > self.memory_length:
-            self.emotion_history.pop(0)
-            
+        entry = ContextEntry(
+            user_input,
+            sentiment_result.get("meaning", ""),
+            sentiment_result.get("sentiment", "neutral"),
+            sentiment_result.get("sentiment_score", 0.0),
+            machine_reaction,
+            time.time()
+        )
+        self.turns += 1
+        dropped = self._push(entry)
+        if dropped is not entry:
+            self._update_trend(entry, dropped)
+            self._update_prompt_history(entry, dropped)
+
         # Update current emotion
         self.current_emotion = machine_reaction
-        
+
         # Try to identify current topic
         self._update_topic(user_input, sentiment_result)
-        
+
+    def _push(self, entry: ContextEntry) -> Optional[ContextEntry]:
+        """Remember entry; returns the turn it pushed out, if any"""
+        if self.memory_length <= 0:
+            return entry
+        self.memory += _entry_size(entry)
+        if len(self._turns) < self.memory_length:
+            self._turns.append(entry)
+            return None
+        dropped = self._turns[self._oldest]
+        self._turns[self._oldest] = entry
+        self._oldest = (self._oldest + 1) % self.memory_length
+        self.memory -= _entry_size(dropped)
+        return dropped
+
+    def _update_trend(self, entry: ContextEntry, dropped: Optional[ContextEntry]):
+        # Every remembered turn ages by one; the dropped one had aged
+        # memory_length turns by now
+        decay = self.decay_factor
+        self._trend_sum = decay * self._trend_sum + float(entry.sentiment_score or 0.0)
+        self._trend_weight = decay * self._trend_weight + 1.0
+        if dropped is not None:
+            weight = decay ** self.memory_length
+            self._trend_sum -= weight * float(dropped.sentiment_score or 0.0)
+            self._trend_weight -= weight
+
+    def _update_prompt_history(self, entry: ContextEntry, dropped: Optional[ContextEntry]):
+        before = self.prompt_history
+        cut = 0
+        if dropped is not None and self._prompt_turns == self.memory_length:
+            # The oldest line belongs to the turn that was just forgotten
+            cut += self._line_length(self.turns - self._prompt_turns, dropped)
+            self._prompt_turns -= 1
+        history = self.prompt_history + self._render(self.turns, entry)
+        self._prompt_turns += 1
+
+        # The newest line always fits: _render shortens the text to fit
+        total = len(history) - cut
+        while total > self.max_context_length and self._prompt_turns > 1:
+            oldest = self._turns[(self._oldest + len(self._turns) - self._prompt_turns) % len(self._turns)]
+            line = self._line_length(self.turns - self._prompt_turns + 1, oldest)
+            cut += line
+            total -= line
+            self._prompt_turns -= 1
+        self.prompt_history = history[cut:] if cut else history
+        self.memory += sys.getsizeof(self.prompt_history) - sys.getsizeof(before)
+
+    def _text_budget(self, number: int, reaction: str) -> int:
+        """Characters of user text that fit in one prompt line"""
+        return max(0, self.max_context_length - _LINE_CHARS - len(str(number)) - len(reaction))
+
+    def _render(self, number: int, entry: ContextEntry) -> str:
+        text = entry.user_input[:self._text_budget(number, entry.machine_reaction)]
+        return _LINE.format(number=number, text=text, reaction=entry.machine_reaction)
+
+    def _line_length(self, number: int, entry: ContextEntry) -> int:
+        """Length of _render(number, entry), without rendering it"""
+        text = min(len(entry.user_input), self._text_budget(number, entry.machine_reaction))
+        return _LINE_CHARS + len(str(number)) + text + len(entry.machine_reaction)
+
     def _update_topic(self, user_input, sentiment_result):
         """Attempt to identify or update the conversation topic"""
         # Simple topic extraction from entities
@@ -45,29 +183,33 @@ class ContextTracker:
         if entities:
             # Use the most prominent entity as the topic
             self.current_topic = entities[0]
-        
+
     def get_context_summary(self):
         """
-        Return a summary of the current context for response generation
+        Return a summary of the current context for response generation.
+
+        Unlike prompt_history and sentiment_trend, the summary is built on
+        each call (about 4 us for 8 turns): its exchanges are a dict per
+        turn, and keeping them would cost about 1 KB more per session.
         """
-        if not self.conversation_history:
+        if not self._turns:
             return {
                 "current_emotion": self.current_emotion,
                 "current_topic": None,
                 "conversation_summary": "This is the beginning of the conversation."
             }
-            
+
         # Create a summary of recent conversation
-        recent_exchanges = []
-        for entry in self.conversation_history:
-            recent_exchanges.append({
-                "user_input": entry["user_input"],
-                "machine_reaction": entry["machine_reaction"]
-            })
-            
+        history = self.conversation_history
+        recent_exchanges = [
+            {"user_input": entry.user_input, "machine_reaction": entry.machine_reaction}
+            for entry in history
+        ]
+
         return {
             "current_emotion": self.current_emotion,
             "current_topic": self.current_topic,
             "conversation_history": recent_exchanges,
-            "emotion_history": self.emotion_history
-        }
\ No newline at end of file
+            "emotion_history": [entry.machine_reaction for entry in history],
+            "sentiment_trend": self.sentiment_trend
+        }
@@ -0,0 +1,285 @@
+import logging
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+import numpy as np
+import torch
+from typing import Dict, Optional, Sequence
+from transformers import AutoConfig, AutoModelForSequenceClassification, AutoTokenizer, pipeline
+from transformers.utils import logging as transformers_logging
+from transformers.modeling_outputs import BaseModelOutput, SequenceClassifierOutput
+from config import SEMANTIC_BACKEND, SEMANTIC_ONNX_CACHE_DIR
+
+# Ways SemanticAnalyzer can run its transformer models on CPU
+BACKENDS = ("torch", "int8", "onnx", "onnx-int8")
+
+# Backends kept for comparison in benchmarks/backend_benchmark.py, which
+# measured them worse than torch; onnx-int8 is the one for less memory
+NOT_RECOMMENDED = {
+    "int8": "dynamic quantization raised RSS above fp32 torch (2.9 GB against 2.3 GB)",
+    "onnx": "plain ONNX Runtime was both slower and larger than fp32 torch"
+}
+
+
+def load_model(name: str, backend: str = SEMANTIC_BACKEND,
+               num_threads: Optional[int] = None,
+               cache_dir: str = SEMANTIC_ONNX_CACHE_DIR):
+    """
+    Sequence classification model name, on one of BACKENDS:
+      torch  the fp32 PyTorch model
+      int8   the PyTorch model with its Linear layers dynamically quantized
+             to int8 (weights stored as int8, activations quantized on the fly)
+      onnx       an OnnxModel, exported to cache_dir on first use
+      onnx-int8  the same with the exported graph's weights quantized to int8
+    All of them can be passed to transformers pipelines. int8 and onnx
+    are not recommended (see NOT_RECOMMENDED); use onnx-int8 for lower
+    latency and memory.
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend {backend!r}; expected one of {', '.join(BACKENDS)}")
+    if backend in NOT_RECOMMENDED:
+        logging.warning(f"Inference backend {backend!r} is not recommended: {NOT_RECOMMENDED[backend]}; "
+                        f"use 'onnx-int8' for lower latency and memory")
+    if backend.startswith("onnx"):
+        return OnnxModel(name, quantized=backend == "onnx-int8", cache_dir=cache_dir, num_threads=num_threads)
+
+    model = AutoModelForSequenceClassification.from_pretrained(name).eval()
+    if backend == "int8":
+        torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    return model
+
+
+def load_pipeline(task: str, name: str, backend: str = SEMANTIC_BACKEND,
+                  num_threads: Optional[int] = None, **options):
+    """transformers pipeline for task, with model name loaded on backend"""
+    model = load_model(name, backend, num_threads=num_threads)
+    tokenizer = AutoTokenizer.from_pretrained(name)
+    if not isinstance(model, OnnxModel):
+        return pipeline(task, model=model, tokenizer=tokenizer, **options)
+
+    # Pipelines know models by their PyTorch class name and log an error
+    # for any other, although OnnxModel works all the same
+    verbosity = transformers_logging.get_verbosity()
+    transformers_logging.set_verbosity(transformers_logging.CRITICAL)
+    try:
+        return pipeline(task, model=model, tokenizer=tokenizer, **options)
+    finally:
+        transformers_logging.set_verbosity(verbosity)
+
+
+def compare_analyses(reference: Sequence[Dict], results: Sequence[Dict]) -> Dict:
+    """
+    Accuracy drift of SemanticAnalyzer results against reference results
+    for the same texts: the largest and mean absolute score differences,
+    and how often both agree on the sentiment label and the top emotion
+    """
+    sentiment_diffs, emotion_diffs = [], []
+    sentiment_agree = emotion_agree = 0
+    for expected, actual in zip(reference, results):
+        for key, diffs in (("sentiment", sentiment_diffs), ("emotions", emotion_diffs)):
+            diffs.extend(abs(expected[key][label] - actual[key][label]) for label in expected[key])
+        sentiment_agree += _top(expected["sentiment"]) == _top(actual["sentiment"])
+        emotion_agree += _top(expected["emotions"]) == _top(actual["emotions"])
+
+    count = len(reference)
+    return {
+        "texts": count,
+        "sentiment_max_error": max(sentiment_diffs, default=0.0),
+        "sentiment_mean_error": float(np.mean(sentiment_diffs)) if sentiment_diffs else 0.0,
+        "sentiment_agreement": sentiment_agree / count if count else 1.0,
+        "emotion_max_error": max(emotion_diffs, default=0.0),
+        "emotion_mean_error": float(np.mean(emotion_diffs)) if emotion_diffs else 0.0,
+        "top_emotion_agreement": emotion_agree / count if count else 1.0
+    }
+
+
+def _top(scores: Dict[str, float]) -> str:
+    return max(scores, key=scores.get)
+
+
+class OnnxModel:
+    """
+    ONNX Runtime stand-in for a transformers sequence classification model.
+
+    Called like the PyTorch model (input_ids and attention_mask in, an
+    output with .logits out) and has get_encoder() for encoder-decoder
+    models, so pipelines and ZeroShotEmotionClassifier take it as is. The
+    PyTorch model is loaded only to export a graph that is not in the
+    cache yet; afterwards a process needs just the config and the graph.
+    Graphs are exported and loaded on first use, so the encoder graph only
+    exists where a distilled emotion head asks for it.
+
+    With quantized set, the graphs' weights are quantized to int8 after
+    export (activations are quantized on the fly), for a fraction of the
+    memory and latency of fp32 at some accuracy drift.
+
+    Exported graphs are kept under cache_dir/<model name>/<graph>; delete
+    that directory to export again, e.g. after the model was updated.
+    """
+
+    device = torch.device("cpu")
+    dtype = torch.float32
+
+    def __init__(self, name: str, quantized: bool = False,
+                 cache_dir: str = SEMANTIC_ONNX_CACHE_DIR,
+                 num_threads: Optional[int] = None):
+        try:
+            import onnxruntime
+        except ImportError:
+            raise ImportError("The onnx inference backend needs onnxruntime: pip install onnxruntime") from None
+        self._onnxruntime = onnxruntime
+
+        self.name = name
+        self.config = AutoConfig.from_pretrained(name)
+        self.quantized = quantized
+        self.directory = os.path.join(cache_dir, name.replace("/", "--"))
+        self.num_threads = num_threads
+        self._sessions = {}
+
+    def __call__(self, input_ids, attention_mask=None, **kwargs) -> SequenceClassifierOutput:
+        return SequenceClassifierOutput(logits=self._run("model", input_ids, attention_mask))
+
+    forward = __call__
+
+    def get_encoder(self):
+        return _OnnxEncoder(self)
+
+    def eval(self):
+        return self
+
+    def to(self, *args, **kwargs):
+        return self
+
+    def can_generate(self) -> bool:
+        return False
+
+    def graph_path(self, graph: str) -> str:
+        return os.path.join(self.directory, graph, "model.onnx")
+
+    def export(self, graph: str):
+        """Export graph ("model" or "encoder") from the PyTorch model into the cache"""
+        model = AutoModelForSequenceClassification.from_pretrained(self.name).eval()
+        if graph == "model":
+            module, output = _Logits(model), "logits"
+        else:
+            module, output = _EncoderStates(model.get_encoder()), "last_hidden_state"
+
+        # Text pairs, as the zero-shot model sees them; the batch and
+        # sequence sizes stay dynamic
+        example = AutoTokenizer.from_pretrained(self.name)(
+            ["An example message", "A somewhat longer example message"],
+            ["This example is joy.", "This example is fear."],
+            padding=True,
+            return_tensors="pt"
+        )
+        with self._staging(graph) as staging:
+            torch.onnx.export(
+                module,
+                (example["input_ids"], example["attention_mask"]),
+                os.path.join(staging, "model.onnx"),
+                input_names=["input_ids", "attention_mask"],
+                output_names=[output],
+                dynamic_axes={
+                    "input_ids": {0: "batch", 1: "sequence"},
+                    "attention_mask": {0: "batch", 1: "sequence"},
+                    output: {0: "batch"} if graph == "model" else {0: "batch", 1: "sequence"}
+                },
+                opset_version=17,
+                dynamo=False
+            )
+
+    def quantize_graph(self, graph: str):
+        """Write the int8 version of graph into the cache, exporting it first if needed"""
+        try:
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+        except ImportError:
+            raise ImportError("Quantizing ONNX graphs needs onnx: pip install onnx") from None
+        if not os.path.exists(self.graph_path(graph)):
+            self.export(graph)
+        with self._staging(f"{graph}-int8") as staging:
+            quantize_dynamic(
+                self.graph_path(graph),
+                os.path.join(staging, "model.onnx"),
+                weight_type=QuantType.QInt8
+            )
+
+    @contextmanager
+    def _staging(self, graph: str):
+        """
+        Directory to write graph into; moved into the cache in whole when
+        done, so a concurrent or interrupted export never leaves half a
+        graph behind
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        staging = tempfile.mkdtemp(dir=self.directory, prefix=f".{graph}-")
+        try:
+            yield staging
+            try:
+                os.rename(staging, os.path.dirname(self.graph_path(graph)))
+            except OSError:
+                # Another process finished the same graph first
+                if not os.path.exists(self.graph_path(graph)):
+                    raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def _session(self, graph: str):
+        session = self._sessions.get(graph)
+        if session is None:
+            name = f"{graph}-int8" if self.quantized else graph
+            if not os.path.exists(self.graph_path(name)):
+                if self.quantized:
+                    self.quantize_graph(graph)
+                else:
+                    self.export(graph)
+            options = self._onnxruntime.SessionOptions()
+            if self.num_threads:
+                options.intra_op_num_threads = self.num_threads
+            session = self._onnxruntime.InferenceSession(
+                self.graph_path(name), options, providers=["CPUExecutionProvider"]
+            )
+            self._sessions[graph] = session
+        return session
+
+    def _run(self, graph: str, input_ids, attention_mask) -> torch.Tensor:
+        if attention_mask is None:
+            attention_mask = torch.ones_like(input_ids)
+        feed = {
+            "input_ids": np.asarray(input_ids, dtype=np.int64),
+            "attention_mask": np.asarray(attention_mask, dtype=np.int64)
+        }
+        return torch.from_numpy(self._session(graph).run(None, feed)[0])
+
+
+class _OnnxEncoder:
+    """The encoder half of an OnnxModel, called like model.get_encoder()"""
+
+    def __init__(self, model: OnnxModel):
+        self.model = model
+
+    def __call__(self, input_ids, attention_mask=None, **kwargs) -> BaseModelOutput:
+        return BaseModelOutput(last_hidden_state=self.model._run("encoder", input_ids, attention_mask))
+
+
+class _Logits(torch.nn.Module):
+    """Tensor-only forward for export: logits of (input_ids, attention_mask)"""
+
+    def __init__(self, model):
+        super().__init__()
+        self.model = model
+
+    def forward(self, input_ids, attention_mask):
+        options = {"use_cache": False} if self.model.config.is_encoder_decoder else {}
+        return self.model(input_ids=input_ids, attention_mask=attention_mask, **options).logits
+
+
+class _EncoderStates(torch.nn.Module):
+    """Tensor-only forward for export: last encoder hidden states"""
+
+    def __init__(self, encoder):
+        super().__init__()
+        self.encoder = encoder
+
+    def forward(self, input_ids, attention_mask):
+        return self.encoder(input_ids=input_ids, attention_mask=attention_mask).last_hidden_state
@@ -0,0 +1,207 @@
+import os
+import pickle
+import numpy as np
+from typing import Dict, Iterable, Optional, Tuple
+from config import VADER_LEXICON_PATH, VADER_SNAPSHOT_PATH, VADER_ALLOW_DOWNLOAD
+
+# Location of the lexicon inside nltk_data
+VADER_RESOURCE = "sentiment/vader_lexicon.zip/vader_lexicon/vader_lexicon.txt"
+
+
+class VaderLexicon:
+    """
+    Array-backed VADER lexicon: a sorted table of UTF-8 tokens plus a
+    parallel float32 valence array, so many tokens can be looked up in
+    one vectorized call.
+
+    Saved lexicons are opened with np.memmap, so every worker process on
+    a host maps the same read-only pages instead of holding a private
+    dictionary of ~7,500 entries.
+    """
+
+    MAGIC = b"VADERLX1"
+    # Layout: magic, token count, token width, constants length
+    HEADER = np.dtype([("magic", "S8"), ("count", "<u4"), ("width", "<u4"), ("extra", "<u8")])
+
+    # Lexicon valences have at most this many decimals; float32 storage
+    # is rounded back to them so scores match the float64 lexicon exactly
+    DECIMALS = 4
+
+    def __init__(self, tokens: np.ndarray, valences: np.ndarray):
+        self.tokens = tokens
+        self.valences = valences
+
+    @classmethod
+    def from_dict(cls, lexicon: Dict[str, float]) -> "VaderLexicon":
+        """Build the array lexicon from a word -> valence mapping"""
+        words = sorted(lexicon)
+        tokens = np.array([word.encode("utf-8") for word in words], dtype=bytes)
+        valences = np.array([lexicon[word] for word in words], dtype=np.float32)
+        return cls(tokens, valences)
+
+    def to_dict(self) -> Dict[str, float]:
+        """Return the lexicon as a word -> valence dictionary"""
+        valences = np.round(self.valences.astype(np.float64), self.DECIMALS)
+        return {
+            token.decode("utf-8"): float(valence)
+            for token, valence in zip(self.tokens.tolist(), valences)
+        }
+
+    def save(self, path: str, extra: bytes = b""):
+        """
+        Write the lexicon in its memory-mappable layout.
+
+        extra is an opaque blob stored after the header (the snapshot
+        keeps VADER's constants there). The file is replaced atomically.
+        """
+        header = np.zeros(1, dtype=self.HEADER)
+        header["magic"] = self.MAGIC
+        header["count"] = len(self.tokens)
+        header["width"] = self.tokens.dtype.itemsize
+        header["extra"] = len(extra)
+
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(header.tobytes())
+            f.write(extra)
+            f.write(self.tokens.tobytes())
+            # Keep the valence array 4-byte aligned
+            f.write(b"\0" * (-f.tell() % 4))
+            f.write(self.valences.astype("<f4").tobytes())
+        os.replace(temp_path, path)
+
+    @classmethod
+    def open(cls, path: str) -> Tuple["VaderLexicon", bytes]:
+        """Memory-map a saved lexicon; returns the lexicon and its extra blob"""
+        with open(path, "rb") as f:
+            header = np.frombuffer(f.read(cls.HEADER.itemsize), dtype=cls.HEADER)
+            if len(header) != 1 or header["magic"][0] != cls.MAGIC:
+                raise ValueError(f"{path} is not a saved VADER lexicon")
+            count = int(header["count"][0])
+            width = int(header["width"][0])
+            extra = f.read(int(header["extra"][0]))
+
+        offset = cls.HEADER.itemsize + len(extra)
+        tokens = np.memmap(path, dtype=f"S{width}", mode="r", offset=offset, shape=(count,))
+        offset += count * width
+        offset += -offset % 4
+        valences = np.memmap(path, dtype="<f4", mode="r", offset=offset, shape=(count,))
+        # Plain ndarray views skip np.memmap's per-operation overhead
+        return cls(tokens.view(np.ndarray), valences.view(np.ndarray)), extra
+
+    def __len__(self) -> int:
+        return len(self.tokens)
+
+    def __contains__(self, word: str) -> bool:
+        return bool(self.lookup([word])[1][0])
+
+    def lookup(self, words: Iterable[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Look up many words at once.
+
+        Returns the valence of each word (0.0 when missing) and a boolean
+        mask telling which words are in the lexicon.
+        """
+        query = np.array([word.encode("utf-8") for word in words], dtype=bytes)
+        if not len(query) or not len(self.tokens):
+            return np.zeros(len(query)), np.zeros(len(query), dtype=bool)
+
+        positions = np.searchsorted(self.tokens, query)
+        positions = np.minimum(positions, len(self.tokens) - 1)
+        hits = self.tokens[positions] == query
+        valences = np.round(self.valences[positions].astype(np.float64), self.DECIMALS)
+        return np.where(hits, valences, 0.0), hits
+
+
+def read_vader_lexicon(path: Optional[str] = VADER_LEXICON_PATH,
+                       allow_download: bool = VADER_ALLOW_DOWNLOAD) -> str:
+    """
+    Read the VADER lexicon text without touching the network.
+
+    Looks for a bundled lexicon file first, then in the local nltk_data
+    directories. Only downloads it when allow_download is set.
+    """
+    if path:
+        with open(os.path.expanduser(path), encoding="utf-8") as f:
+            return f.read()
+
+    import nltk.data
+    try:
+        return nltk.data.load(VADER_RESOURCE, format="text", cache=False)
+    except LookupError:
+        if not allow_download:
+            raise LookupError(
+                "VADER lexicon not found. Install it with "
+                "'python -m nltk.downloader vader_lexicon' or set VADER_LEXICON_PATH."
+            )
+
+    import nltk
+    nltk.download("vader_lexicon", quiet=True)
+    return nltk.data.load(VADER_RESOURCE, format="text", cache=False)
+
+
+def parse_vader_lexicon(text: str) -> Dict[str, float]:
+    """Convert lexicon text to a word -> valence dictionary"""
+    lexicon = {}
+    for line in text.split("\n"):
+        if not line.strip():
+            continue
+        (word, measure) = line.strip().split("\t")[0:2]
+        lexicon[word] = float(measure)
+    return lexicon
+
+
+def vader_constants() -> Dict:
+    """Copy the word lists and constants VADER scores with out of nltk"""
+    from nltk.sentiment.vader import VaderConstants
+
+    return {
+        name: getattr(VaderConstants, name)
+        for name in (
+            "B_INCR", "B_DECR", "C_INCR", "N_SCALAR", "NEGATE",
+            "BOOSTER_DICT", "SPECIAL_CASE_IDIOMS", "PUNC_LIST"
+        )
+    }
+
+
+def load_vader_snapshot(snapshot_path: Optional[str] = VADER_SNAPSHOT_PATH,
+                        refresh: bool = False) -> Dict:
+    """
+    Load everything VADER needs to score text, preferring a snapshot.
+
+    Returns a dictionary with the "lexicon" (a VaderLexicon, memory-mapped
+    when it comes from the snapshot) and the "constants" tables. When
+    there is no snapshot (or refresh is set) both are built from nltk and
+    written back as the new snapshot, so later starts need neither the
+    lexicon file nor an nltk import.
+    """
+    if snapshot_path and not refresh and os.path.exists(snapshot_path):
+        try:
+            lexicon, extra = VaderLexicon.open(snapshot_path)
+            return {"lexicon": lexicon, "constants": pickle.loads(extra)}
+        except (OSError, ValueError, pickle.UnpicklingError, EOFError):
+            pass
+
+    lexicon = VaderLexicon.from_dict(parse_vader_lexicon(read_vader_lexicon()))
+    constants = vader_constants()
+    if snapshot_path:
+        try:
+            os.makedirs(os.path.dirname(snapshot_path) or ".", exist_ok=True)
+            lexicon.save(snapshot_path, pickle.dumps(constants, protocol=pickle.HIGHEST_PROTOCOL))
+            lexicon, _ = VaderLexicon.open(snapshot_path)
+        except OSError:
+            # A read-only cache only costs us the fast path on the next start
+            pass
+    return {"lexicon": lexicon, "constants": constants}
+
+
+def create_sentiment_analyzer(lexicon: Optional[Dict[str, float]] = None):
+    """Build an nltk SentimentIntensityAnalyzer from an already parsed lexicon"""
+    from nltk.sentiment.vader import SentimentIntensityAnalyzer, VaderConstants
+
+    # Bypass __init__, which would load and parse the lexicon file again
+    analyzer = SentimentIntensityAnalyzer.__new__(SentimentIntensityAnalyzer)
+    analyzer.lexicon_file = None
+    analyzer.lexicon = lexicon if lexicon is not None else load_vader_snapshot()["lexicon"].to_dict()
+    analyzer.constants = VaderConstants()
+    return analyzer
@@ -0,0 +1,85 @@
+import re
+from operator import methodcaller
+from typing import Dict, List, Optional, Tuple
+
+# Non-ASCII characters that re.IGNORECASE folds onto ASCII letters
+_CASE_FOLDS = str.maketrans({'İ': 'i', 'ı': 'i', 'ſ': 's', 'K': 'k'})
+
+
+class RuleMatcher:
+    """
+    Single-pass matcher for the rule-based emotion patterns.
+
+    Whole-message rules (greetings, bare question words) are combined into
+    one anchored regex with a named group per rule. Everything else comes
+    out of a single tokenizing scan of the lowercased message: words, each
+    with the question mark that directly follows it, if any. Rhetorical
+    questions are recognized by their suffix and strong emotion keywords
+    are found by intersecting the tokens with a keyword table instead of
+    being searched for one pattern at a time.
+
+    Matches are resolved in priority order: message rules, then confused,
+    then rhetorical, then keyword rules in the order given.
+    """
+
+    def __init__(self,
+                 message_rules: List[Tuple[str, str]],
+                 confused_emotion: str,
+                 rhetorical_emotion: str,
+                 rhetorical_words: List[str],
+                 keyword_rules: List[Tuple[str, List[str]]]):
+        self.message_emotions = {}
+        groups = []
+        for index, (emotion, pattern) in enumerate(message_rules):
+            name = f"rule{index}"
+            self.message_emotions[name] = emotion
+            groups.append(f"(?P<{name}>{pattern}$)")
+        self.message_pattern = re.compile("|".join(groups), re.IGNORECASE)
+
+        # Words, each with a directly following question mark
+        self.scanner = re.compile(r"\w+\??")
+
+        self.confused_emotion = confused_emotion
+        self.rhetorical_emotion = rhetorical_emotion
+        self.is_rhetorical = methodcaller(
+            "endswith", tuple(f"{word.lower()}?" for word in rhetorical_words)
+        )
+
+        # Keyword -> (priority, emotion); earlier rules win on duplicates.
+        # Keywords also match with a trailing question mark.
+        self.keywords: Dict[str, Tuple[int, str]] = {}
+        for priority, (emotion, words) in enumerate(keyword_rules):
+            for word in words:
+                self.keywords.setdefault(word.lower(), (priority, emotion))
+                self.keywords.setdefault(f"{word.lower()}?", (priority, emotion))
+        self.keyword_set = frozenset(self.keywords)
+
+    def match(self, text: str) -> Optional[str]:
+        """Return the emotion of the highest-priority matching rule, if any"""
+        hit = self.match_rule(text)
+        return hit[1] if hit else None
+
+    def match_rule(self, text: str) -> Optional[Tuple[str, str]]:
+        """
+        Return (kind, emotion) of the highest-priority matching rule, if any;
+        kind is "message", "confused", "rhetorical" or "keyword"
+        """
+        match = self.message_pattern.match(text)
+        if match:
+            return "message", self.message_emotions[match.lastgroup]
+
+        # Nothing below the message rules outranks a run of question marks
+        if "??" in text:
+            return "confused", self.confused_emotion
+
+        if not text.isascii():
+            text = text.translate(_CASE_FOLDS)
+        tokens = set(self.scanner.findall(text.lower()))
+
+        if "?" in text and any(map(self.is_rhetorical, tokens)):
+            return "rhetorical", self.rhetorical_emotion
+
+        hits = tokens & self.keyword_set
+        if not hits:
+            return None
+        return "keyword", min(self.keywords[word] for word in hits)[1]
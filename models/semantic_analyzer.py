@@ -1,21 +1,33 @@
-from transformers import pipeline
+import threading
+import torch
 import numpy as np
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
+from config import SEMANTIC_BATCH_SIZE, SEMANTIC_NUM_THREADS, SEMANTIC_EMOTION_HEAD_PATH, SEMANTIC_BACKEND
+from models.inference_backend import load_pipeline
+from models.semantic_features import FEATURES, SemanticFeatureExtractor
+from models.zero_shot import ZeroShotEmotionClassifier, length_buckets
 
 class SemanticAnalyzer:
-    def __init__(self):
-        # Initialize sentiment analysis pipeline
-        self.sentiment_analyzer = pipeline(
-            "sentiment-analysis",
-            model="distilbert-base-uncased-finetuned-sst-2-english",
-            return_all_scores=True
-        )
+    def __init__(self, num_threads: Optional[int] = SEMANTIC_NUM_THREADS,
+                 emotion_head_path: Optional[str] = SEMANTIC_EMOTION_HEAD_PATH,
+                 backend: str = SEMANTIC_BACKEND):
+        # Intra-op threads of the CPU kernels (process-wide); torch defaults
+        # to one per core
+        if num_threads:
+            torch.set_num_threads(num_threads)
         
-        # Initialize zero-shot classification for emotion detection
-        self.emotion_classifier = pipeline(
-            "zero-shot-classification",
-            model="facebook/bart-large-mnli"
-        )
+        # How the models run: fp32 PyTorch, int8 PyTorch or ONNX Runtime
+        # (see models/inference_backend.py)
+        self.backend = backend
+        self.num_threads = num_threads
+        self.emotion_head_path = emotion_head_path
+        
+        # The pipelines are loaded on first use (see the properties below),
+        # so an analyzer that is never asked to analyze costs nothing
+        self._sentiment_analyzer = None
+        self._emotion_classifier = None
+        self._zero_shot = None
+        self._load_lock = threading.RLock()
         
         # Define emotion categories
         self.emotion_categories = [
@@ -23,29 +35,122 @@ class SemanticAnalyzer:
             "trust", "anticipation", "neutral", "confusion"
         ]
         
-        # Define semantic features to extract
-        self.semantic_features = [
-            "intensity", "formality", "certainty", "urgency",
-            "sarcasm", "irony", "ambiguity"
-        ]
+        # Define semantic features to extract, all from one pass over the
+        # words of a text (see models/semantic_features.py)
+        self.semantic_features = list(FEATURES)
+        self.feature_extractor = SemanticFeatureExtractor()
+    
+    @property
+    def sentiment_analyzer(self):
+        """Sentiment analysis pipeline, loaded on first use"""
+        if self._sentiment_analyzer is None:
+            with self._load_lock:
+                if self._sentiment_analyzer is None:
+                    # top_k=None returns the scores of all labels
+                    self._sentiment_analyzer = load_pipeline(
+                        "sentiment-analysis",
+                        "distilbert-base-uncased-finetuned-sst-2-english",
+                        self.backend,
+                        num_threads=self.num_threads,
+                        top_k=None
+                    )
+        return self._sentiment_analyzer
+    
+    @property
+    def emotion_classifier(self):
+        """Zero-shot classification pipeline for emotion detection, loaded on first use"""
+        if self._emotion_classifier is None:
+            with self._load_lock:
+                if self._emotion_classifier is None:
+                    self._emotion_classifier = load_pipeline(
+                        "zero-shot-classification",
+                        "facebook/bart-large-mnli",
+                        self.backend,
+                        num_threads=self.num_threads
+                    )
+        return self._emotion_classifier
+    
+    @property
+    def zero_shot(self) -> ZeroShotEmotionClassifier:
+        """
+        The zero-shot model without re-tokenizing the hypotheses for every
+        text; with a distilled head, one encoder pass per text
+        """
+        if self._zero_shot is None:
+            with self._load_lock:
+                if self._zero_shot is None:
+                    zero_shot = ZeroShotEmotionClassifier(
+                        self.emotion_classifier.model,
+                        self.emotion_classifier.tokenizer,
+                        self.emotion_categories
+                    )
+                    if self.emotion_head_path:
+                        zero_shot.load_head(self.emotion_head_path)
+                    self._zero_shot = zero_shot
+        return self._zero_shot
+    
+    def load(self):
+        """
+        Load the models now rather than on first use; one short analysis
+        also loads what the backends load lazily themselves (ONNX sessions)
+        """
+        self.analyze_batch(["Warming up the models."])
         
     def analyze(self, text: str) -> Dict:
         """
         Perform deep semantic analysis of the text
         """
-        # Get sentiment scores
-        sentiment_scores = self.sentiment_analyzer(text)[0]
+        return self.analyze_batch([text])[0]
+        
+    def analyze_batch(self, texts: List[str], batch_size: int = SEMANTIC_BATCH_SIZE) -> List[Dict]:
+        """
+        Perform deep semantic analysis of many texts at once.
         
-        # Get emotion probabilities
-        emotion_results = self.emotion_classifier(
-            text,
-            candidate_labels=self.emotion_categories,
-            multi_label=True
-        )
+        Texts go through the models batch_size at a time (for the zero-shot
+        classifier, batch_size texts times one pair per emotion category).
+        Texts are bucketed by token length first (lengths within a bucket
+        differ by less than 2x) and batched within their bucket, so short
+        messages are never padded to the length of long ones. Results come
+        back in input order.
+        
+        With an emotion head loaded, the emotions come from one encoder pass
+        per text instead of one pass per category (see
+        ZeroShotEmotionClassifier.distill).
+        """
+        texts = list(texts)
+        results = [None] * len(texts)
         
-        # Extract semantic features
-        semantic_features = self._extract_semantic_features(text)
+        # Get emotion probabilities (bucketed by the classifier's own tokens)
+        emotion_results = self.zero_shot(texts, batch_size)
         
+        # Extract semantic features, all texts in one pass
+        semantic_features = self.feature_extractor.extract_batch(texts)
+        
+        with torch.inference_mode():
+            for bucket in self._length_buckets(texts):
+                bucket_texts = [texts[i] for i in bucket]
+                
+                # Get sentiment scores
+                sentiment_scores = self.sentiment_analyzer(bucket_texts, batch_size=batch_size, truncation=True)
+                
+                for i, sentiment in zip(bucket, sentiment_scores):
+                    results[i] = self._represent(texts[i], sentiment, emotion_results[i], semantic_features[i])
+                    
+        return results
+    
+    def _length_buckets(self, texts: List[str]) -> List[List[int]]:
+        """
+        Indices of texts grouped by token length, shortest group first;
+        lengths within a group differ by less than a factor of two
+        """
+        if not texts:
+            return []
+        lengths = [len(ids) for ids in self.sentiment_analyzer.tokenizer(texts, truncation=True)["input_ids"]]
+        return length_buckets(lengths)
+    
+    def _represent(self, text: str, sentiment_scores: List[Dict], emotion_results: Dict,
+                   semantic_features: Dict) -> Dict:
+        """Combine the model outputs for text with its semantic features"""
         # Combine all features into a rich representation
         emotional_representation = {
             'sentiment': {
@@ -65,83 +170,16 @@ class SemanticAnalyzer:
         
         return emotional_representation
     
+    def semantic_feature_matrix(self, texts: List[str]) -> np.ndarray:
+        """
+        Semantic features of many texts as a len(texts) x 7 matrix, columns
+        in self.semantic_features order (sarcasm and irony as 1.0/0.0);
+        needs no models
+        """
+        return self.feature_extractor.matrix(texts)
+    
     def _extract_semantic_features(self, text: str) -> Dict:
         """
         Extract various semantic features from the text
         """
-        features = {}
-        
-        # Analyze intensity (word strength, capitalization, punctuation)
-        features['intensity'] = self._analyze_intensity(text)
-        
-        # Analyze formality (vocabulary, structure)
-        features['formality'] = self._analyze_formality(text)
-        
-        # Analyze certainty (modal verbs, hedging)
-        features['certainty'] = self._analyze_certainty(text)
-        
-        # Analyze urgency (time-related words, imperatives)
-        features['urgency'] = self._analyze_urgency(text)
-        
-        # Analyze sarcasm and irony
-        features['sarcasm'] = self._analyze_sarcasm(text)
-        features['irony'] = self._analyze_irony(text)
-        
-        # Analyze ambiguity
-        features['ambiguity'] = self._analyze_ambiguity(text)
-        
-        return features
-    
-    def _analyze_intensity(self, text: str) -> float:
-        """Analyze text intensity based on various factors"""
-        # Simple implementation - can be enhanced with more sophisticated analysis
-        intensity_words = ['very', 'extremely', 'absolutely', 'totally', 'completely']
-        words = text.lower().split()
-        intensity_count = sum(1 for word in words if word in intensity_words)
-        return min(1.0, intensity_count / len(words))
-    
-    def _analyze_formality(self, text: str) -> float:
-        """Analyze text formality"""
-        # Simple implementation - can be enhanced with more sophisticated analysis
-        formal_words = ['therefore', 'consequently', 'furthermore', 'however', 'thus']
-        words = text.lower().split()
-        formal_count = sum(1 for word in words if word in formal_words)
-        return min(1.0, formal_count / len(words))
-    
-    def _analyze_certainty(self, text: str) -> float:
-        """Analyze text certainty"""
-        # Simple implementation - can be enhanced with more sophisticated analysis
-        uncertainty_words = ['maybe', 'perhaps', 'possibly', 'might', 'could']
-        words = text.lower().split()
-        uncertainty_count = sum(1 for word in words if word in uncertainty_words)
-        return 1.0 - min(1.0, uncertainty_count / len(words))
-    
-    def _analyze_urgency(self, text: str) -> float:
-        """Analyze text urgency"""
-        # Simple implementation - can be enhanced with more sophisticated analysis
-        urgency_words = ['now', 'immediately', 'urgent', 'hurry', 'quick']
-        words = text.lower().split()
-        urgency_count = sum(1 for word in words if word in urgency_words)
-        return min(1.0, urgency_count / len(words))
-    
-    def _analyze_sarcasm(self, text: str) -> float:
-        """Analyze text for sarcasm"""
-        # Simple implementation - can be enhanced with more sophisticated analysis
-        sarcasm_indicators = ['yeah right', 'sure', 'whatever', 'great', 'wow']
-        text_lower = text.lower()
-        return any(indicator in text_lower for indicator in sarcasm_indicators)
-    
-    def _analyze_irony(self, text: str) -> float:
-        """Analyze text for irony"""
-        # Simple implementation - can be enhanced with more sophisticated analysis
-        irony_indicators = ['of course', 'naturally', 'obviously', 'clearly']
-        text_lower = text.lower()
-        return any(indicator in text_lower for indicator in irony_indicators)
-    
-    def _analyze_ambiguity(self, text: str) -> float:
-        """Analyze text ambiguity"""
-        # Simple implementation - can be enhanced with more sophisticated analysis
-        ambiguous_words = ['it', 'this', 'that', 'they', 'them', 'those']
-        words = text.lower().split()
-        ambiguous_count = sum(1 for word in words if word in ambiguous_words)
-        return min(1.0, ambiguous_count / len(words)) 
\ No newline at end of file
+        return self.feature_extractor.extract(text)
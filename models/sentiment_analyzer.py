@@ -31,20 +31,13 @@ class SentimentAnalyzer:
         
     def _prepare_context(self, context):
         """Format context data for the API request"""
-        if not context or not context.conversation_history:
+        if not context or not context.turns:
             return {}
             
-        # Format conversation history for API
-        history = []
-        for entry in context.conversation_history:
-            history.append({
-                "text": entry["user_input"],
-                "reaction": entry["machine_reaction"],
-                "sentiment": entry["sentiment"]
-            })
-            
+        # The tracker keeps the history section of the prompt rendered
         return {
-            "conversation_history": history,
+            "prompt_history": context.prompt_history,
             "current_emotion": context.current_emotion,
-            "current_topic": context.current_topic
-        }
\ No newline at end of file
+            "current_topic": context.current_topic,
+            "sentiment_trend": round(context.sentiment_trend, 2)
+        }
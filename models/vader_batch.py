@@ -0,0 +1,292 @@
+import re
+import string
+import numpy as np
+from typing import Dict, Iterable, List, Optional, Tuple
+from models.lexicon import VaderLexicon, vader_constants
+
+
+class BatchVaderScorer:
+    """
+    Vectorized VADER scoring for many texts at once.
+
+    Reproduces nltk's SentimentIntensityAnalyzer.polarity_scores, but
+    tokenizes each text once, looks lexicon valences up in bulk for the
+    whole batch and does the per-text reductions (sums, punctuation
+    emphasis, normalization) in NumPy.
+    """
+
+    def __init__(self, lexicon: VaderLexicon, constants: Optional[Dict] = None):
+        if constants is None:
+            constants = vader_constants()
+        self.lexicon = lexicon
+        self.booster_dict = constants["BOOSTER_DICT"]
+        self.negate = constants["NEGATE"]
+        self.idioms = constants["SPECIAL_CASE_IDIOMS"]
+        self.c_incr = constants["C_INCR"]
+        self.b_decr = constants["B_DECR"]
+        self.n_scalar = constants["N_SCALAR"]
+        self.punc_set = set(constants["PUNC_LIST"])
+        self.punctuation_pattern = re.compile(f"[{re.escape(string.punctuation)}]")
+
+    def tokenize(self, text: str) -> List[str]:
+        """
+        Split text into VADER words and emoticons.
+
+        Equivalent to SentiText.words_and_emoticons: a single leading or
+        trailing punctuation affix from PUNC_LIST is stripped from a word,
+        everything else (contractions, emoticons) is kept as is.
+        """
+        tokens = []
+        for token in text.split():
+            if len(token) < 2:
+                continue
+            core = token.strip(string.punctuation)
+            if (
+                core != token
+                and len(core) > 1
+                and not self.punctuation_pattern.search(core)
+            ):
+                if token.endswith(core):
+                    affix = token[:-len(core)]
+                elif token.startswith(core):
+                    affix = token[len(core):]
+                else:
+                    affix = None
+                if affix in self.punc_set:
+                    token = core
+            tokens.append(token)
+        return tokens
+
+    def compound_scores(self, texts: Iterable[str]) -> np.ndarray:
+        """Return the rounded VADER compound score of every text"""
+        texts = list(texts)
+        values, segments, _ = self._sentiment_values(texts)
+        compound, _ = self._compound(texts, values, segments)
+        return np.round(compound, 4)
+
+    def polarity_scores(self, texts: Iterable[str]) -> List[Dict[str, float]]:
+        """
+        Return the full VADER scores (neg, neu, pos, compound) of every text,
+        as polarity_scores would.
+        """
+        texts = list(texts)
+        values, segments, token_counts = self._sentiment_values(texts)
+        compound, amplifier = self._compound(texts, values, segments)
+
+        # Words outside the lexicon count as neutral, like VADER's zero sentiments
+        positive = values > 0
+        negative = values < 0
+        pos_sum = np.bincount(segments[positive], weights=values[positive] + 1, minlength=len(texts))
+        neg_sum = np.bincount(segments[negative], weights=values[negative] - 1, minlength=len(texts))
+        neu_count = token_counts - np.bincount(segments[values != 0], minlength=len(texts))
+
+        neg_abs = np.abs(neg_sum)
+        pos_amplified = np.where(pos_sum > neg_abs, pos_sum + amplifier, pos_sum)
+        neg_sum = np.where(pos_sum < neg_abs, neg_sum - amplifier, neg_sum)
+        pos_sum = pos_amplified
+
+        total = pos_sum + np.abs(neg_sum) + neu_count
+        # Texts without words score 0 everywhere
+        total = np.where(token_counts > 0, total, np.inf)
+        neg = np.abs(neg_sum / total).tolist()
+        neu = np.abs(neu_count / total).tolist()
+        pos = np.abs(pos_sum / total).tolist()
+        compound = np.round(compound, 4).tolist()
+
+        # Python's round, which np.round differs from on exact halves
+        return [
+            {"neg": round(n, 3), "neu": round(u, 3), "pos": round(p, 3), "compound": c}
+            for n, u, p, c in zip(neg, neu, pos, compound)
+        ]
+
+    def _sentiment_values(self, texts: List[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Score the sentiment-laden words of every text.
+
+        Returns their valences as one flat array, the index of the text each
+        belongs to, and the number of words in every text.
+        """
+        token_lists = [self.tokenize(text) for text in texts]
+        lowered_lists = [[token.lower() for token in tokens] for tokens in token_lists]
+
+        # Bulk lexicon lookup over the batch vocabulary
+        vocabulary = list({word for lowered in lowered_lists for word in lowered})
+        valences, hits = self.lexicon.lookup(vocabulary)
+        lexicon = {
+            word: float(valence)
+            for word, valence, hit in zip(vocabulary, valences, hits)
+            if hit
+        }
+
+        # Collect the non-zero word sentiments of every text in one flat array
+        values = []
+        segments = []
+        for index, (tokens, lowered) in enumerate(zip(token_lists, lowered_lists)):
+            sentiments = self._sentiments(tokens, lowered, lexicon)
+            values.extend(sentiments)
+            segments.extend([index] * len(sentiments))
+
+        token_counts = np.array([len(tokens) for tokens in token_lists], dtype=np.float64)
+        return (
+            np.array(values, dtype=np.float64),
+            np.array(segments, dtype=np.intp),
+            token_counts
+        )
+
+    def _compound(self, texts: List[str], values: np.ndarray,
+                  segments: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Unrounded compound scores plus the punctuation amplifier of every text"""
+        sums = np.bincount(segments, weights=values, minlength=len(texts))
+
+        # Emphasis from exclamation points and question marks
+        ep_count = np.array([text.count("!") for text in texts], dtype=np.float64)
+        qm_count = np.array([text.count("?") for text in texts], dtype=np.float64)
+        ep_amplifier = np.minimum(ep_count, 4) * 0.292
+        qm_amplifier = np.where(
+            qm_count > 3, 0.96, np.where(qm_count > 1, qm_count * 0.18, 0.0)
+        )
+        amplifier = ep_amplifier + qm_amplifier
+        sums = np.where(sums > 0, sums + amplifier, np.where(sums < 0, sums - amplifier, sums))
+
+        return sums / np.sqrt(sums * sums + 15), amplifier
+
+    def _sentiments(self, tokens: List[str], lowered: List[str],
+                    lexicon: Dict[str, float]) -> List[float]:
+        """Valences of the sentiment-laden words of one text, in order"""
+        if not any(word in lexicon for word in lowered):
+            return []
+
+        allcap_words = sum(1 for token in tokens if token.isupper())
+        is_cap_diff = 0 < len(tokens) - allcap_words < len(tokens)
+
+        # VADER scores every occurrence of a word at its first position
+        first_index = {}
+        for position, token in enumerate(tokens):
+            first_index.setdefault(token, position)
+
+        but_index = lowered.index("but") if "but" in lowered else None
+
+        sentiments = []
+        scored = {}
+        for position, token in enumerate(tokens):
+            word = lowered[position]
+            if word not in lexicon:
+                continue
+            i = first_index[token]
+            if (
+                i < len(tokens) - 1 and word == "kind" and lowered[i + 1] == "of"
+            ) or word in self.booster_dict:
+                continue
+
+            if token not in scored:
+                scored[token] = self._valence(tokens, lowered, lexicon, i, is_cap_diff)
+            valence = scored[token]
+
+            if but_index is not None:
+                if position < but_index:
+                    valence = valence * 0.5
+                elif position > but_index:
+                    valence = valence * 1.5
+            sentiments.append(valence)
+        return sentiments
+
+    def _valence(self, tokens: List[str], lowered: List[str],
+                 lexicon: Dict[str, float], i: int, is_cap_diff: bool) -> float:
+        """Valence of the lexicon word at position i after VADER's modifiers"""
+        valence = lexicon[lowered[i]]
+
+        # Sentiment-laden word in ALL CAPS while others aren't
+        if tokens[i].isupper() and is_cap_diff:
+            if valence > 0:
+                valence += self.c_incr
+            else:
+                valence -= self.c_incr
+
+        for start_i in range(0, 3):
+            if i > start_i and lowered[i - (start_i + 1)] not in lexicon:
+                s = self._scalar_inc_dec(tokens[i - (start_i + 1)], valence, is_cap_diff)
+                if start_i == 1 and s != 0:
+                    s = s * 0.95
+                if start_i == 2 and s != 0:
+                    s = s * 0.9
+                valence = valence + s
+                valence = self._never_check(valence, tokens, start_i, i)
+                if start_i == 2:
+                    valence = self._idioms_check(valence, tokens, i)
+
+        return self._least_check(valence, lowered, lexicon, i)
+
+    def _scalar_inc_dec(self, word: str, valence: float, is_cap_diff: bool) -> float:
+        """Boost or dampen the valence after a booster word"""
+        scalar = 0.0
+        word_lower = word.lower()
+        if word_lower in self.booster_dict:
+            scalar = self.booster_dict[word_lower]
+            if valence < 0:
+                scalar *= -1
+            # Booster word in ALL CAPS while others aren't
+            if word.isupper() and is_cap_diff:
+                if valence > 0:
+                    scalar += self.c_incr
+                else:
+                    scalar -= self.c_incr
+        return scalar
+
+    def _negated(self, word: str) -> bool:
+        """Single-word form of VaderConstants.negated"""
+        word = word.lower()
+        return word in self.negate or "n't" in word
+
+    def _never_check(self, valence: float, tokens: List[str], start_i: int, i: int) -> float:
+        if start_i == 0:
+            if self._negated(tokens[i - 1]):
+                valence = valence * self.n_scalar
+        if start_i == 1:
+            if tokens[i - 2] == "never" and tokens[i - 1] in ("so", "this"):
+                valence = valence * 1.5
+            elif self._negated(tokens[i - 2]):
+                valence = valence * self.n_scalar
+        if start_i == 2:
+            if (
+                tokens[i - 3] == "never" and tokens[i - 2] in ("so", "this")
+            ) or tokens[i - 1] in ("so", "this"):
+                valence = valence * 1.25
+            elif self._negated(tokens[i - 3]):
+                valence = valence * self.n_scalar
+        return valence
+
+    def _idioms_check(self, valence: float, tokens: List[str], i: int) -> float:
+        idioms = self.idioms
+        onezero = f"{tokens[i - 1]} {tokens[i]}"
+        twoonezero = f"{tokens[i - 2]} {tokens[i - 1]} {tokens[i]}"
+        twoone = f"{tokens[i - 2]} {tokens[i - 1]}"
+        threetwoone = f"{tokens[i - 3]} {tokens[i - 2]} {tokens[i - 1]}"
+        threetwo = f"{tokens[i - 3]} {tokens[i - 2]}"
+
+        for sequence in (onezero, twoonezero, twoone, threetwoone, threetwo):
+            if sequence in idioms:
+                valence = idioms[sequence]
+                break
+
+        if len(tokens) - 1 > i:
+            zeroone = f"{tokens[i]} {tokens[i + 1]}"
+            if zeroone in idioms:
+                valence = idioms[zeroone]
+        if len(tokens) - 1 > i + 1:
+            zeroonetwo = f"{tokens[i]} {tokens[i + 1]} {tokens[i + 2]}"
+            if zeroonetwo in idioms:
+                valence = idioms[zeroonetwo]
+
+        # Booster/dampener bi-grams such as 'sort of' or 'kind of'
+        if threetwo in self.booster_dict or twoone in self.booster_dict:
+            valence = valence + self.b_decr
+        return valence
+
+    def _least_check(self, valence: float, lowered: List[str],
+                     lexicon: Dict[str, float], i: int) -> float:
+        if i > 1 and lowered[i - 1] not in lexicon and lowered[i - 1] == "least":
+            if lowered[i - 2] != "at" and lowered[i - 2] != "very":
+                valence = valence * self.n_scalar
+        elif i > 0 and lowered[i - 1] not in lexicon and lowered[i - 1] == "least":
+            valence = valence * self.n_scalar
+        return valence
@@ -0,0 +1,203 @@
+import inspect
+import numpy as np
+import torch
+from typing import Dict, List, Optional, Sequence, Tuple
+from config import SEMANTIC_BATCH_SIZE
+
+
+def length_buckets(lengths: Sequence[int]) -> List[List[int]]:
+    """
+    Indices grouped by length, shortest group first; lengths within a group
+    differ by less than a factor of two, so batching inside a group keeps
+    padding low
+    """
+    buckets = {}
+    for i, length in enumerate(lengths):
+        buckets.setdefault(length.bit_length(), []).append(i)
+    return [sorted(bucket, key=lengths.__getitem__) for _, bucket in sorted(buckets.items())]
+
+
+def _special_ids(tokenizer, *texts) -> List[List[int]]:
+    """The special token ids around and between the sequences of an encoding"""
+    encoding = tokenizer(*texts)
+    segments, current, previous = [], [], None
+    for token, sequence in zip(encoding["input_ids"], encoding.sequence_ids(0)):
+        if sequence is None:
+            current.append(token)
+        elif sequence != previous:
+            segments.append(current)
+            current = []
+        previous = sequence if sequence is not None else previous
+    segments.append(current)
+    return segments
+
+
+class ZeroShotEmotionClassifier:
+    """
+    Zero-shot NLI classification of texts against a fixed list of labels.
+
+    Gives what the zero-shot-classification pipeline gives with
+    multi_label=True, in the same format, but does the work that never
+    changes only once: the hypotheses ("This example is joy.") are
+    tokenized when the classifier is built, each text is tokenized once
+    instead of once per label, and the label pairs of many texts go
+    through the model together, batched within length buckets.
+
+    An NLI model reads text and hypothesis together, so every pair still
+    costs a forward pass. distill() removes that: it fits a linear head
+    that predicts all label scores from one encoder pass over the text
+    alone. Once a head is fitted or loaded, it is used instead.
+    """
+
+    def __init__(self, model, tokenizer, labels: Sequence[str],
+                 hypothesis_template: str = "This example is {}."):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.labels = list(labels)
+        self.head: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+        # The hypothesis side never changes
+        self.hypotheses = [
+            tokenizer(hypothesis_template.format(label), add_special_tokens=False)["input_ids"]
+            for label in self.labels
+        ]
+        self._pair_specials = _special_ids(tokenizer, "a", "b")
+        self._single_specials = _special_ids(tokenizer, "a")
+        self.max_length = min(
+            tokenizer.model_max_length,
+            getattr(model.config, "max_position_embeddings", tokenizer.model_max_length)
+        )
+
+        # Same label lookup as the pipeline
+        self.entailment_id = next(
+            (index for label, index in model.config.label2id.items() if label.lower().startswith("entail")),
+            -1
+        )
+        self.contradiction_id = -1 if self.entailment_id == 0 else 0
+        self._forward_options = (
+            {"use_cache": False} if "use_cache" in inspect.signature(model.forward).parameters else {}
+        )
+
+    def __call__(self, texts: Sequence[str], batch_size: int = SEMANTIC_BATCH_SIZE) -> List[Dict]:
+        """Classify texts; one {"sequence", "labels", "scores"} dict per text,
+        labels from the most to the least likely"""
+        texts = list(texts)
+        if self.head is not None:
+            scores = self.distilled_scores(texts, batch_size)
+        else:
+            scores = self.exact_scores(texts, batch_size)
+
+        results = []
+        for text, row in zip(texts, scores):
+            ranking = list(reversed(row.argsort()))
+            results.append({
+                "sequence": text,
+                "labels": [self.labels[i] for i in ranking],
+                "scores": row[ranking].tolist()
+            })
+        return results
+
+    def exact_scores(self, texts: Sequence[str], batch_size: int = SEMANTIC_BATCH_SIZE) -> np.ndarray:
+        """Entailment probability of every label for every text, from the NLI model"""
+        premises = self._tokenize(texts)
+        scores = np.zeros((len(premises), len(self.labels)))
+        for bucket in length_buckets([len(ids) for ids in premises]):
+            for start in range(0, len(bucket), batch_size):
+                chunk = bucket[start:start + batch_size]
+                pairs = [self._pair(premises[i], hypothesis) for i in chunk for hypothesis in self.hypotheses]
+                logits = self._run(self.model, pairs).logits.float().numpy()
+                logits = logits.reshape(len(chunk), len(self.labels), -1)
+                entail_contr = logits[..., [self.contradiction_id, self.entailment_id]]
+                probabilities = np.exp(entail_contr) / np.exp(entail_contr).sum(-1, keepdims=True)
+                scores[chunk] = probabilities[..., 1]
+        return scores
+
+    def distilled_scores(self, texts: Sequence[str], batch_size: int = SEMANTIC_BATCH_SIZE) -> np.ndarray:
+        """Label scores predicted by the fitted head"""
+        weight, bias = self.head
+        return 1.0 / (1.0 + np.exp(-(self._features(texts, batch_size) @ weight + bias)))
+
+    def distill(self, texts: Sequence[str], batch_size: int = SEMANTIC_BATCH_SIZE,
+                holdout: float = 0.2, ridge: float = 1.0) -> Dict:
+        """
+        Fit the single-pass head to the exact scores of texts.
+
+        A holdout share of the texts is kept out of the fit to measure how
+        far the head is from the exact scores; the returned report has the
+        mean absolute score error and how often both agree on the top label.
+        """
+        texts = list(texts)
+        targets = np.clip(self.exact_scores(texts, batch_size), 1e-6, 1 - 1e-6)
+        features = self._features(texts, batch_size)
+
+        order = np.random.default_rng(0).permutation(len(texts))
+        cut = len(texts) - int(len(texts) * holdout)
+        fit, held = order[:cut], (order[cut:] if cut < len(texts) else order)
+
+        # Ridge regression of the exact scores' logits on the features
+        x, y = features[fit], np.log(targets[fit]) - np.log1p(-targets[fit])
+        x_mean, y_mean = x.mean(axis=0), y.mean(axis=0)
+        x = x - x_mean
+        weight = np.linalg.solve(x.T @ x + ridge * np.eye(x.shape[1]), x.T @ (y - y_mean))
+        self.head = (weight.astype(np.float32), (y_mean - x_mean @ weight).astype(np.float32))
+
+        weight, bias = self.head
+        predicted = 1.0 / (1.0 + np.exp(-(features[held] @ weight + bias)))
+        return {
+            "texts": len(fit),
+            "holdout": len(order) - cut,
+            "mean_abs_error": float(np.abs(predicted - targets[held]).mean()),
+            "top_label_agreement": float((predicted.argmax(axis=1) == targets[held].argmax(axis=1)).mean())
+        }
+
+    def save_head(self, path: str):
+        """Write the fitted head to an .npz file"""
+        weight, bias = self.head
+        np.savez(path, weight=weight, bias=bias, labels=np.array(self.labels))
+
+    def load_head(self, path: str):
+        """Use a head written by save_head"""
+        with np.load(path) as data:
+            if data["labels"].tolist() != self.labels:
+                raise ValueError(f"Emotion head {path} was fitted for other labels: {data['labels'].tolist()}")
+            self.head = (data["weight"], data["bias"])
+
+    def _tokenize(self, texts: Sequence[str]) -> List[List[int]]:
+        return self.tokenizer(list(texts), add_special_tokens=False)["input_ids"] if texts else []
+
+    def _pair(self, premise: List[int], hypothesis: List[int]) -> List[int]:
+        """Input ids of a premise/hypothesis pair, the premise truncated to fit"""
+        prefix, middle, suffix = self._pair_specials
+        room = self.max_length - len(prefix) - len(middle) - len(suffix) - len(hypothesis)
+        return prefix + premise[:room] + middle + hypothesis + suffix
+
+    def _features(self, texts: Sequence[str], batch_size: int) -> np.ndarray:
+        """Mean encoder state of each text on its own"""
+        encoder = self.model.get_encoder() if hasattr(self.model, "get_encoder") else self.model.base_model
+        prefix, suffix = self._single_specials
+        room = self.max_length - len(prefix) - len(suffix)
+        sequences = [prefix + ids[:room] + suffix for ids in self._tokenize(texts)]
+
+        features = np.zeros((len(sequences), self.model.config.hidden_size), dtype=np.float32)
+        for bucket in length_buckets([len(ids) for ids in sequences]):
+            for start in range(0, len(bucket), batch_size):
+                chunk = bucket[start:start + batch_size]
+                mask, output = self._run(encoder, [sequences[i] for i in chunk], with_mask=True)
+                states = output.last_hidden_state.float()
+                weights = mask.unsqueeze(-1).float()
+                features[chunk] = ((states * weights).sum(1) / weights.sum(1)).numpy()
+        return features
+
+    def _run(self, module, sequences: List[List[int]], with_mask: bool = False):
+        """Pad sequences into one batch and run module on it"""
+        width = max(len(ids) for ids in sequences)
+        input_ids = torch.full((len(sequences), width), self.tokenizer.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(sequences), width), dtype=torch.long)
+        for row, ids in enumerate(sequences):
+            input_ids[row, :len(ids)] = torch.tensor(ids)
+            attention_mask[row, :len(ids)] = 1
+
+        options = self._forward_options if module is self.model else {}
+        with torch.inference_mode():
+            output = module(input_ids=input_ids, attention_mask=attention_mask, **options)
+        return (attention_mask, output) if with_mask else output
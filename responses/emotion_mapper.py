@@ -1,5 +1,51 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from typing import Dict, List, Optional, Sequence
+from config import (
+    EMOTION_MAPPER_CONFIG_PATH, DEFAULT_EMOTION, EMOTION_SMOOTHING_FACTOR, EMOTION_TRANSITION_THRESHOLD,
+    SUPPORTED_EMOTIONS, CONTEXT_STORE_MAX_SESSIONS, CONTEXT_STORE_TTL
+)
+
+# Sentiments a base emotion is looked up by; any other counts as neutral
+SENTIMENTS = ("positive", "negative", "neutral")
+_NEUTRAL = SENTIMENTS.index("neutral")
+
+# Most keys EmotionMapper compiles or remembers for per-turn lookups
+_MAX_EMOTION_KEYS = 4096
+
+# Below this many sessions stepped together on average, EmotionStates
+# replays turns one at a time
+_TURNS_PER_STEP = 8
+
+
 class EmotionMapper:
-    def __init__(self):
+    """
+    Maps sentiment analysis results to the machine's emotion.
+
+    The emotion map and transition rules below (or those of a JSON file
+    with "emotion_map" and "transition_rules") are compiled at init into
+    integer-coded tables: every emotion gets an id, and
+    - base_table[sentiment, intensity above INTENSITY_THRESHOLD, subjective]
+      is the base emotion,
+    - category_of[emotion] the category it belongs to,
+    - transitions[previous emotion, category] the transitional emotion, or
+      -1 where no rule applies, and next_emotion[previous emotion, base
+      emotion] both steps at once.
+    map_sentiment_to_emotion looks a turn up in one dict compiled from
+    them, and map_batch does whole arrays of turns at once.
+
+    map_smoothed is the other mode: rather than following transition_rules,
+    each session's emotion is smoothed over its turns by an EmotionStates.
+    """
+
+    # Intensity above which a sentiment maps to the stronger emotion
+    INTENSITY_THRESHOLD = 0.5
+
+    def __init__(self, config_path: Optional[str] = EMOTION_MAPPER_CONFIG_PATH,
+                 states: Optional["EmotionStates"] = None):
         # Define emotion mappings and thresholds
         self.emotion_map = {
             "threat": ["scared", "defensive", "cautious", "alarmed", "threatened"],
@@ -41,6 +87,91 @@ class EmotionMapper:
             }
         }
         
+        if config_path:
+            with open(config_path, encoding="utf-8") as f:
+                config = json.load(f)
+            self.emotion_map = config.get("emotion_map", self.emotion_map)
+            self.transition_rules = config.get("transition_rules", self.transition_rules)
+        self._compile()
+        
+        # Smoothed mode: base emotions as ids of the states' emotions; any
+        # the states do not know count as theirs by default
+        self.states = states if states is not None else EmotionStates()
+        self._observed = np.array([
+            self.states.emotion_ids.get(emotion, self.states.default) for emotion in self.emotions
+        ], dtype=np.int64)
+        self._observed_list = self._observed.tolist()
+        
+    def _compile(self):
+        """Build the lookup tables from emotion_map and transition_rules"""
+        # Base emotions by sentiment, intensity bucket and subjectivity
+        base = {
+            ("positive", 0): "happy", ("positive", 1): "excited",
+            ("negative", 0): "sad", ("negative", 1): "angry",
+            ("neutral", 0): "neutral", ("neutral", 1): "neutral"
+        }
+        subjective = {"neutral": "calm", "happy": "excited", "sad": "frustrated"}
+        
+        self.emotions: List[str] = []
+        self.emotion_ids: Dict[str, int] = {}
+        names = list(base.values()) + list(subjective.values())
+        names += [emotion for emotions in self.emotion_map.values() for emotion in emotions]
+        for previous, rules in self.transition_rules.items():
+            names += [previous] + list(rules.values())
+        for name in names:
+            if name not in self.emotion_ids:
+                self.emotion_ids[name] = len(self.emotions)
+                self.emotions.append(name)
+        
+        self.categories = list(self.emotion_map)
+        if "neutral" not in self.categories:
+            self.categories.append("neutral")
+        self.category_ids = {category: i for i, category in enumerate(self.categories)}
+        
+        # The first category listing an emotion claims it; the rest are neutral
+        category_of = np.full(len(self.emotions), self.category_ids["neutral"], dtype=np.int64)
+        for category, emotions in reversed(list(self.emotion_map.items())):
+            category_of[[self.emotion_ids[emotion] for emotion in emotions]] = self.category_ids[category]
+        self.category_of = category_of
+        
+        transitions = np.full((len(self.emotions), len(self.categories)), -1, dtype=np.int64)
+        for previous, rules in self.transition_rules.items():
+            for category, emotion in rules.items():
+                if category in self.category_ids:
+                    transitions[self.emotion_ids[previous], self.category_ids[category]] = self.emotion_ids[emotion]
+        self.transitions = transitions
+        
+        base_table = np.zeros((len(SENTIMENTS), 2, 2), dtype=np.int64)
+        for (sentiment, strong), emotion in base.items():
+            base_table[SENTIMENTS.index(sentiment), strong] = [
+                self.emotion_ids[emotion], self.emotion_ids[subjective.get(emotion, emotion)]
+            ]
+        self.base_table = base_table
+        
+        # Both steps of a transition in one table: the emotion that follows
+        # a previous emotion when the base emotion is another
+        followed = transitions[:, category_of]
+        self.next_emotion = np.where(followed >= 0, followed, np.arange(len(self.emotions)))
+        
+        # Every turn map_sentiment_to_emotion can see, as one dict from
+        # (sentiment, strong, subjective, previous emotion or None) to the
+        # emotion's name
+        self._emotion_of = {}
+        for (i, strong, subjective), base_emotion in np.ndenumerate(base_table):
+            key = (SENTIMENTS[i], bool(strong), bool(subjective))
+            self._emotion_of[key + (None,)] = self.emotions[base_emotion]
+            for previous in self.emotions:
+                emotion = self.next_emotion[self.emotion_ids[previous], base_emotion]
+                self._emotion_of[key + (previous,)] = self.emotions[emotion]
+        
+        # The tables as lists, which index faster one turn at a time
+        self._sentiment_ids = {sentiment: i for i, sentiment in enumerate(SENTIMENTS)}
+        self._base_rows = {sentiment: base_table[i].tolist() for i, sentiment in enumerate(SENTIMENTS)}
+        self._category_of = category_of.tolist()
+        self._next_rows = {
+            previous: self.next_emotion[self.emotion_ids[previous]].tolist() for previous in self.transition_rules
+        }
+        
     def map_sentiment_to_emotion(self, sentiment_data, context):
         """
         Map sentiment analysis results to machine emotion considering:
@@ -48,58 +179,308 @@ class EmotionMapper:
         2. Appropriate machine reaction
         3. Previous emotional state
         """
-        # Get sentiment and intensity from analysis
-        sentiment = sentiment_data.get('sentiment', 'neutral')
-        intensity = sentiment_data.get('intensity', 0)
-        is_subjective = sentiment_data.get('is_subjective', False)
-        
-        # Map sentiment to base emotion
-        if sentiment == "positive":
-            if intensity > 0.5:
-                base_emotion = "excited"
-            else:
-                base_emotion = "happy"
-        elif sentiment == "negative":
-            if intensity > 0.5:
-                base_emotion = "angry"
-            else:
-                base_emotion = "sad"
+        # No previous emotion without context
+        previous = context.current_emotion if context and context.emotion_history else None
+        key = (
+            sentiment_data.get('sentiment', 'neutral'),
+            sentiment_data.get('intensity', 0) > self.INTENSITY_THRESHOLD,
+            sentiment_data.get('is_subjective', False),
+            previous
+        )
+        emotion = self._emotion_of.get(key)
+        if emotion is None:
+            # Other values map like the key they normalize to; remember
+            # them too, up to a bound, so they are one lookup next time
+            emotion = self._emotion_of[self._normalize(*key)]
+            if len(self._emotion_of) < _MAX_EMOTION_KEYS:
+                self._emotion_of[key] = emotion
+        return emotion
+        
+    def map_smoothed(self, session: str, sentiment_data: Dict) -> str:
+        """
+        The emotion of a session after a turn, smoothed over the session's
+        turns: the base emotion of the turn updates the session's emotion
+        probabilities, and the emotion changes only once another leads by
+        the states' threshold
+        """
+        observed = self._observed_list[self._base_emotion(sentiment_data)]
+        return self.states.emotions[self.states.update(session, observed)]
+        
+    def map_smoothed_batch(self, sessions: Sequence[str], sentiments: Sequence,
+                           intensities: Sequence[float],
+                           subjective: Optional[Sequence[bool]] = None) -> np.ndarray:
+        """
+        map_smoothed for arrays of turns, in order, of any number of
+        sessions. Returns the ids of the emotions after each turn;
+        self.states.emotions names them.
+        """
+        observed = self._observed[self.map_batch(sentiments, intensities, subjective)]
+        return self.states.update_batch(sessions, observed)
+        
+    def map_batch(self, sentiments: Sequence, intensities: Sequence[float],
+                  subjective: Optional[Sequence[bool]] = None,
+                  previous: Optional[Sequence] = None) -> np.ndarray:
+        """
+        map_sentiment_to_emotion for arrays of turns: sentiments (labels or
+        indexes into SENTIMENTS), intensities, optionally whether each is
+        subjective and the previous machine emotion of its conversation
+        (names or ids; None, "" or -1 where there is no context). Returns
+        the emotion ids; self.emotions names them.
+        """
+        sentiments = np.asarray(sentiments)
+        if sentiments.dtype.kind in "USO":
+            labels = sentiments
+            sentiments = np.full(len(labels), _NEUTRAL, dtype=np.int64)
+            for sentiment, i in self._sentiment_ids.items():
+                sentiments[labels == sentiment] = i
         else:
-            base_emotion = "neutral"
-            
-        # Adjust emotion based on subjectivity
-        if is_subjective:
-            if base_emotion == "neutral":
-                base_emotion = "calm"
-            elif base_emotion == "happy":
-                base_emotion = "excited"
-            elif base_emotion == "sad":
-                base_emotion = "frustrated"
-                
-        # If no previous context, return the base emotion
-        if not context or not context.emotion_history:
-            return base_emotion
-            
-        # Get previous emotion
-        previous_emotion = context.current_emotion
-        
-        # Apply transition rules for smoother emotion changes
-        if previous_emotion in self.transition_rules:
-            transition_map = self.transition_rules[previous_emotion]
-            
-            # Find the emotion category for the base emotion
-            category = self._find_category(base_emotion)
-            
-            if category in transition_map:
-                # Return transitional emotion
-                return transition_map[category]
-        
-        # If no transition rule applies, return base emotion
-        return base_emotion
+            sentiments = sentiments.astype(np.int64)
+        strong = (np.asarray(intensities, dtype=np.float64) > self.INTENSITY_THRESHOLD).astype(np.int64)
+        subjective = np.zeros_like(strong) if subjective is None else np.asarray(subjective).astype(bool)
+        emotions = self.base_table[sentiments, strong, subjective.astype(np.int64)]
+        if previous is None:
+            return emotions
+        
+        previous = self.emotion_codes(previous)
+        known = previous >= 0
+        emotions[known] = self.next_emotion[previous[known], emotions[known]]
+        return emotions
+        
+    def emotion_codes(self, emotions: Sequence) -> np.ndarray:
+        """Ids of emotion names (-1 for unknown ones and no emotion); ids
+        are returned as they are"""
+        if isinstance(emotions, np.ndarray) and emotions.dtype.kind in "iu":
+            return emotions.astype(np.int64)
+        if isinstance(emotions, np.ndarray):
+            emotions = emotions.tolist()
+        ids = self.emotion_ids
+        return np.fromiter(
+            (emotion if isinstance(emotion, int) else ids.get(emotion, -1) for emotion in emotions),
+            dtype=np.int64, count=len(emotions)
+        )
+        
+    def _normalize(self, sentiment, strong, subjective, previous):
+        """The _emotion_of key of a turn with any values: other sentiments
+        are neutral, and unknown previous emotions count as none"""
+        return (
+            sentiment if sentiment in self._sentiment_ids else 'neutral',
+            bool(strong),
+            bool(subjective),
+            previous if previous in self.emotion_ids else None
+        )
+        
+    def _base_emotion(self, sentiment_data: Dict) -> int:
+        """Id of the base emotion by sentiment, intensity and subjectivity"""
+        row = self._base_rows.get(sentiment_data.get('sentiment', 'neutral'), self._base_rows['neutral'])
+        # int(), as a NumPy intensity compares to a numpy.bool that can't index a list
+        strong = int(sentiment_data.get('intensity', 0) > self.INTENSITY_THRESHOLD)
+        return row[strong][int(bool(sentiment_data.get('is_subjective', False)))]
         
     def _find_category(self, emotion):
         """Find which category an emotion belongs to"""
-        for category, emotions in self.emotion_map.items():
-            if emotion in emotions:
-                return category
-        return "neutral"
\ No newline at end of file
+        emotion_id = self.emotion_ids.get(emotion)
+        if emotion_id is None:
+            return "neutral"
+        return self.categories[self._category_of[emotion_id]]
+
+
+class EmotionStates:
+    """
+    Smoothed emotions of many sessions.
+
+    Each session has a probability vector over emotions (one float32 row
+    of probabilities) and the emotion it currently shows (current). A turn
+    that observes an emotion takes one exponential smoothing step,
+
+        probabilities = smoothing * probabilities + (1 - smoothing) * observed
+
+    with observed the one-hot vector of the emotion, so smoothing is the
+    share of the previous probabilities a turn keeps. The emotion shown
+    changes to the most probable one only once that leads it by more than
+    threshold, so one odd turn does not flip it. New sessions start all
+    on default.
+
+    Sessions are kept in least recently used order, like ContextStore's
+    and by default with its limits: one idle for ttl seconds expires, and
+    past max_sessions sessions the least recently used are evicted, as
+    the states are used. drop() forgets a session at once. Rows of
+    sessions gone are reused, and the arrays double when full.
+    update_batch replays turns of many sessions at once: it steps every
+    session with a turn left together, so it takes as many NumPy steps as
+    the most turns one session has (or goes one turn at a time, if that
+    is faster).
+    """
+
+    def __init__(self, emotions: Sequence[str] = SUPPORTED_EMOTIONS,
+                 smoothing: float = EMOTION_SMOOTHING_FACTOR,
+                 threshold: float = EMOTION_TRANSITION_THRESHOLD,
+                 default: str = DEFAULT_EMOTION,
+                 max_sessions: int = CONTEXT_STORE_MAX_SESSIONS,
+                 ttl: Optional[float] = CONTEXT_STORE_TTL,
+                 capacity: int = 1024):
+        self.emotions = list(emotions)
+        self.emotion_ids = {emotion: i for i, emotion in enumerate(self.emotions)}
+        if default not in self.emotion_ids:
+            raise ValueError(f"Default emotion {default!r} is not one of the emotions")
+        self.default = self.emotion_ids[default]
+        self.smoothing = np.float32(smoothing)
+        self.observed_weight = np.float32(1 - smoothing)
+        self.threshold = np.float32(threshold)
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        
+        self.probabilities = np.zeros((max(capacity, 1), len(self.emotions)), dtype=np.float32)
+        self.current = np.zeros(len(self.probabilities), dtype=np.min_scalar_type(len(self.emotions)))
+        self.last_seen = np.zeros(len(self.probabilities), dtype=np.float64)
+        self._rows: "OrderedDict[str, int]" = OrderedDict()
+        self._free: List[int] = []
+        self._lock = threading.Lock()
+        
+        self.evicted = 0
+        self.expired = 0
+        
+    def __len__(self) -> int:
+        return len(self._rows)
+        
+    def __contains__(self, session) -> bool:
+        return session in self._rows
+        
+    def emotion(self, session: str) -> str:
+        """The emotion a session shows; default for unknown sessions"""
+        with self._lock:
+            row = self._rows.get(session)
+            return self.emotions[self.current[row] if row is not None else self.default]
+        
+    def distribution(self, session: str) -> Dict[str, float]:
+        """A session's emotion probabilities"""
+        with self._lock:
+            row = self._rows.get(session)
+            if row is None:
+                return {emotion: float(i == self.default) for i, emotion in enumerate(self.emotions)}
+            return dict(zip(self.emotions, self.probabilities[row].tolist()))
+        
+    def update(self, session: str, observed: int) -> int:
+        """One turn of a session observing the emotion of id observed;
+        returns the id of the emotion the session shows after it"""
+        with self._lock:
+            now = time.monotonic()
+            current = self._step(self._row(session, now), observed)
+            self._sweep(now)
+            return current
+        
+    def update_batch(self, sessions: Sequence[str], observed: Sequence[int]) -> np.ndarray:
+        """
+        update for turns in order: the turn i of sessions[i] observing
+        observed[i]. Returns the id of the emotion each session shows after
+        each of its turns.
+        """
+        with self._lock:
+            now = time.monotonic()
+            shown = self._replay(sessions, np.asarray(observed, dtype=np.int64), now)
+            # Only now: sessions of this batch must keep their rows until
+            # it is replayed
+            self._sweep(now)
+            return shown
+        
+    def evict_idle(self) -> int:
+        """Drop every expired session now; returns how many"""
+        with self._lock:
+            before = self.expired
+            self._sweep(time.monotonic())
+            return self.expired - before
+        
+    def _replay(self, sessions: Sequence[str], observed: np.ndarray, now: float) -> np.ndarray:
+        rows = np.fromiter((self._row(session, now) for session in sessions), dtype=np.int64, count=len(observed))
+        shown = np.empty(len(rows), dtype=np.int64)
+        if not len(rows):
+            return shown
+        
+        # Number each session's turns in order, then step the turns of the
+        # same number together: those are of different sessions
+        order = np.argsort(rows, kind="stable")
+        first = np.ones(len(rows), dtype=bool)
+        first[1:] = rows[order][1:] != rows[order][:-1]
+        starts = np.flatnonzero(first)
+        number = np.empty(len(rows), dtype=np.int64)
+        number[order] = np.arange(len(rows)) - np.repeat(starts, np.diff(np.append(starts, len(rows))))
+        by_number = np.argsort(number, kind="stable")
+        bounds = np.cumsum(np.bincount(number))
+        if len(bounds) * _TURNS_PER_STEP > len(rows):
+            # Few sessions with many turns each: one turn at a time is faster
+            for i, (row, emotion) in enumerate(zip(rows.tolist(), observed.tolist())):
+                shown[i] = self._step(row, emotion)
+            return shown
+        
+        
+        start = 0
+        for end in bounds:
+            turns = by_number[start:end]
+            start = end
+            step_rows = rows[turns]
+            everyone = np.arange(len(turns))
+            probabilities = self.probabilities[step_rows]
+            probabilities *= self.smoothing
+            probabilities[everyone, observed[turns]] += self.observed_weight
+            current = self.current[step_rows].astype(np.int64)
+            best = probabilities.argmax(axis=1)
+            change = probabilities[everyone, best] - probabilities[everyone, current] > self.threshold
+            current[change] = best[change]
+            self.probabilities[step_rows] = probabilities
+            self.current[step_rows] = current
+            shown[turns] = current
+        return shown
+        
+    def drop(self, session: str) -> bool:
+        """Forget a session; returns whether there was one"""
+        with self._lock:
+            row = self._rows.pop(session, None)
+            if row is None:
+                return False
+            self._free.append(row)
+            return True
+        
+    def _step(self, row: int, observed: int) -> int:
+        """One smoothing step of the session in row"""
+        probabilities = self.probabilities[row]
+        probabilities *= self.smoothing
+        probabilities[observed] += self.observed_weight
+        current = self.current[row]
+        best = probabilities.argmax()
+        if probabilities[best] - probabilities[current] > self.threshold:
+            self.current[row] = current = best
+        return int(current)
+        
+    def _row(self, session: str, now: float) -> int:
+        """The row of a session, now the most recently used, starting a new
+        one all on default"""
+        row = self._rows.get(session)
+        if row is not None:
+            self._rows.move_to_end(session)
+            self.last_seen[row] = now
+            return row
+        if self._free:
+            row = self._free.pop()
+        else:
+            row = len(self._rows)
+            if row == len(self.probabilities):
+                self.probabilities = np.concatenate([self.probabilities, np.zeros_like(self.probabilities)])
+                self.current = np.concatenate([self.current, np.zeros_like(self.current)])
+                self.last_seen = np.concatenate([self.last_seen, np.zeros_like(self.last_seen)])
+        self.probabilities[row] = 0
+        self.probabilities[row, self.default] = 1
+        self.current[row] = self.default
+        self.last_seen[row] = now
+        self._rows[session] = row
+        return row
+        
+    def _sweep(self, now: float):
+        """Expire idle sessions and evict the least recently used beyond
+        max_sessions, from the idle end"""
+        rows = self._rows
+        if self.ttl is not None:
+            while rows and now - self.last_seen[next(iter(rows.values()))] >= self.ttl:
+                self._free.append(rows.popitem(last=False)[1])
+                self.expired += 1
+        while len(rows) > max(self.max_sessions, 1):
+            self._free.append(rows.popitem(last=False)[1])
+            self.evicted += 1
@@ -0,0 +1,147 @@
+import copy
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Dict, List, Optional
+from config import ANALYSIS_BATCH_WINDOW, ANALYSIS_BATCH_SIZE, ANALYSIS_BATCH_WORKERS
+
+# Tells the dispatcher to send what it has and stop
+_CLOSE = object()
+
+
+class AnalysisBatcher:
+    """
+    Coalesces concurrent analyze_text calls into multi-item requests.
+
+    Calls arriving within window seconds of each other, up to
+    max_batch_size of them, are analyzed by one DeepSeekClient.analyze_texts
+    request, and every caller gets its own result back. A call identical
+    to one still in flight (same text and context) waits for that one
+    instead of being sent again.
+
+    analyze_text has the same arguments and results as the client's, so a
+    batcher can be passed as SentimentAnalyzer's api_client. It is meant
+    for many threads calling at once; a single caller only pays the window
+    as extra latency.
+    """
+
+    def __init__(self, client,
+                 window: float = ANALYSIS_BATCH_WINDOW,
+                 max_batch_size: int = ANALYSIS_BATCH_SIZE,
+                 workers: int = ANALYSIS_BATCH_WORKERS):
+        self.client = client
+        self.window = window
+        self.max_batch_size = max_batch_size
+        self._queue = queue.Queue()
+        self._in_flight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="analysis-batch")
+
+        self.calls = 0
+        self.deduplicated = 0
+        self.batches = 0
+        self.batched_items = 0
+
+        self._dispatcher = threading.Thread(target=self._dispatch, name="analysis-batcher", daemon=True)
+        self._dispatcher.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def analyze_text(self, text, context=None):
+        """
+        Send text to DeepSeek API for sentiment analysis with context
+        """
+        # Deduplicated callers share one result; each gets its own copy
+        return copy.deepcopy(self.submit(text, context).result())
+
+    def generate_text(self, prompt):
+        """Response generation is not batched"""
+        return self.client.generate_text(prompt)
+
+    def submit(self, text, context=None) -> Future:
+        """Queue text for analysis; the future resolves to its result"""
+        key = json.dumps([text, context or {}], sort_keys=True, default=str)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("AnalysisBatcher is closed")
+            self.calls += 1
+            future = self._in_flight.get(key)
+            if future is not None:
+                self.deduplicated += 1
+                return future
+            future = Future()
+            self._in_flight[key] = future
+            # Queued under the lock so nothing lands behind close()
+            self._queue.put((key, text, context, future))
+        return future
+
+    def stats(self) -> Dict:
+        """Batching counters"""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "deduplicated": self.deduplicated,
+                "batches": self.batches,
+                "mean_batch_size": self.batched_items / self.batches if self.batches else 0.0
+            }
+
+    def close(self):
+        """Send whatever is queued, wait for it, and stop"""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(_CLOSE)
+        self._dispatcher.join()
+        self._executor.shutdown(wait=True)
+
+    def _dispatch(self):
+        closing = False
+        while not closing:
+            item = self._queue.get()
+            if item is _CLOSE:
+                return
+
+            batch = [item]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is _CLOSE:
+                    closing = True
+                    break
+                batch.append(item)
+
+            with self._lock:
+                self.batches += 1
+                self.batched_items += len(batch)
+            self._executor.submit(self._run_batch, batch)
+
+    def _run_batch(self, batch: List):
+        try:
+            results: List[Optional[Dict]] = self.client.analyze_texts(
+                [(text, context) for _, text, context, _ in batch]
+            )
+            error = None
+        except Exception as e:
+            results, error = [None] * len(batch), e
+
+        for (key, _, _, future), result in zip(batch, results):
+            with self._lock:
+                self._in_flight.pop(key, None)
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
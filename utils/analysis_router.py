@@ -0,0 +1,171 @@
+import threading
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from app import EmotionAnalyzer
+from config import ROUTER_EMOTION_THRESHOLD, ROUTER_SEMANTIC_THRESHOLD, ROUTER_COMPOUND_MARGIN
+
+# Tiers in the order messages escalate through them
+TIERS = ("emotion", "semantic", "llm")
+
+# Where EmotionAnalyzer's compound score changes from one label to the next
+_COMPOUND_BOUNDARIES = (-0.5, -0.1, 0.1, 0.5)
+
+# How far a rule hit is trusted, by the kind of rule
+_RULE_CONFIDENCE = {"message": 1.0, "confused": 0.9, "keyword": 0.8, "rhetorical": 0.5}
+
+# The polarity a rule's emotion claims; a VADER score against it casts doubt
+_RULE_POLARITY = {"happy": 1, "excited": 1, "angry": -1, "sad": -1}
+
+# SemanticAnalyzer's zero-shot categories as response emotions
+_SEMANTIC_EMOTIONS = {
+    "joy": "happy", "sadness": "sad", "anger": "angry", "fear": "worried",
+    "surprise": "surprised", "disgust": "irritated", "trust": "calm",
+    "anticipation": "excited", "neutral": "neutral", "confusion": "confused"
+}
+
+
+class RoutedAnalysis(NamedTuple):
+    """One message, answered by the cheapest tier confident enough"""
+    text: str
+    emotion: str
+    confidence: float
+    tier: str
+    scores: Dict[str, float]
+    detail: Optional[Dict]
+
+
+def emotion_confidence(hit: Optional[Tuple[str, str]], scores: Dict[str, float]) -> float:
+    """
+    Confidence, from 0 to 1, of the rules/VADER tier in a message's emotion.
+
+    hit is the RuleMatcher.match_rule result and scores the VADER scores.
+    A rule hit is trusted by kind, less so when VADER scores the message
+    against the rule's polarity. Otherwise confidence grows with the
+    distance of the compound score from the nearest label boundary (full
+    at ROUTER_COMPOUND_MARGIN) and shrinks when positive and negative words
+    pull against each other.
+    """
+    compound = scores["compound"]
+    if hit is not None:
+        kind, emotion = hit
+        confidence = _RULE_CONFIDENCE[kind]
+        if _RULE_POLARITY.get(emotion, 0) * compound < -ROUTER_COMPOUND_MARGIN:
+            confidence *= 1.0 - abs(compound)
+        return confidence
+
+    margin = min(abs(compound - boundary) for boundary in _COMPOUND_BOUNDARIES)
+    confidence = min(1.0, margin / ROUTER_COMPOUND_MARGIN)
+    strongest = max(scores["pos"], scores["neg"])
+    if strongest > 0:
+        confidence *= 1.0 - min(scores["pos"], scores["neg"]) / strongest
+    return confidence
+
+
+class AnalysisRouter:
+    """
+    Cascade of analyzers, cheapest first.
+
+    Every message goes through EmotionAnalyzer (rules and VADER, a few
+    microseconds) and gets a confidence from emotion_confidence. Only below
+    emotion_threshold does it go on to the SemanticAnalyzer (transformers,
+    hundreds of milliseconds), and only if that is below semantic_threshold
+    too, to the LLM through SentimentAnalyzer (seconds). Tiers that are not
+    given are skipped. The last tier a message reached answers for it,
+    unless that tier failed (an LLM fallback has no confidence at all), in
+    which case the answer before it stands.
+
+    stats() reports the share of messages each tier saw and answered.
+    """
+
+    def __init__(self,
+                 analyzer: Optional[EmotionAnalyzer] = None,
+                 semantic_analyzer=None,
+                 sentiment_analyzer=None,
+                 emotion_threshold: float = ROUTER_EMOTION_THRESHOLD,
+                 semantic_threshold: float = ROUTER_SEMANTIC_THRESHOLD):
+        self.analyzer = analyzer or EmotionAnalyzer()
+        self.semantic_analyzer = semantic_analyzer
+        self.sentiment_analyzer = sentiment_analyzer
+        self.thresholds = {"emotion": emotion_threshold, "semantic": semantic_threshold}
+
+        self._reached = Counter()
+        self._handled = Counter()
+        self._lock = threading.Lock()
+
+    def route(self, text: str, context=None) -> RoutedAnalysis:
+        """Analyze one message; context is passed on to the LLM tier"""
+        return self.route_batch([text], context)[0]
+
+    def route_batch(self, texts: Iterable[str], context=None) -> List[RoutedAnalysis]:
+        """Analyze messages, every tier taking its share of them as one batch"""
+        texts = list(texts)
+        matcher = self.analyzer.rule_matcher
+        results = [
+            RoutedAnalysis(text, emotion, emotion_confidence(matcher.match_rule(text), scores),
+                           "emotion", scores, None)
+            for text, (emotion, scores) in zip(texts, self.analyzer.analyze_batch(texts))
+        ]
+        reached = Counter(emotion=len(texts))
+
+        pending = list(range(len(texts)))
+        for tier, analyze in self._escalations(context):
+            pending = [i for i in pending if results[i].confidence < self.thresholds[results[i].tier]]
+            reached[tier] += len(pending)
+            if not pending:
+                continue
+            outcomes = analyze([results[i].text for i in pending])
+            for i, (emotion, confidence, detail) in zip(pending, outcomes):
+                if confidence > 0:
+                    results[i] = results[i]._replace(
+                        emotion=emotion, confidence=confidence, tier=tier, detail=detail
+                    )
+
+        with self._lock:
+            self._reached.update(reached)
+            self._handled.update(result.tier for result in results)
+        return results
+
+    def stats(self) -> Dict:
+        """Messages routed, and per tier how many it saw and answered"""
+        with self._lock:
+            total = self._reached["emotion"]
+            return {
+                "messages": total,
+                "reached": {tier: self._reached[tier] for tier in TIERS},
+                "handled": {tier: self._handled[tier] for tier in TIERS},
+                "handled_fraction": {
+                    tier: self._handled[tier] / total if total else 0.0 for tier in TIERS
+                }
+            }
+
+    def _escalations(self, context):
+        """(tier, analyze) of the expensive tiers that are available; analyze
+        takes a list of texts"""
+        if self.semantic_analyzer is not None:
+            yield "semantic", self._semantic
+        if self.sentiment_analyzer is not None:
+            yield "llm", lambda texts: [self._llm(text, context) for text in texts]
+
+    def _semantic(self, texts: List[str]) -> List[Tuple[str, float, Dict]]:
+        outcomes = []
+        for representation in self.semantic_analyzer.analyze_batch(texts):
+            emotions = representation["emotions"]
+            label = max(emotions, key=emotions.get)
+            outcomes.append((_SEMANTIC_EMOTIONS.get(label, "neutral"), float(emotions[label]), representation))
+        return outcomes
+
+    def _llm(self, text: str, context) -> Tuple[str, float, Dict]:
+        result = self.sentiment_analyzer.analyze(text, context)
+        emotion = result["suggested_reaction"]
+        if emotion not in self.analyzer.response_generator.responses:
+            # Free-form reactions fall back to the label of the LLM's score
+            try:
+                score = float(result["sentiment_score"])
+            except (TypeError, ValueError):
+                score = 0.0
+            emotion = self.analyzer._emotion_from_compound(score)
+        try:
+            confidence = float(result["confidence"])
+        except (TypeError, ValueError):
+            confidence = 0.0
+        return emotion, confidence, result
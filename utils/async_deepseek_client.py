@@ -0,0 +1,245 @@
+import asyncio
+import aiohttp
+from tenacity import AsyncRetrying
+from config import (
+    DEEPSEEK_CONNECT_TIMEOUT, DEEPSEEK_READ_TIMEOUT, DEEPSEEK_MAX_CONCURRENCY,
+    RESPONSE_TEMPERATURE, MAX_RESPONSE_LENGTH, RETRY_MAX_ATTEMPTS
+)
+from utils.deepseek_client import DeepSeekClient
+from utils.rate_limiter import APIError
+from utils.text_stream import AsyncTextStream, parse_sse_line
+
+class AsyncDeepSeekClient(DeepSeekClient):
+    """
+    asyncio version of DeepSeekClient.
+
+    analyze_text and generate_text are coroutines with the same arguments
+    and results as the blocking client, and generate_text_stream returns an
+    AsyncTextStream to read with async for. All calls share one pooled
+    aiohttp session with keep-alive connections, so a process pays the
+    TCP+TLS handshake once per connection instead of once per request,
+    and at most max_concurrency requests are in flight at a time.
+
+    Rate limiting, retries, response caching and metrics work as in
+    DeepSeekClient; by default both kinds of client share the same
+    process-wide limiter and cache. Cache lookups are local SQLite reads,
+    cheap next to a round trip, so they run on the event loop.
+
+    Use it as an async context manager, or call close() when done.
+    """
+
+    TRANSIENT_ERRORS = (aiohttp.ClientConnectionError, asyncio.TimeoutError)
+
+    def __init__(self, api_key,
+                 max_concurrency=DEEPSEEK_MAX_CONCURRENCY,
+                 connect_timeout=DEEPSEEK_CONNECT_TIMEOUT,
+                 read_timeout=DEEPSEEK_READ_TIMEOUT,
+                 rate_limiter=None,
+                 max_attempts=RETRY_MAX_ATTEMPTS,
+                 response_cache=None,
+                 cache_responses=True):
+        super().__init__(
+            api_key,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            rate_limiter=rate_limiter,
+            max_attempts=max_attempts,
+            response_cache=response_cache,
+            cache_responses=cache_responses
+        )
+        self.max_concurrency = max_concurrency
+        self._async_session = None
+        self._semaphore = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """Close the pooled connections"""
+        if self._async_session is not None:
+            await self._async_session.close()
+            self._async_session = None
+
+    def _get_session(self):
+        # Created lazily, since aiohttp sessions belong to the running loop
+        if self._async_session is None or self._async_session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_concurrency)
+            timeout = aiohttp.ClientTimeout(
+                total=None,
+                sock_connect=self.connect_timeout,
+                sock_read=self.read_timeout
+            )
+            self._async_session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._async_session
+
+    async def analyze_text(self, text, context=None):
+        """
+        Send text to DeepSeek API for sentiment analysis with context
+        """
+        prompt = self._build_analysis_prompt(text, context)
+        response = await self._call_api(prompt, json_output=True)
+        return self._parse_analysis_response(response)
+
+    async def analyze_texts(self, items):
+        """
+        Analyze several (text, context) pairs with one multi-item request
+        """
+        results = [self._cached_analysis(text, context) for text, context in items]
+        pending = [i for i, result in enumerate(results) if result is None]
+
+        if len(pending) == 1:
+            results[pending[0]] = await self.analyze_text(*items[pending[0]])
+        elif pending:
+            batch = [items[i] for i in pending]
+            prompt, max_tokens = self._build_batch_request(batch)
+            response = await self._call_api(prompt, max_tokens=max_tokens, json_output=True, use_cache=False)
+            for i, analysis in zip(pending, self._parse_batch_response(response, batch)):
+                results[i] = analysis if analysis is not None else await self.analyze_text(*items[i])
+
+        return results
+
+    async def generate_text(self, prompt):
+        """
+        Generate text using DeepSeek API
+        """
+        response = await self._call_api(
+            prompt,
+            temperature=RESPONSE_TEMPERATURE,
+            max_tokens=MAX_RESPONSE_LENGTH
+        )
+
+        return response.strip()
+
+    def generate_text_stream(self, prompt):
+        """
+        Generate text using DeepSeek API, yielding it as it is generated.
+
+        Returns an AsyncTextStream, to be consumed with async for.
+        """
+        headers, data = self._build_request(
+            prompt,
+            temperature=RESPONSE_TEMPERATURE,
+            max_tokens=MAX_RESPONSE_LENGTH
+        )
+        data["stream"] = True
+        return AsyncTextStream(lambda stream: self._stream_api(headers, data, stream))
+
+    async def _call_api(self, prompt, temperature=0.3, max_tokens=500, json_output=False, use_cache=True):
+        """Make the actual API call to DeepSeek, retrying transient failures"""
+        headers, data = self._build_request(prompt, temperature, max_tokens, json_output)
+
+        cache_key = self._cache_key(data) if use_cache else None
+        if cache_key is not None:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                self._count("cache_hits")
+                return cached
+
+        try:
+            async for attempt in AsyncRetrying(**self._retry_options()):
+                with attempt:
+                    content = await self._post_async(headers, data)
+        except APIError as e:
+            print(f"API Error: {e.status}")
+            print(e.body)
+            return self._failed(json_output)
+        except Exception as e:
+            print(f"Error calling DeepSeek API: {str(e) or type(e).__name__}")
+            return self._failed(json_output)
+
+        self._cache_response(cache_key, content)
+        return content
+
+    async def _post_async(self, headers, data):
+        """Send one request once the rate limiter allows it"""
+        session = self._get_session()
+        await self.rate_limiter.acquire_async()
+
+        async with self._semaphore:
+            self._count("requests")
+            async with session.post(
+                f"{self.api_url}/chat/completions",
+                headers=headers,
+                json=data
+            ) as response:
+                if response.status != 200:
+                    raise self._api_error(
+                        response.status, await response.text(), response.headers.get("Retry-After")
+                    )
+
+                result = await response.json(content_type=None)
+                return result["choices"][0]["message"]["content"]
+
+    async def _stream_api(self, headers, data, stream):
+        """Yield the text of a streamed completion, or the fallback response"""
+        try:
+            async for attempt in AsyncRetrying(**self._retry_options()):
+                with attempt:
+                    response = await self._open_stream_async(headers, data)
+        except APIError as e:
+            print(f"API Error: {e.status}")
+            print(e.body)
+            stream.failed = True
+            yield self._failed(json_output=False)
+            return
+        except Exception as e:
+            print(f"Error calling DeepSeek API: {str(e) or type(e).__name__}")
+            stream.failed = True
+            yield self._failed(json_output=False)
+            return
+
+        received = False
+        try:
+            # A server that ignores "stream" answers all at once
+            if response.content_type == "application/json":
+                result = await response.json()
+                yield result["choices"][0]["message"]["content"]
+                return
+
+            async for line in response.content:
+                done, text = parse_sse_line(line.decode("utf-8"))
+                if done:
+                    return
+                if text:
+                    received = True
+                    yield text
+            raise ValueError("Stream ended before [DONE]")
+        except (aiohttp.ClientError, asyncio.TimeoutError, ValueError, KeyError, IndexError) as e:
+            # Text already yielded can't be taken back, so the stream ends
+            # with the fallback generate_text would have returned
+            print(f"Error reading DeepSeek stream: {str(e) or type(e).__name__}")
+            stream.failed = True
+            fallback = self._failed(json_output=False)
+            yield "\n" + fallback if received else fallback
+        finally:
+            response.release()
+            self._semaphore.release()
+
+    async def _open_stream_async(self, headers, data):
+        """Start a streamed request once the rate limiter allows it; the
+        concurrency slot is held until the stream is read"""
+        session = self._get_session()
+        await self.rate_limiter.acquire_async()
+
+        await self._semaphore.acquire()
+        try:
+            self._count("requests")
+            response = await session.post(
+                f"{self.api_url}/chat/completions",
+                headers=headers,
+                json=data
+            )
+            if response.status != 200:
+                error = self._api_error(
+                    response.status, await response.text(), response.headers.get("Retry-After")
+                )
+                response.release()
+                raise error
+        except BaseException:
+            self._semaphore.release()
+            raise
+        return response
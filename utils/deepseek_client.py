@@ -1,12 +1,61 @@
 import json
+import threading
+from collections import Counter
 import requests
-from config import DEEPSEEK_API_URL, DEEPSEEK_MODEL, RESPONSE_TEMPERATURE, MAX_RESPONSE_LENGTH
+from tenacity import Retrying, retry_if_exception, stop_after_attempt
+from config import (
+    DEEPSEEK_API_URL, DEEPSEEK_MODEL, DEEPSEEK_CONNECT_TIMEOUT, DEEPSEEK_READ_TIMEOUT,
+    RESPONSE_TEMPERATURE, MAX_RESPONSE_LENGTH, RETRY_MAX_ATTEMPTS, DEEPSEEK_CACHE_MAX_TEMPERATURE,
+    ANALYSIS_BATCH_MAX_TOKENS
+)
+from utils.rate_limiter import APIError, parse_retry_after, shared_rate_limiter, wait_retry_after
+from utils.response_cache import ResponseCache, shared_response_cache
+from utils.text_stream import TextStream, parse_sse_line
+
+# Fields requested from the model for every analysis
+ANALYSIS_FIELDS = (
+    "- meaning: literal interpretation of the text\n"
+    "- sentiment: positive, negative, neutral, or other appropriate label\n"
+    "- sentiment_score: numerical score from -1.0 to 1.0\n"
+    "- machine_reaction: how the machine should emotionally react\n"
+    "- confidence: confidence score for the analysis\n"
+    "- entities: key entities mentioned in the text\n"
+    "- intent: user's apparent intent (question, statement, command, etc.)\n"
+)
 
 class DeepSeekClient:
-    def __init__(self, api_key):
+    # Failures that say nothing about the request itself, so retrying may help
+    TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout)
+    
+    def __init__(self, api_key, connect_timeout=DEEPSEEK_CONNECT_TIMEOUT, read_timeout=DEEPSEEK_READ_TIMEOUT,
+                 rate_limiter=None, max_attempts=RETRY_MAX_ATTEMPTS,
+                 response_cache=None, cache_responses=True):
         self.api_key = api_key
         self.api_url = DEEPSEEK_API_URL
         self.model = DEEPSEEK_MODEL
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._session = None
+        
+        # Requests are paced by a token bucket shared by every client in
+        # the process; 429s and 5xx are retried with jittered backoff
+        self.rate_limiter = rate_limiter or shared_rate_limiter()
+        self.max_attempts = max_attempts
+        self._metrics = Counter()
+        self._metrics_lock = threading.Lock()
+        
+        # Deterministic analysis calls are read from and written through to
+        # a persistent cache, so repeated conversations skip the round trip
+        if response_cache is None and cache_responses:
+            response_cache = shared_response_cache()
+        self.response_cache = response_cache
+        
+    @property
+    def session(self):
+        """HTTP session reused across calls, so connections are kept alive"""
+        if self._session is None:
+            self._session = requests.Session()
+        return self._session
         
     def analyze_text(self, text, context=None):
         """
@@ -21,6 +70,28 @@ class DeepSeekClient:
         # Parse and structure the response
         return self._parse_analysis_response(response)
         
+    def analyze_texts(self, items):
+        """
+        Analyze several (text, context) pairs with one multi-item request.
+        
+        Results come back in order, as analyze_text would return them.
+        Cached items are not sent again, and items missing from the
+        model's answer are retried one by one.
+        """
+        results = [self._cached_analysis(text, context) for text, context in items]
+        pending = [i for i, result in enumerate(results) if result is None]
+        
+        if len(pending) == 1:
+            results[pending[0]] = self.analyze_text(*items[pending[0]])
+        elif pending:
+            batch = [items[i] for i in pending]
+            prompt, max_tokens = self._build_batch_request(batch)
+            response = self._call_api(prompt, max_tokens=max_tokens, json_output=True, use_cache=False)
+            for i, analysis in zip(pending, self._parse_batch_response(response, batch)):
+                results[i] = analysis if analysis is not None else self.analyze_text(*items[i])
+                
+        return results
+        
     def generate_text(self, prompt):
         """
         Generate text using DeepSeek API
@@ -33,32 +104,100 @@ class DeepSeekClient:
         
         return response.strip()
         
+    def generate_text_stream(self, prompt):
+        """
+        Generate text using DeepSeek API, yielding it as it is generated.
+        
+        Returns a TextStream; see there for the latency it reports.
+        """
+        headers, data = self._build_request(
+            prompt,
+            temperature=RESPONSE_TEMPERATURE,
+            max_tokens=MAX_RESPONSE_LENGTH
+        )
+        data["stream"] = True
+        return TextStream(lambda stream: self._stream_api(headers, data, stream))
+        
     def _build_analysis_prompt(self, text, context=None):
         """Build a prompt that includes context for better analysis"""
         prompt = "Analyze the following text for sentiment, meaning, and appropriate machine reaction:\n\n"
         prompt += f"TEXT: {text}\n\n"
+        prompt += self._format_context(context)
+        prompt += "\nProvide analysis in JSON format with the following fields:\n"
+        prompt += ANALYSIS_FIELDS
+        
+        return prompt
+        
+    def _build_batch_request(self, items):
+        """Build a multi-item analysis prompt and its completion token budget"""
+        prompt = "Analyze each of the following texts for sentiment, meaning, and appropriate machine reaction. "
+        prompt += "Every item is independent and comes with its own conversation history, if any.\n\n"
+        for i, (text, context) in enumerate(items):
+            prompt += f"ITEM {i+1}:\n"
+            prompt += f"TEXT: {text}\n\n"
+            prompt += self._format_context(context)
+            prompt += "\n"
+            
+        prompt += 'Provide analysis in JSON format as an object {"results": [...]} with one entry per item, '
+        prompt += 'in order. Each entry has an "id" field with the item number and the following fields:\n'
+        prompt += ANALYSIS_FIELDS
         
-        if context and context.get("conversation_history"):
-            prompt += "CONVERSATION HISTORY:\n"
-            for i, entry in enumerate(context["conversation_history"]):
-                prompt += f"[{i+1}] User: {entry['text']}\n"
-                prompt += f"    Machine reaction: {entry['reaction']}\n"
+        return prompt, min(ANALYSIS_BATCH_MAX_TOKENS, 500 * len(items))
+        
+    def _parse_batch_response(self, response_text, items):
+        """
+        Split a multi-item answer into one analysis per item; None marks an
+        item the model left out
+        """
+        # The API failed: every item gets the usual fallback analysis
+        if response_text == self._get_fallback_response(json_output=True):
+            return [self._parse_analysis_response(response_text) for _ in items]
             
-            prompt += f"\nCurrent machine emotion: {context.get('current_emotion', 'neutral')}\n"
+        try:
+            entries = json.loads(response_text)["results"]
+        except (ValueError, KeyError, TypeError):
+            print("Failed to parse batched API response")
+            entries = []
             
-        prompt += "\nProvide analysis in JSON format with the following fields:\n"
-        prompt += "- meaning: literal interpretation of the text\n"
-        prompt += "- sentiment: positive, negative, neutral, or other appropriate label\n"
-        prompt += "- sentiment_score: numerical score from -1.0 to 1.0\n"
-        prompt += "- machine_reaction: how the machine should emotionally react\n"
-        prompt += "- confidence: confidence score for the analysis\n"
-        prompt += "- entities: key entities mentioned in the text\n"
-        prompt += "- intent: user's apparent intent (question, statement, command, etc.)\n"
+        by_id = {}
+        for entry in entries if isinstance(entries, list) else []:
+            if isinstance(entry, dict) and "id" in entry:
+                by_id[str(entry.pop("id"))] = entry
+                
+        analyses = []
+        for i, (text, context) in enumerate(items):
+            entry = by_id.get(str(i + 1))
+            if entry is None:
+                analyses.append(None)
+                continue
+            # Cached as if the item had been analyzed on its own
+            self._cache_response(self._analysis_cache_key(text, context), json.dumps(entry))
+            analyses.append(self._normalize_analysis(entry))
+        return analyses
         
-        return prompt
+    def _format_context(self, context):
+        """Conversation history section of an analysis prompt"""
+        if not context:
+            return ""
+            
+        # A ContextTracker's history comes rendered already (prompt_history)
+        history = context.get("prompt_history")
+        if not history:
+            if not context.get("conversation_history"):
+                return ""
+            history = "".join(
+                f"[{i+1}] User: {entry['text']}\n    Machine reaction: {entry['reaction']}\n"
+                for i, entry in enumerate(context["conversation_history"])
+            )
+            
+        section = "CONVERSATION HISTORY:\n" + history
+        section += f"\nCurrent machine emotion: {context.get('current_emotion', 'neutral')}\n"
+        if "sentiment_trend" in context:
+            section += f"Recent sentiment trend: {context['sentiment_trend']:+.2f}\n"
+        return section
         
-    def _call_api(self, prompt, temperature=0.3, max_tokens=500, json_output=False):
-        """Make the actual API call to DeepSeek"""
+    def _build_request(self, prompt, temperature=0.3, max_tokens=500, json_output=False):
+        """Build the headers and JSON body of a chat completion request"""
         headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json"
@@ -73,49 +212,208 @@ class DeepSeekClient:
         
         if json_output:
             data["response_format"] = {"type": "json_object"}
+            
+        return headers, data
+        
+    def _call_api(self, prompt, temperature=0.3, max_tokens=500, json_output=False, use_cache=True):
+        """Make the actual API call to DeepSeek, retrying transient failures"""
+        headers, data = self._build_request(prompt, temperature, max_tokens, json_output)
+        
+        cache_key = self._cache_key(data) if use_cache else None
+        if cache_key is not None:
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                self._count("cache_hits")
+                return cached
         
         try:
-            response = requests.post(
-                f"{self.api_url}/chat/completions",
-                headers=headers,
-                json=data
-            )
+            for attempt in Retrying(**self._retry_options()):
+                with attempt:
+                    content = self._post(headers, data)
+        except APIError as e:
+            print(f"API Error: {e.status}")
+            print(e.body)
+            return self._failed(json_output)
+        except Exception as e:
+            print(f"Error calling DeepSeek API: {str(e)}")
+            return self._failed(json_output)
             
-            if response.status_code != 200:
-                print(f"API Error: {response.status_code}")
-                print(response.text)
-                return self._get_fallback_response(json_output)
-                
-            result = response.json()
-            return result["choices"][0]["message"]["content"]
+        self._cache_response(cache_key, content)
+        return content
+        
+    def _failed(self, json_output):
+        self._count("failures")
+        return self._get_fallback_response(json_output)
+        
+    def _cache_key(self, data):
+        """Fingerprint of a request worth caching, or None"""
+        if self.response_cache is None:
+            return None
+        # Only deterministic calls: JSON analysis at a low temperature
+        if "response_format" not in data or data["temperature"] > DEEPSEEK_CACHE_MAX_TEMPERATURE:
+            return None
+        return ResponseCache.fingerprint(data)
+        
+    def _analysis_cache_key(self, text, context):
+        """Cache key of the request analyze_text would send"""
+        if self.response_cache is None:
+            return None
+        _, data = self._build_request(self._build_analysis_prompt(text, context), json_output=True)
+        return self._cache_key(data)
+        
+    def _cached_analysis(self, text, context):
+        """The cached analyze_text result, or None"""
+        cache_key = self._analysis_cache_key(text, context)
+        if cache_key is None:
+            return None
+        cached = self.response_cache.get(cache_key)
+        if cached is None:
+            return None
+        self._count("cache_hits")
+        return self._parse_analysis_response(cached)
+        
+    def _cache_response(self, cache_key, content):
+        if cache_key is None:
+            return
+        # Never keep a malformed answer around
+        try:
+            json.loads(content)
+        except (TypeError, ValueError):
+            return
+        self.response_cache.put(cache_key, content)
+        
+    def _post(self, headers, data):
+        """Send one request once the rate limiter allows it"""
+        self.rate_limiter.acquire()
+        self._count("requests")
+        response = self.session.post(
+            f"{self.api_url}/chat/completions",
+            headers=headers,
+            json=data,
+            timeout=(self.connect_timeout, self.read_timeout)
+        )
+        
+        if response.status_code != 200:
+            raise self._api_error(response.status_code, response.text, response.headers.get("Retry-After"))
             
+        result = response.json()
+        return result["choices"][0]["message"]["content"]
+        
+    def _stream_api(self, headers, data, stream):
+        """Yield the text of a streamed completion, or the fallback response"""
+        try:
+            for attempt in Retrying(**self._retry_options()):
+                with attempt:
+                    response = self._open_stream(headers, data)
+        except APIError as e:
+            print(f"API Error: {e.status}")
+            print(e.body)
+            stream.failed = True
+            yield self._failed(json_output=False)
+            return
         except Exception as e:
             print(f"Error calling DeepSeek API: {str(e)}")
-            return self._get_fallback_response(json_output)
+            stream.failed = True
+            yield self._failed(json_output=False)
+            return
+            
+        received = False
+        with response:
+            try:
+                # A server that ignores "stream" answers all at once
+                if response.headers.get("Content-Type", "").startswith("application/json"):
+                    yield response.json()["choices"][0]["message"]["content"]
+                    return
+                    
+                for line in response.iter_lines(chunk_size=None):
+                    done, text = parse_sse_line(line.decode("utf-8"))
+                    if done:
+                        return
+                    if text:
+                        received = True
+                        yield text
+                raise ValueError("Stream ended before [DONE]")
+            except (requests.RequestException, ValueError, KeyError, IndexError) as e:
+                # Text already yielded can't be taken back, so the stream
+                # ends with the fallback generate_text would have returned
+                print(f"Error reading DeepSeek stream: {str(e)}")
+                stream.failed = True
+                fallback = self._failed(json_output=False)
+                yield "\n" + fallback if received else fallback
+                    
+    def _open_stream(self, headers, data):
+        """Start a streamed request once the rate limiter allows it"""
+        self.rate_limiter.acquire()
+        self._count("requests")
+        response = self.session.post(
+            f"{self.api_url}/chat/completions",
+            headers=headers,
+            json=data,
+            timeout=(self.connect_timeout, self.read_timeout),
+            stream=True
+        )
+        
+        if response.status_code != 200:
+            error = self._api_error(response.status_code, response.text, response.headers.get("Retry-After"))
+            response.close()
+            raise error
+            
+        return response
+        
+    def _api_error(self, status, body, retry_after):
+        """Count a failed response and turn it into an APIError"""
+        if status == 429:
+            self._count("rate_limited")
+        elif status >= 500:
+            self._count("server_errors")
+        return APIError(status, body, parse_retry_after(retry_after))
+        
+    def _retry_options(self):
+        """tenacity settings shared by the blocking and async clients"""
+        return {
+            "stop": stop_after_attempt(self.max_attempts),
+            "wait": wait_retry_after(),
+            "retry": retry_if_exception(self._is_transient),
+            "before_sleep": self._before_retry,
+            "reraise": True
+        }
+        
+    def _is_transient(self, error):
+        if isinstance(error, APIError):
+            return error.retryable
+        return isinstance(error, self.TRANSIENT_ERRORS)
+        
+    def _before_retry(self, retry_state):
+        self._count("retries")
+        # The server's Retry-After holds back every caller sharing the limiter
+        retry_after = getattr(retry_state.outcome.exception(), "retry_after", None)
+        if retry_after is not None:
+            self.rate_limiter.pause(retry_after)
+            
+    def _count(self, name):
+        with self._metrics_lock:
+            self._metrics[name] += 1
+            
+    def metrics(self):
+        """
+        Request counters of this client plus the throttling counters of its
+        (usually process-wide) rate limiter
+        """
+        with self._metrics_lock:
+            metrics = {
+                name: self._metrics[name]
+                for name in ("requests", "retries", "rate_limited", "server_errors", "failures", "cache_hits")
+            }
+        limiter = self.rate_limiter.stats()
+        metrics["throttled"] = limiter["throttled"]
+        metrics["throttled_seconds"] = limiter["throttled_seconds"]
+        return metrics
     
     def _parse_analysis_response(self, response_text):
         """Parse the API response into a structured format"""
         try:
             # Try to parse as JSON
-            result = json.loads(response_text)
-            
-            # Ensure all expected fields are present
-            default_result = {
-                "meaning": "",
-                "sentiment": "neutral",
-                "sentiment_score": 0.0,
-                "machine_reaction": "neutral",
-                "confidence": 0.0,
-                "entities": [],
-                "intent": "statement"
-            }
-            
-            # Update with actual values from response
-            for key in default_result:
-                if key in result:
-                    default_result[key] = result[key]
-                    
-            return default_result
+            return self._normalize_analysis(json.loads(response_text))
             
         except json.JSONDecodeError:
             print("Failed to parse API response as JSON")
@@ -129,6 +427,26 @@ class DeepSeekClient:
                 "intent": "unknown"
             }
     
+    def _normalize_analysis(self, result):
+        """Fill in the expected analysis fields from a parsed response"""
+        # Ensure all expected fields are present
+        default_result = {
+            "meaning": "",
+            "sentiment": "neutral",
+            "sentiment_score": 0.0,
+            "machine_reaction": "neutral",
+            "confidence": 0.0,
+            "entities": [],
+            "intent": "statement"
+        }
+        
+        # Update with actual values from response
+        for key in default_result:
+            if key in result:
+                default_result[key] = result[key]
+                
+        return default_result
+    
     def _get_fallback_response(self, json_output=False):
         """Return a fallback response when API call fails"""
         if json_output:
@@ -0,0 +1,239 @@
+import atexit
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+from config import (
+    EMOTION_CACHE_SIZE, EMOTION_CACHE_TTL, EMOTION_CACHE_PATH, EMOTION_CACHE_DISK_SIZE
+)
+
+# Whitespace runs inside a message; the analyzer only ever splits on them
+_INNER_WHITESPACE = re.compile(r"(?<=\S)\s+(?=\S)")
+
+# Pending disk writes are flushed in batches of this size
+_FLUSH_EVERY = 256
+
+# The disk tier is pruned back to disk_size entries whenever this share of
+# disk_size (and at least one flush) has been written since the last prune
+_PRUNE_SHARE = 0.1
+
+
+class EmotionCache:
+    """
+    Bounded, thread-safe cache of analysis results keyed on message content.
+
+    Entries are keyed on the namespace and the normalized message; the disk
+    tier addresses them by a hash of both. Normalization only collapses
+    whitespace runs between words: the rules and VADER both split messages
+    on whitespace, so texts sharing a key always get the same results. Case,
+    punctuation and leading/trailing whitespace are kept because they do
+    change the results.
+
+    Entries live in memory in least recently used order and expire after
+    ttl seconds. With a path, entries are also written (in batches) to a
+    SQLite file so a warm cache survives restarts; the disk tier keeps the
+    disk_size most recently written entries. It is pruned back to them each
+    time another tenth of disk_size has been written, so it stays within
+    that margin while the process runs, not only at exit.
+    """
+
+    def __init__(self,
+                 max_size: int = EMOTION_CACHE_SIZE,
+                 ttl: Optional[float] = EMOTION_CACHE_TTL,
+                 path: Optional[str] = EMOTION_CACHE_PATH,
+                 disk_size: int = EMOTION_CACHE_DISK_SIZE):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.disk_size = disk_size
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[object, float]]" = OrderedDict()
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.disk_hits = 0
+
+        self._db = None
+        self._pending: Dict[bytes, Tuple[str, float]] = {}
+        self._unpruned = 0
+        if path:
+            self._open_disk(os.path.expanduser(path))
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Collapse whitespace between words, which no analysis depends on"""
+        # Single spaces are the only printable whitespace, so most messages
+        # skip the regex
+        if "  " not in text and text.isprintable():
+            return text
+        return _INNER_WHITESPACE.sub(" ", text)
+
+    @staticmethod
+    def digest(key: Tuple[str, str]) -> bytes:
+        """Content address of a cache key, used by the disk tier"""
+        data = "\0".join(key).encode("utf-8", "surrogatepass")
+        return hashlib.blake2b(data, digest_size=16).digest()
+
+    def get(self, namespace: str, text: str):
+        """Return the cached value for text, or None"""
+        key = (namespace, self.normalize(text))
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, stored_at = entry
+                if not self._expired(stored_at, now):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+                self.expirations += 1
+
+            if self._db is not None:
+                value, stored_at = self._read_disk(key, now)
+                if value is not None:
+                    self._store(key, value, stored_at)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return value
+
+            self.misses += 1
+            return None
+
+    def put(self, namespace: str, text: str, value):
+        """Cache value (anything JSON serializable) for text"""
+        key = (namespace, self.normalize(text))
+        now = time.time()
+        with self._lock:
+            self._store(key, value, now)
+            if self._db is not None:
+                self._pending[self.digest(key)] = (json.dumps(value), now)
+                if len(self._pending) >= _FLUSH_EVERY:
+                    self.flush()
+
+    def stats(self) -> Dict:
+        """Counters describing how well the cache is doing"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "disk_hits": self.disk_hits
+            }
+
+    def clear(self):
+        """Drop every entry, in memory and on disk"""
+        with self._lock:
+            self._entries.clear()
+            self._pending.clear()
+            if self._db is not None:
+                self._execute("DELETE FROM cache")
+
+    def flush(self):
+        """Write pending entries to the disk tier"""
+        with self._lock:
+            if self._db is None or not self._pending:
+                return
+            rows = [(key, value, stored_at) for key, (value, stored_at) in self._pending.items()]
+            self._pending.clear()
+            self._execute(
+                "INSERT OR REPLACE INTO cache (key, value, stored_at) VALUES (?, ?, ?)",
+                rows, many=True
+            )
+            self._unpruned += len(rows)
+            if self._unpruned >= max(self.disk_size * _PRUNE_SHARE, _FLUSH_EVERY):
+                self._prune()
+
+    def close(self):
+        """Flush and prune the disk tier, then close it"""
+        with self._lock:
+            if self._db is None:
+                return
+            self.flush()
+            self._prune()
+            self._db.close()
+            self._db = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _expired(self, stored_at: float, now: float) -> bool:
+        return self.ttl is not None and now - stored_at > self.ttl
+
+    def _store(self, key: Tuple[str, str], value, stored_at: float):
+        self._entries[key] = (value, stored_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def _open_disk(self, path: str):
+        try:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._db = sqlite3.connect(path, timeout=5.0, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key BLOB PRIMARY KEY, value TEXT NOT NULL, stored_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS cache_stored_at ON cache (stored_at)")
+            self._db.commit()
+        except sqlite3.Error as e:
+            logging.warning(f"Emotion cache disk tier disabled: {str(e)}")
+            self._db = None
+            return
+        atexit.register(self.close)
+
+    def _read_disk(self, key: Tuple[str, str], now: float) -> Tuple[object, float]:
+        key = self.digest(key)
+        if key in self._pending:
+            value, stored_at = self._pending[key]
+        else:
+            try:
+                row = self._db.execute(
+                    "SELECT value, stored_at FROM cache WHERE key = ?", (key,)
+                ).fetchone()
+            except sqlite3.Error as e:
+                logging.warning(f"Emotion cache read failed: {str(e)}")
+                return None, 0.0
+            if row is None:
+                return None, 0.0
+            value, stored_at = row
+        if self._expired(stored_at, now):
+            self.expirations += 1
+            return None, 0.0
+        return json.loads(value), stored_at
+
+    def _prune(self):
+        """Drop expired entries and the oldest ones beyond disk_size"""
+        self._unpruned = 0
+        if self.ttl is not None:
+            self._execute("DELETE FROM cache WHERE stored_at < ?", (time.time() - self.ttl,))
+        self._execute(
+            "DELETE FROM cache WHERE key IN ("
+            "SELECT key FROM cache ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+            (self.disk_size,)
+        )
+
+    def _execute(self, sql: str, params=(), many: bool = False):
+        # The disk tier is best effort: a locked or broken file only costs hits
+        try:
+            if many:
+                self._db.executemany(sql, params)
+            else:
+                self._db.execute(sql, params)
+            self._db.commit()
+        except sqlite3.Error as e:
+            logging.warning(f"Emotion cache write failed: {str(e)}")
@@ -0,0 +1,184 @@
+import csv
+import io
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+from app import EmotionAnalyzer
+from models.lexicon import load_vader_snapshot
+
+# Per-process analyzer, created once by the pool initializer
+_analyzer = None
+
+
+def _init_worker():
+    global _analyzer
+    _analyzer = EmotionAnalyzer()
+
+
+def _label_jsonl(lines: List[str], text_field: str) -> Tuple[str, int, int]:
+    """Label raw JSONL lines; returns the output text, labeled and skipped counts"""
+    records = []
+    skipped = 0
+    for line in lines:
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            skipped += 1
+            continue
+        if not isinstance(record, dict):
+            record = {text_field: record}
+        records.append(record)
+
+    texts = [record.get(text_field) for record in records]
+    emotions = _analyzer.determine_emotions(
+        text if isinstance(text, str) else "" for text in texts
+    )
+
+    output = []
+    for record, emotion in zip(records, emotions):
+        record["emotion"] = emotion
+        output.append(json.dumps(record, ensure_ascii=False) + "\n")
+    return "".join(output), len(records), skipped
+
+
+def _label_csv(rows: List[List[str]], text_column: int, emotion_column: int) -> Tuple[str, int, int]:
+    """Label parsed CSV rows; returns the output text, labeled and skipped counts"""
+    emotions = _analyzer.determine_emotions(
+        row[text_column] if text_column < len(row) else "" for row in rows
+    )
+
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row, emotion in zip(rows, emotions):
+        # Short rows are padded so the label lands under the emotion header
+        if emotion_column >= len(row):
+            row.extend([""] * (emotion_column + 1 - len(row)))
+        row[emotion_column] = emotion
+        writer.writerow(row)
+    return buffer.getvalue(), len(rows), 0
+
+
+def detect_format(path: str) -> str:
+    """Guess the file format from its extension"""
+    return "csv" if path.lower().endswith(".csv") else "jsonl"
+
+
+def _chunks(items: Iterator, chunk_size: int) -> Iterator[List]:
+    while True:
+        chunk = list(islice(items, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def analyze_file(input_path: str,
+                 output_path: str = "-",
+                 file_format: Optional[str] = None,
+                 text_field: str = "text",
+                 workers: Optional[int] = None,
+                 chunk_size: int = 1000,
+                 ordered: bool = True) -> Dict:
+    """
+    Label every message of a JSONL or CSV file with its emotion.
+
+    The input is streamed in chunks that are sharded across a pool of
+    worker processes, each holding one EmotionAnalyzer. Workers parse,
+    label and serialize their chunk, so the parent only moves text. At
+    most two chunks per worker are in flight, so memory stays bounded
+    however large the file is. Output keeps the input order unless
+    ordered is False, in which case chunks are written as soon as they
+    finish.
+    """
+    file_format = file_format or detect_format(input_path)
+    workers = workers if workers is not None else os.cpu_count() or 1
+
+    # Build the lexicon snapshot once, before the workers map it
+    load_vader_snapshot()
+
+    stats = {"messages": 0, "skipped": 0, "seconds": 0.0, "messages_per_second": 0.0}
+    start = time.perf_counter()
+
+    input_stream = open(input_path, newline="", encoding="utf-8")
+    output_stream = (
+        sys.stdout if output_path == "-"
+        else open(output_path, "w", newline="", encoding="utf-8")
+    )
+
+    def write_chunk(result):
+        text, labeled, skipped = result
+        output_stream.write(text)
+        stats["messages"] += labeled
+        stats["skipped"] += skipped
+
+    try:
+        if file_format == "csv":
+            reader = csv.reader(input_stream)
+            header = next(reader, None)
+            if header is None:
+                return stats
+            if text_field not in header:
+                raise ValueError(f"CSV has no '{text_field}' column")
+            text_column = header.index(text_field)
+            if "emotion" not in header:
+                header.append("emotion")
+            emotion_column = header.index("emotion")
+            csv.writer(output_stream).writerow(header)
+
+            label = _label_csv
+            extra_args = (text_column, emotion_column)
+            chunks = _chunks(reader, chunk_size)
+        else:
+            label = _label_jsonl
+            extra_args = (text_field,)
+            chunks = _chunks(input_stream, chunk_size)
+
+        if workers <= 1:
+            _init_worker()
+            for chunk in chunks:
+                write_chunk(label(chunk, *extra_args))
+        else:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+                pending = deque()
+                for chunk in chunks:
+                    pending.append(pool.submit(label, chunk, *extra_args))
+                    if len(pending) >= workers * 2:
+                        _drain(pending, write_chunk, ordered, keep=len(pending) - 1)
+                _drain(pending, write_chunk, ordered, keep=0)
+    finally:
+        input_stream.close()
+        if output_stream is not sys.stdout:
+            output_stream.close()
+        else:
+            output_stream.flush()
+
+    stats["seconds"] = time.perf_counter() - start
+    if stats["seconds"] > 0:
+        stats["messages_per_second"] = stats["messages"] / stats["seconds"]
+    if stats["skipped"]:
+        logging.warning(f"Skipped {stats['skipped']} malformed lines")
+    logging.info(
+        f"Labeled {stats['messages']} messages in {stats['seconds']:.1f}s "
+        f"({stats['messages_per_second']:.0f} messages/s)"
+    )
+    return stats
+
+
+def _drain(pending: deque, write_chunk, ordered: bool, keep: int):
+    """Write finished chunks until at most keep remain in flight"""
+    while len(pending) > keep:
+        if ordered:
+            write_chunk(pending.popleft().result())
+            continue
+
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            pending.remove(future)
+            write_chunk(future.result())
@@ -0,0 +1,255 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import numpy as np
+
+# Emotion label columns, dictionary-encoded, and VADER score columns,
+# stored as float32
+LABELS = ("user_emotion", "machine_emotion")
+SCORES = ("neg", "neu", "pos", "compound")
+
+# Partitions are directories named after the (local) day of their turns
+_PARTITION = "day={}"
+
+Day = Union[str, date, datetime, float]
+
+
+def _day(value: Optional[Day]) -> Optional[date]:
+    if value is None or isinstance(value, date) and not isinstance(value, datetime):
+        return value
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if not isinstance(value, datetime):
+        value = datetime.fromtimestamp(value)
+    return value.date()
+
+
+def _epoch(value: Day) -> float:
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if isinstance(value, date) and not isinstance(value, datetime):
+        value = datetime.combine(value, datetime.min.time())
+    return value.timestamp() if isinstance(value, datetime) else float(value)
+
+
+def _encode(values: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """Dictionary-encode labels: (sorted distinct labels, their codes)"""
+    labels, codes = np.unique(np.asarray(values, dtype=str), return_inverse=True)
+    return labels, codes.astype(np.min_scalar_type(max(len(labels) - 1, 0)))
+
+
+def export_history(turns: Iterable[Dict], root: str) -> Dict[str, int]:
+    """
+    Write turns (as EmotionalMemoryStore.turns() yields them, or the
+    entries of emotional_memory.json) to the columnar history under root,
+    one partition per day. Turns in timestamp order are written a day at
+    a time, so only one day is held in memory. From the first turn that
+    goes back to an earlier day on, the turns are gathered per day and
+    written at the end, along with any day written before that gets more
+    turns. The partition of a day that an earlier export wrote is
+    replaced, so export whole days. Returns the number of turns written
+    per day.
+    """
+    written: Dict[date, int] = {}
+    days: Dict[date, Dict[str, List]] = {}
+    in_order = True
+    day, day_start, day_end, rows = None, None, None, None
+    for turn in turns:
+        timestamp = _epoch(turn.get("timestamp") or datetime.now())
+        if rows is None or not day_start <= timestamp < day_end:
+            previous, day = day, datetime.fromtimestamp(timestamp).date()
+            day_start, day_end = _epoch(day), _epoch(day + timedelta(days=1))
+            if in_order and previous is not None:
+                if day > previous:
+                    written[previous] = _write_partition(root, previous, days.pop(previous))
+                else:
+                    in_order = False
+            rows = days.get(day)
+            if rows is None:
+                # A day written earlier in this export is rewritten with its new turns
+                rows = days[day] = _read_partition(root, day) if written.pop(day, None) else _new_rows()
+
+        scores = (turn.get("sentiment_data") or {}).get("scores") or {}
+        rows["session"].append(str(turn.get("session", "default")))
+        rows["timestamp"].append(timestamp)
+        for column in LABELS:
+            rows[column].append(turn.get(column) or "neutral")
+        for column in SCORES:
+            rows[column].append(scores.get(column, 0.0))
+    for day in sorted(days):
+        written[day] = _write_partition(root, day, days[day])
+    return {day.isoformat(): written[day] for day in sorted(written)}
+
+
+def _new_rows() -> Dict[str, List]:
+    return {"session": [], "timestamp": [], **{column: [] for column in LABELS + SCORES}}
+
+
+def _read_partition(root: str, day: date) -> Dict[str, List]:
+    """The rows of a written partition, as export_history gathers them"""
+    path = os.path.join(root, _PARTITION.format(day.isoformat()))
+    with open(os.path.join(path, "dictionaries.json"), encoding="utf-8") as f:
+        dictionaries = json.load(f)
+    rows = {}
+    for column in ("session", "timestamp") + LABELS + SCORES:
+        values = np.load(os.path.join(path, f"{column}.npy"))
+        if column in dictionaries:
+            values = np.asarray(dictionaries[column], dtype=object)[values] if len(values) else values
+        rows[column] = values.tolist()
+    return rows
+
+
+def _write_partition(root: str, day: date, rows: Dict[str, List]) -> int:
+    """
+    Write the partition of a day, replacing any there was. The new
+    partition is written aside and renamed into place, so a reader never
+    sees it half written, but a reader between the two renames of a
+    replacement finds no partition for the day.
+    """
+    path = os.path.join(root, _PARTITION.format(day.isoformat()))
+    timestamps = np.asarray(rows["timestamp"], dtype=np.float64)
+    order = np.argsort(timestamps, kind="stable")
+    columns = {"timestamp": timestamps[order]}
+    for column in SCORES:
+        columns[column] = np.asarray(rows[column], dtype=np.float32)[order]
+    dictionaries = {}
+    for column in ("session",) + LABELS:
+        labels, codes = _encode(rows[column])
+        columns[column] = codes[order]
+        dictionaries[column] = labels.tolist()
+
+    os.makedirs(root, exist_ok=True)
+    staging = tempfile.mkdtemp(dir=root, prefix=".staging-")
+    try:
+        for column, values in columns.items():
+            np.save(os.path.join(staging, f"{column}.npy"), values)
+        with open(os.path.join(staging, "dictionaries.json"), "w", encoding="utf-8") as f:
+            json.dump(dictionaries, f, ensure_ascii=False)
+        if os.path.isdir(path):
+            retired = staging + "-old"
+            os.rename(path, retired)
+            os.rename(staging, path)
+            shutil.rmtree(retired)
+        else:
+            os.rename(staging, path)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+    return len(timestamps)
+
+
+class EmotionHistory:
+    """
+    Vectorized reports over the columnar history written by export_history.
+
+    Each day is a directory of one .npy file per column, opened memory
+    mapped, so a report reads only the days and columns it needs. Labels
+    are stored as small integer codes with a per-day dictionary; a query
+    maps every day's codes onto one dictionary for all of its days, and
+    then counts and groups codes rather than strings.
+    """
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def days(self) -> List[date]:
+        """Days with exported turns, in order"""
+        prefix = _PARTITION.format("")
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            date.fromisoformat(name[len(prefix):])
+            for name in os.listdir(self.root) if name.startswith(prefix)
+        )
+
+    def columns(self, names: Sequence[str],
+                start: Optional[Day] = None,
+                end: Optional[Day] = None) -> Tuple[Dict[str, np.ndarray], Dict[str, np.ndarray]]:
+        """
+        The named columns of the turns from start (inclusive) to end
+        (exclusive), oldest first. Returns the columns and, for label
+        columns and session, the labels their codes index.
+        """
+        first, last = _day(start), _day(end)
+        low = _epoch(start) if start is not None else -np.inf
+        high = _epoch(end) if end is not None else np.inf
+        parts = {name: [] for name in names}
+        dictionaries = {name: {} for name in names if name in LABELS or name == "session"}
+        for day in self.days():
+            if first is not None and day < first or last is not None and day > last:
+                continue
+            path = os.path.join(self.root, _PARTITION.format(day.isoformat()))
+            timestamps = np.load(os.path.join(path, "timestamp.npy"), mmap_mode="r")
+            keep = slice(*np.searchsorted(timestamps, [low, high]))
+            if keep.start == keep.stop:
+                continue
+            with open(os.path.join(path, "dictionaries.json"), encoding="utf-8") as f:
+                stored = json.load(f)
+            for name in names:
+                values = np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")[keep]
+                if name in dictionaries:
+                    merged = dictionaries[name]
+                    mapping = np.array([merged.setdefault(label, len(merged)) for label in stored[name]],
+                                       dtype=np.int64)
+                    values = mapping[values] if len(mapping) else values.astype(np.int64)
+                parts[name].append(values)
+
+        columns = {
+            name: np.concatenate(values) if values else
+            np.zeros(0, dtype=np.int64 if name in dictionaries else np.float64 if name == "timestamp" else np.float32)
+            for name, values in parts.items()
+        }
+        return columns, {name: np.array(list(merged), dtype=str) for name, merged in dictionaries.items()}
+
+    def emotion_histogram(self, start: Optional[Day] = None, end: Optional[Day] = None,
+                          column: str = "user_emotion") -> Dict[str, int]:
+        """Number of turns per emotion, most frequent first"""
+        columns, labels = self.columns([column], start, end)
+        counts = np.bincount(columns[column], minlength=len(labels[column]))
+        order = np.argsort(-counts, kind="stable")
+        return {str(labels[column][i]): int(counts[i]) for i in order if counts[i]}
+
+    def transition_matrix(self, start: Optional[Day] = None, end: Optional[Day] = None,
+                          column: str = "user_emotion",
+                          normalize: bool = False) -> Tuple[List[str], np.ndarray]:
+        """
+        Emotions and how often one followed another in a session: entry
+        [i, j] counts turns with emotion j right after a turn with emotion
+        i of the same session. With normalize, rows are probabilities.
+        """
+        columns, labels = self.columns(["session", "timestamp", column], start, end)
+        size = len(labels[column])
+        # Each session's turns in time order; the export keeps days sorted
+        order = np.lexsort((columns["timestamp"], columns["session"]))
+        sessions, emotions = columns["session"][order], columns[column][order]
+        same = sessions[1:] == sessions[:-1]
+        pairs = emotions[:-1][same] * size + emotions[1:][same]
+        matrix = np.bincount(pairs, minlength=size * size).reshape(size, size).astype(np.float64)
+        if normalize:
+            totals = matrix.sum(axis=1, keepdims=True)
+            matrix = np.divide(matrix, totals, out=np.zeros_like(matrix), where=totals > 0)
+        return labels[column].tolist(), matrix
+
+    def rolling_compound_mean(self, window: int,
+                              start: Optional[Day] = None, end: Optional[Day] = None,
+                              session: Optional[str] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Timestamps of the turns, and the mean compound score of the window
+        turns up to each (fewer at the start), of one session or all
+        """
+        names = ["timestamp", "compound"] + (["session"] if session is not None else [])
+        columns, labels = self.columns(names, start, end)
+        timestamps, compound = columns["timestamp"], columns["compound"]
+        if session is not None:
+            matches = np.flatnonzero(labels["session"] == session)
+            mine = np.isin(columns["session"], matches)
+            timestamps, compound = timestamps[mine], compound[mine]
+
+        # Sums in float64, so a long history does not lose precision
+        sums = np.concatenate(([0.0], np.cumsum(compound, dtype=np.float64)))
+        ends = np.arange(1, len(compound) + 1)
+        starts = np.maximum(ends - window, 0)
+        return timestamps, (sums[ends] - sums[starts]) / (ends - starts)
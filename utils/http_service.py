@@ -0,0 +1,303 @@
+import asyncio
+import collections
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+from aiohttp import web
+from config import (
+    HTTP_HOST, HTTP_PORT, HTTP_WORKERS, HTTP_BATCH_SIZE, HTTP_MAX_PENDING, HTTP_MAX_BATCH_TEXTS,
+    HTTP_SEMANTIC_WORKERS, HTTP_MAX_SEMANTIC_PENDING, HTTP_BACKLOG, HTTP_SHUTDOWN_TIMEOUT
+)
+from models.context_store import ContextStore
+from responses.emotion_mapper import EmotionMapper
+
+
+class ServiceBusy(Exception):
+    """More texts are waiting for analysis than the service accepts"""
+
+
+class AnalysisService:
+    """
+    asyncio HTTP/JSON service in front of the analyzers.
+
+      POST /analyze        {"text", "session_id"?, "semantic"?}
+      POST /analyze_batch  {"texts", "semantic"?}
+      POST /respond        {"text", "session_id"?, "semantic"?}
+      GET  /health
+
+    The event loop only parses requests and writes answers. Analyses run
+    on an executor of workers threads: the texts of requests that arrive
+    together go to one EmotionAnalyzer.analyze_batch call of up to
+    batch_size texts, with at most workers calls running at once. Once
+    max_pending texts are waiting, further requests are answered 503 with
+    Retry-After instead of queueing without bound. With "semantic": true,
+    the texts also go through the semantic analyzer, if there is one (a
+    SemanticAnalyzer, or a SemanticClient of a shared model server). Those
+    slow calls run on semantic_workers threads of their own, so they
+    cannot hold up the batches, and are bounded the same way: past
+    max_semantic_pending texts, semantic requests are answered 503.
+
+    With a session_id, /analyze and /respond record the turn in the
+    session's ContextTracker, kept in a ContextStore, and answer with the
+    session's context, including its emotion smoothed over its turns by
+    EmotionMapper.map_smoothed (whose states expire like the contexts). /health answers 503 once shutdown has begun, so a
+    load balancer stops sending requests while those in flight finish.
+    """
+
+    def __init__(self, analyzer=None, semantic_analyzer=None,
+                 contexts: Optional[ContextStore] = None,
+                 emotion_mapper: Optional[EmotionMapper] = None,
+                 workers: int = HTTP_WORKERS,
+                 batch_size: int = HTTP_BATCH_SIZE,
+                 max_pending: int = HTTP_MAX_PENDING,
+                 max_batch_texts: int = HTTP_MAX_BATCH_TEXTS,
+                 semantic_workers: int = HTTP_SEMANTIC_WORKERS,
+                 max_semantic_pending: int = HTTP_MAX_SEMANTIC_PENDING):
+        if analyzer is None:
+            from app import EmotionAnalyzer
+            analyzer = EmotionAnalyzer()
+        self.analyzer = analyzer
+        self.semantic_analyzer = semantic_analyzer
+        self.contexts = contexts if contexts is not None else ContextStore()
+        self.emotion_mapper = emotion_mapper if emotion_mapper is not None else EmotionMapper()
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.max_batch_texts = max_batch_texts
+        self.semantic_workers = semantic_workers
+        self.max_semantic_pending = max_semantic_pending
+        self.shutting_down = False
+
+        self._executor = None
+        self._semantic_executor = None
+        self._semantic_pending = 0
+        self._waiting = collections.deque()
+        self._pending = 0
+        self._wakeup = None
+        self._slots = None
+        self._dispatcher = None
+        self._started = time.monotonic()
+
+        self.requests = 0
+        self.rejected = 0
+        self.batches = 0
+        self.texts = 0
+
+    def make_app(self) -> web.Application:
+        """The aiohttp application; starts and stops the service with it"""
+        app = web.Application(client_max_size=4 * 2 ** 20)
+        app.router.add_post("/analyze", self._handle_analyze)
+        app.router.add_post("/analyze_batch", self._handle_analyze_batch)
+        app.router.add_post("/respond", self._handle_respond)
+        app.router.add_get("/health", self._handle_health)
+        app.on_startup.append(self._start)
+        app.on_shutdown.append(self._drain)
+        app.on_cleanup.append(self._stop)
+        return app
+
+    def stats(self) -> Dict:
+        """Requests served, how many analyses they took and what is waiting"""
+        return {
+            "requests": self.requests,
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "mean_batch_size": self.texts / self.batches if self.batches else 0.0,
+            "pending_texts": self._pending,
+            "pending_semantic_texts": self._semantic_pending,
+            "sessions": len(self.contexts)
+        }
+
+    async def analyze(self, texts: List[str], semantic: bool = False) -> List[Dict]:
+        """Analyses of texts, one dict per text"""
+        loop = asyncio.get_running_loop()
+        semantic = semantic and self.semantic_analyzer is not None
+        if (self._pending + len(texts) > self.max_pending
+                or semantic and self._semantic_pending + len(texts) > self.max_semantic_pending):
+            self.rejected += 1
+            raise ServiceBusy()
+        future = loop.create_future()
+        self._waiting.append((texts, future))
+        self._pending += len(texts)
+        self._wakeup.set()
+
+        if semantic:
+            self._semantic_pending += len(texts)
+            try:
+                details, analyses = await asyncio.gather(
+                    loop.run_in_executor(self._semantic_executor, self.semantic_analyzer.analyze_batch, texts),
+                    future
+                )
+            finally:
+                self._semantic_pending -= len(texts)
+        else:
+            details, analyses = None, await future
+
+        results = [
+            {"text": text, "emotion": emotion, "scores": scores}
+            for text, (emotion, scores) in zip(texts, analyses)
+        ]
+        for result, detail in zip(results, details or []):
+            result["semantic"] = detail
+        return results
+
+    async def _start(self, app):
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="http-analysis")
+        self._semantic_executor = ThreadPoolExecutor(
+            max_workers=self.semantic_workers, thread_name_prefix="http-semantic"
+        )
+        self._wakeup = asyncio.Event()
+        self._slots = asyncio.Semaphore(self.workers)
+        self._dispatcher = asyncio.get_running_loop().create_task(self._dispatch())
+        # Load the lexicon (and models) before the first request has to
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._executor, self.analyzer.analyze_batch, ["Warming up the analyzer."])
+        if self.semantic_analyzer is not None and hasattr(self.semantic_analyzer, "load"):
+            await loop.run_in_executor(self._semantic_executor, self.semantic_analyzer.load)
+
+    async def _drain(self, app):
+        self.shutting_down = True
+        logging.info("Shutting down; finishing the requests in flight")
+
+    async def _stop(self, app):
+        self._dispatcher.cancel()
+        for _, future in self._waiting:
+            if not future.done():
+                future.set_exception(ConnectionError("Service shut down"))
+        self._waiting.clear()
+        self._executor.shutdown(wait=True)
+        self._semantic_executor.shutdown(wait=True)
+
+    async def _dispatch(self):
+        """Hand what is waiting to the executor, batch_size texts at a time"""
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            while self._waiting:
+                await self._slots.acquire()
+                batch, count = [], 0
+                while self._waiting and (not batch or count + len(self._waiting[0][0]) <= self.batch_size):
+                    texts, future = self._waiting.popleft()
+                    batch.append((texts, future))
+                    count += len(texts)
+                asyncio.get_running_loop().create_task(self._run_batch(batch, count))
+
+    async def _run_batch(self, batch, count):
+        texts = [text for request_texts, _ in batch for text in request_texts]
+        self.batches += 1
+        self.texts += count
+        try:
+            results = await asyncio.get_running_loop().run_in_executor(
+                self._executor, self.analyzer.analyze_batch, texts
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._pending -= count
+            self._slots.release()
+
+        start = 0
+        for request_texts, future in batch:
+            # A client that went away has cancelled its future
+            if not future.done():
+                future.set_result(results[start:start + len(request_texts)])
+            start += len(request_texts)
+
+    async def _handle_analyze(self, request):
+        return await self._answer(request, respond=False)
+
+    async def _handle_respond(self, request):
+        return await self._answer(request, respond=True)
+
+    async def _answer(self, request, respond: bool):
+        body = await self._body(request)
+        text = body.get("text")
+        if not isinstance(text, str):
+            raise _bad_request('"text" must be a string')
+        result = (await self._analyses(request, [text], body))[0]
+
+        if respond:
+            result["response"] = self.analyzer.response_generator.generate_response(result["emotion"], text)
+        session_id = body.get("session_id")
+        if session_id is not None:
+            compound = result["scores"]["compound"]
+            sentiment = "positive" if compound > 0.1 else "negative" if compound < -0.1 else "neutral"
+            tracker = self.contexts.update(
+                str(session_id), text, {"sentiment": sentiment, "sentiment_score": compound}, result["emotion"]
+            )
+            result["context"] = {
+                "current_emotion": tracker.current_emotion,
+                "smoothed_emotion": self.emotion_mapper.map_smoothed(
+                    str(session_id), {"sentiment": sentiment, "intensity": abs(compound)}
+                ),
+                "sentiment_trend": tracker.sentiment_trend,
+                "turns": tracker.turns
+            }
+        return web.json_response(result)
+
+    async def _handle_analyze_batch(self, request):
+        body = await self._body(request)
+        texts = body.get("texts")
+        if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+            raise _bad_request('"texts" must be a list of strings')
+        if len(texts) > self.max_batch_texts:
+            raise _bad_request(f"At most {self.max_batch_texts} texts per request")
+        results = await self._analyses(request, texts, body) if texts else []
+        return web.json_response({"results": results})
+
+    async def _handle_health(self, request):
+        status = "shutting_down" if self.shutting_down else "ok"
+        return web.json_response(
+            {"status": status, "uptime": time.monotonic() - self._started, **self.stats()},
+            status=503 if self.shutting_down else 200
+        )
+
+    async def _body(self, request) -> Dict:
+        self.requests += 1
+        try:
+            body = await request.json()
+        except ValueError:
+            raise _bad_request("Body must be JSON")
+        if not isinstance(body, dict):
+            raise _bad_request("Body must be a JSON object")
+        return body
+
+    async def _analyses(self, request, texts: List[str], body: Dict) -> List[Dict]:
+        try:
+            return await self.analyze(texts, semantic=bool(body.get("semantic")))
+        except ServiceBusy:
+            raise web.HTTPServiceUnavailable(
+                text=json.dumps({"error": "Too many texts waiting for analysis"}),
+                content_type="application/json",
+                headers={"Retry-After": "1"}
+            )
+        except Exception as e:
+            logging.error(f"Analysis failed: {str(e)}")
+            raise web.HTTPInternalServerError(
+                text=json.dumps({"error": "Analysis failed"}), content_type="application/json"
+            )
+
+
+def _bad_request(message: str) -> web.HTTPBadRequest:
+    return web.HTTPBadRequest(text=json.dumps({"error": message}), content_type="application/json")
+
+
+def serve(service: Optional[AnalysisService] = None,
+          host: str = HTTP_HOST, port: int = HTTP_PORT,
+          backlog: int = HTTP_BACKLOG,
+          shutdown_timeout: float = HTTP_SHUTDOWN_TIMEOUT):
+    """Run the service until SIGINT or SIGTERM, then shut down gracefully"""
+    service = service or AnalysisService()
+    web.run_app(
+        service.make_app(),
+        host=host,
+        port=port,
+        backlog=backlog,
+        shutdown_timeout=shutdown_timeout,
+        access_log=None,
+        print=lambda message: logging.info(message.strip())
+    )
@@ -0,0 +1,234 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, Optional, Tuple, Union
+from config import EMOTIONAL_MEMORY_PATH
+
+# Turns read per query while streaming; the lock is released in between
+_READ_BATCH = 1000
+
+Timestamp = Union[str, float, datetime]
+
+
+def _epoch(timestamp: Optional[Timestamp]) -> float:
+    """Seconds since the epoch of an ISO timestamp, datetime or number;
+    naive times are local, as datetime.now() writes them"""
+    if timestamp is None:
+        return datetime.now().timestamp()
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    if isinstance(timestamp, datetime):
+        return timestamp.timestamp()
+    return float(timestamp)
+
+
+def _turn_epoch(turn: Dict) -> Optional[float]:
+    """_epoch of a turn's timestamp; None if it has none"""
+    timestamp = turn.get("timestamp")
+    return None if timestamp is None else _epoch(timestamp)
+
+
+class EmotionalMemoryStore:
+    """
+    Conversation turns of every session, in a SQLite file in WAL mode.
+
+    A turn has the shape of the entries of emotional_memory.json's memory
+    list (timestamp, user_input, user_emotion, machine_emotion,
+    sentiment_data), kept as JSON. Appending inserts one row, so its cost
+    does not grow with the memory, unlike rewriting a JSON document per
+    turn. The session, timestamp and user emotion of each turn are
+    indexed, and turns() streams the turns matching any of them in time
+    order a batch of rows at a time, never reading the whole store.
+
+    Other state, such as the emotional_state of emotional_memory.json, is
+    kept as named JSON values next to the turns.
+    """
+
+    def __init__(self, path: str = EMOTIONAL_MEMORY_PATH):
+        self.path = os.path.expanduser(path)
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS turns ("
+            "id INTEGER PRIMARY KEY, session TEXT NOT NULL, timestamp REAL NOT NULL, "
+            "user_emotion TEXT, machine_emotion TEXT, record TEXT NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS turns_session ON turns (session, timestamp)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS turns_timestamp ON turns (timestamp)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS turns_emotion ON turns (user_emotion, timestamp)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS state (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._db.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def append(self, session: str, turn: Dict) -> int:
+        """Store one turn of a session; returns its id"""
+        with self._lock:
+            cursor = self._db.execute(
+                "INSERT INTO turns (session, timestamp, user_emotion, machine_emotion, record) "
+                "VALUES (?, ?, ?, ?, ?)",
+                self._row(session, turn)
+            )
+            self._db.commit()
+            return cursor.lastrowid
+
+    def append_many(self, turns: Iterable[Tuple[str, Dict]], state: Optional[Dict] = None) -> int:
+        """
+        Store (session, turn) pairs in one transaction; returns how many.
+        The named values of state are stored in the same transaction.
+        """
+        with self._lock:
+            count = self._db.executemany(
+                "INSERT INTO turns (session, timestamp, user_emotion, machine_emotion, record) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (self._row(session, turn) for session, turn in turns)
+            ).rowcount
+            if state:
+                self._db.executemany(
+                    "INSERT OR REPLACE INTO state (name, value) VALUES (?, ?)",
+                    [(name, json.dumps(value, ensure_ascii=False)) for name, value in state.items()]
+                )
+            self._db.commit()
+            return count
+
+    def turns(self, session: Optional[str] = None,
+              start: Optional[Timestamp] = None,
+              end: Optional[Timestamp] = None,
+              emotion: Optional[str] = None,
+              batch_size: int = _READ_BATCH) -> Iterator[Dict]:
+        """
+        Turns from start (inclusive) to end (exclusive), oldest first,
+        optionally of one session or user emotion. Each has its session
+        added under "session".
+        """
+        conditions, parameters = self._conditions(session, start, end, emotion)
+        after = (float("-inf"), 0)
+        while True:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT session, timestamp, id, record FROM turns "
+                    f"WHERE {' AND '.join(conditions + ['(timestamp, id) > (?, ?)'])} "
+                    "ORDER BY timestamp, id LIMIT ?",
+                    parameters + [*after, batch_size]
+                ).fetchall()
+            for row_session, _, _, record in rows:
+                turn = json.loads(record)
+                turn["session"] = row_session
+                yield turn
+            if len(rows) < batch_size:
+                return
+            after = rows[-1][1:3]
+
+    def count(self, session: Optional[str] = None,
+              start: Optional[Timestamp] = None,
+              end: Optional[Timestamp] = None,
+              emotion: Optional[str] = None) -> int:
+        """Number of turns turns() would yield"""
+        conditions, parameters = self._conditions(session, start, end, emotion)
+        with self._lock:
+            return self._db.execute(
+                f"SELECT COUNT(*) FROM turns WHERE {' AND '.join(conditions or ['1'])}", parameters
+            ).fetchone()[0]
+
+    def get_state(self, name: str, default=None):
+        """A named JSON value, or default"""
+        with self._lock:
+            row = self._db.execute("SELECT value FROM state WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row is not None else default
+
+    def set_state(self, name: str, value):
+        """Store a named JSON value"""
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO state (name, value) VALUES (?, ?)",
+                (name, json.dumps(value, ensure_ascii=False))
+            )
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    @staticmethod
+    def _row(session: str, turn: Dict) -> Tuple:
+        return (
+            session,
+            _epoch(turn.get("timestamp")),
+            turn.get("user_emotion"),
+            turn.get("machine_emotion"),
+            json.dumps(turn, ensure_ascii=False, separators=(",", ":"))
+        )
+
+    @staticmethod
+    def _conditions(session, start, end, emotion) -> Tuple[list, list]:
+        conditions, parameters = [], []
+        if session is not None:
+            conditions.append("session = ?")
+            parameters.append(session)
+        if emotion is not None:
+            conditions.append("user_emotion = ?")
+            parameters.append(emotion)
+        if start is not None:
+            conditions.append("timestamp >= ?")
+            parameters.append(_epoch(start))
+        if end is not None:
+            conditions.append("timestamp < ?")
+            parameters.append(_epoch(end))
+        return conditions, parameters
+
+
+def migrate_json_memory(json_path: str, store: EmotionalMemoryStore, session: str = "default") -> int:
+    """
+    Copy the turns of an emotional_memory.json file into store, as turns of
+    session, and its emotional_state into the store's state of that name.
+    Returns the number of turns copied.
+
+    The store remembers how far into the file it got, and the timestamp
+    of the last turn copied, so migrating the file again copies only the
+    turns appended to it since. If the file no longer starts with the
+    turns copied before (it was trimmed), the turns from the first one
+    timestamped after the last one copied are; if that turn had no
+    timestamp there is nothing to find it by, and none are.
+    """
+    marker = f"migrated:{os.path.abspath(json_path)}"
+    progress = store.get_state(marker) or {}
+    done, last = progress.get("turns", 0), progress.get("last_timestamp")
+
+    with open(json_path, encoding="utf-8") as f:
+        data = json.load(f)
+    memory = data.get("memory", [])
+    if done and (done > len(memory) or last is not None and _turn_epoch(memory[done - 1]) != last):
+        if last is None:
+            logging.warning(f"{json_path} changed since it was migrated and the last turn copied has "
+                            f"no timestamp; copying none of its turns")
+            new = []
+        else:
+            logging.info(f"{json_path} changed since it was migrated; copying the turns after {last}")
+            # Turns without a timestamp of their own go with the turns before them
+            epochs = (_turn_epoch(turn) for turn in memory)
+            first = next((i for i, epoch in enumerate(epochs) if epoch is not None and epoch > last), len(memory))
+            new = memory[first:]
+    else:
+        new = memory[done:]
+
+    state = {marker: {
+        "session": session,
+        "turns": len(memory),
+        "last_timestamp": _turn_epoch(memory[-1]) if memory else last
+    }}
+    if "emotional_state" in data:
+        state["emotional_state"] = data["emotional_state"]
+    # The turns and how far the migration got are stored together, so an
+    # interrupted migration copies no turn twice
+    return store.append_many(((session, turn) for turn in new), state=state)
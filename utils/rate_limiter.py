@@ -0,0 +1,149 @@
+import asyncio
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from config import MAX_REQUESTS_PER_MINUTE, RATE_LIMIT_BURST, REQUEST_DELAY, RETRY_MAX_DELAY
+
+
+class TokenBucket:
+    """
+    Token bucket limiting how often API requests may start.
+
+    Tokens refill at rate_per_minute and up to burst of them can be saved
+    up. Each request takes one; when none is left the caller is told how
+    long to wait for its turn. Reservations are made under a lock and the
+    waiting happens outside of it, so one bucket can be shared by threads
+    (acquire) and asyncio tasks (acquire_async) alike, and callers are
+    served in the order they arrived.
+
+    pause() stops everybody until a given time, which is how a server's
+    Retry-After is applied to all callers and not only the one that got it.
+    Requests resume one interval apart afterwards, without a burst.
+    """
+
+    def __init__(self, rate_per_minute: float = MAX_REQUESTS_PER_MINUTE, burst: int = RATE_LIMIT_BURST):
+        self.interval = 60.0 / rate_per_minute
+        self.burst = burst
+        # The bucket is kept as the time the next request is due (the
+        # generic cell rate algorithm); burst lets requests start early
+        self._tolerance = (burst - 1) * self.interval
+        self._due = 0.0
+        self._lock = threading.Lock()
+
+        self.acquired = 0
+        self.throttled = 0
+        self.throttled_seconds = 0.0
+        self.pauses = 0
+
+    def reserve(self) -> float:
+        """Take a token; returns how many seconds to wait before using it"""
+        with self._lock:
+            now = time.monotonic()
+            due = max(self._due, now)
+            wait = max(due - self._tolerance - now, 0.0)
+            self._due = due + self.interval
+
+            self.acquired += 1
+            if wait > 0:
+                self.throttled += 1
+                self.throttled_seconds += wait
+            return wait
+
+    def acquire(self):
+        """Block the calling thread until a request may start"""
+        wait = self.reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        """Wait, without blocking the event loop, until a request may start"""
+        wait = self.reserve()
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Hold every caller back for the next seconds"""
+        with self._lock:
+            due = time.monotonic() + seconds + self._tolerance
+            if due > self._due:
+                self._due = due
+                self.pauses += 1
+
+    def stats(self) -> Dict:
+        """Throttling counters"""
+        with self._lock:
+            return {
+                "acquired": self.acquired,
+                "throttled": self.throttled,
+                "throttled_seconds": self.throttled_seconds,
+                "pauses": self.pauses
+            }
+
+
+# One bucket per process: the API quota belongs to the key, not to a client
+_shared_bucket = None
+_shared_lock = threading.Lock()
+
+
+def shared_rate_limiter() -> TokenBucket:
+    """The process-wide bucket every DeepSeek client uses by default"""
+    global _shared_bucket
+    with _shared_lock:
+        if _shared_bucket is None:
+            _shared_bucket = TokenBucket()
+        return _shared_bucket
+
+
+# Responses worth another attempt: rate limited or a struggling server
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class APIError(Exception):
+    """A non-200 API response"""
+
+    def __init__(self, status: int, body: str = "", retry_after: Optional[float] = None):
+        super().__init__(f"API Error: {status}")
+        self.status = status
+        self.body = body
+        self.retry_after = retry_after
+
+    @property
+    def retryable(self) -> bool:
+        return self.status in RETRY_STATUSES
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Seconds to wait from a Retry-After header (delta seconds or HTTP date)"""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError, OverflowError):
+        return None
+
+
+class wait_retry_after:
+    """
+    tenacity wait strategy: exponential backoff with full jitter, unless
+    the server said how long to wait in Retry-After, in which case that
+    (plus a little jitter, so callers don't all return at once) is used.
+    """
+
+    def __init__(self, base: float = REQUEST_DELAY, max_delay: float = RETRY_MAX_DELAY):
+        self.base = base
+        self.max_delay = max_delay
+
+    def __call__(self, retry_state) -> float:
+        error = retry_state.outcome.exception()
+        retry_after = getattr(error, "retry_after", None)
+        if retry_after is not None:
+            return min(retry_after, self.max_delay) + random.uniform(0, self.base)
+
+        ceiling = min(self.max_delay, self.base * 2 ** (retry_state.attempt_number - 1))
+        return random.uniform(0, ceiling)
@@ -0,0 +1,168 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+from config import DEEPSEEK_CACHE_PATH, DEEPSEEK_CACHE_TTL, DEEPSEEK_CACHE_MAX_ENTRIES
+
+# Expired and least recently used entries are evicted every this many writes
+_EVICT_EVERY = 100
+
+
+class ResponseCache:
+    """
+    Persistent cache of API responses in a SQLite file.
+
+    Entries are keyed on a fingerprint of the whole request body (model,
+    temperature, token limit, output format and the full prompt), expire
+    after ttl seconds and are evicted least recently used first once there
+    are more than max_entries. Reads and writes go straight to the file, so
+    several processes can share one cache and it survives restarts.
+
+    Callers decide what is worth caching; DeepSeekClient only caches
+    deterministic calls.
+    """
+
+    def __init__(self,
+                 path: str = DEEPSEEK_CACHE_PATH,
+                 ttl: Optional[float] = DEEPSEEK_CACHE_TTL,
+                 max_entries: int = DEEPSEEK_CACHE_MAX_ENTRIES):
+        self.path = os.path.expanduser(path)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._db = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key BLOB PRIMARY KEY, response TEXT NOT NULL, "
+            "created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS responses_accessed ON responses (accessed)")
+        self._db.commit()
+
+    @staticmethod
+    def fingerprint(request: Dict) -> bytes:
+        """Hash of everything in a request body that shapes the response"""
+        canonical = json.dumps(request, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return hashlib.sha256(canonical.encode("utf-8")).digest()
+
+    def get(self, key: bytes) -> Optional[str]:
+        """Return the cached response, or None"""
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._db.execute(
+                    "SELECT response, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+                    self.expirations += 1
+                    row = None
+                if row is None:
+                    self.misses += 1
+                    return None
+
+                self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (now, key))
+                self._db.commit()
+            except sqlite3.Error as e:
+                logging.warning(f"Response cache read failed: {str(e)}")
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: bytes, response: str):
+        """Store a response"""
+        now = time.time()
+        with self._lock:
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, created, accessed) "
+                    "VALUES (?, ?, ?, ?)",
+                    (key, response, now, now)
+                )
+                self._db.commit()
+                self._writes += 1
+                if self._writes % _EVICT_EVERY == 0:
+                    self._evict(now)
+            except sqlite3.Error as e:
+                logging.warning(f"Response cache write failed: {str(e)}")
+
+    def evict(self):
+        """Drop expired entries and the least recently used beyond max_entries"""
+        with self._lock:
+            try:
+                self._evict(time.time())
+            except sqlite3.Error as e:
+                logging.warning(f"Response cache eviction failed: {str(e)}")
+
+    def stats(self) -> Dict:
+        """Cache counters, plus the number of stored entries"""
+        with self._lock:
+            entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            lookups = self.hits + self.misses
+            return {
+                "entries": entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "expirations": self.expirations,
+                "evictions": self.evictions
+            }
+
+    def clear(self):
+        """Drop every entry"""
+        with self._lock:
+            self._db.execute("DELETE FROM responses")
+            self._db.commit()
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    def _evict(self, now: float):
+        if self.ttl is not None:
+            self.expirations += self._db.execute(
+                "DELETE FROM responses WHERE created < ?", (now - self.ttl,)
+            ).rowcount
+        self.evictions += self._db.execute(
+            "DELETE FROM responses WHERE key IN ("
+            "SELECT key FROM responses ORDER BY accessed DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        ).rowcount
+        self._db.commit()
+
+
+# One cache per process, opened on first use
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def shared_response_cache() -> Optional[ResponseCache]:
+    """The process-wide response cache, or None when DEEPSEEK_CACHE_PATH is empty"""
+    global _shared_cache
+    if not DEEPSEEK_CACHE_PATH:
+        return None
+    with _shared_lock:
+        if _shared_cache is None:
+            try:
+                _shared_cache = ResponseCache()
+            except (OSError, sqlite3.Error) as e:
+                logging.warning(f"Response cache disabled: {str(e)}")
+                return None
+        return _shared_cache
@@ -0,0 +1,315 @@
+import errno
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+from concurrent.futures import Future
+from typing import Dict, List, Optional
+from config import (SEMANTIC_BATCH_SIZE, SEMANTIC_SERVER_SOCKET, SEMANTIC_SERVER_TIMEOUT, SEMANTIC_SERVER_MAX_TEXTS,
+                    SEMANTIC_SERVER_BACKLOG, SEMANTIC_SERVER_CONNECT_TIMEOUT)
+
+# Messages are JSON, each preceded by its length as a 4-byte big-endian int
+_LENGTH = struct.Struct(">I")
+
+# Tells the model thread to stop
+_CLOSE = object()
+
+
+def _send(sock: socket.socket, message: Dict):
+    payload = json.dumps(message).encode("utf-8")
+    sock.sendall(_LENGTH.pack(len(payload)) + payload)
+
+
+def _receive(stream) -> Optional[Dict]:
+    """The next message read from a file-like stream; None once it is closed"""
+    header = stream.read(_LENGTH.size)
+    if len(header) < _LENGTH.size:
+        return None
+    (length,) = _LENGTH.unpack(header)
+    payload = stream.read(length)
+    if len(payload) < length:
+        return None
+    return json.loads(payload.decode("utf-8"))
+
+
+class _UnixServer(socketserver.ThreadingUnixStreamServer):
+    # socketserver's backlog of 5 turns away workers that connect at once
+    request_queue_size = SEMANTIC_SERVER_BACKLOG
+    daemon_threads = True
+
+
+class SemanticServer:
+    """
+    One SemanticAnalyzer serving every worker process on the host.
+
+    Workers talk to it through SemanticClient over a Unix socket, so the
+    models are loaded, and their memory paid, once per host instead of
+    once per worker. Each connection is handled by a thread of its own;
+    a single model thread runs the analyses, taking every request waiting
+    at the time (up to max_texts texts) as one analyze_batch call, so
+    requests from different workers share forward passes.
+    """
+
+    def __init__(self, analyzer=None,
+                 path: str = SEMANTIC_SERVER_SOCKET,
+                 max_texts: int = SEMANTIC_SERVER_MAX_TEXTS):
+        if analyzer is None:
+            # Imported here so that clients never import torch
+            from models.semantic_analyzer import SemanticAnalyzer
+            analyzer = SemanticAnalyzer()
+        self.analyzer = analyzer
+        self.path = path
+        self.max_texts = max_texts
+        self._queue = queue.Queue()
+        self._server = None
+        self._model_thread = None
+        self._connections = set()
+        self._lock = threading.Lock()
+
+        self.requests = 0
+        self.batches = 0
+        self.texts = 0
+
+    def serve_forever(self):
+        """Load the models, then answer requests until close()"""
+        self.analyzer.load()
+        self._claim_socket()
+
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                with server._lock:
+                    server._connections.add(self.connection)
+                try:
+                    while True:
+                        request = _receive(self.rfile)
+                        if request is None:
+                            return
+                        _send(self.connection, server._answer(request))
+                except OSError:
+                    return
+                finally:
+                    with server._lock:
+                        server._connections.discard(self.connection)
+
+        self._server = _UnixServer(self.path, Handler)
+        self._model_thread = threading.Thread(target=self._run_models, name="semantic-models", daemon=True)
+        self._model_thread.start()
+        self._server.serve_forever()
+
+    def close(self):
+        """Stop serving and remove the socket"""
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._server = None
+
+        # Clients still connected see the connection close and reconnect
+        # to whichever server comes up next
+        with self._lock:
+            connections = list(self._connections)
+        for connection in connections:
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+        self._queue.put(_CLOSE)
+        self._model_thread.join()
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not _CLOSE:
+                item[2].set_exception(ConnectionError("Semantic server closed"))
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def stats(self) -> Dict:
+        """Requests served and how many model calls they took"""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "batches": self.batches,
+                "mean_batch_size": self.texts / self.batches if self.batches else 0.0
+            }
+
+    def _claim_socket(self):
+        """Remove a socket file left behind by a server that is gone"""
+        if not os.path.exists(self.path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.path)
+        except OSError:
+            os.unlink(self.path)
+        else:
+            raise RuntimeError(f"A semantic server is already listening on {self.path}")
+        finally:
+            probe.close()
+
+    def _answer(self, request: Dict) -> Dict:
+        future = Future()
+        with self._lock:
+            self.requests += 1
+        self._queue.put((list(request.get("texts", [])), request.get("batch_size", SEMANTIC_BATCH_SIZE), future))
+        try:
+            return {"results": future.result()}
+        except Exception as e:
+            return {"error": f"{type(e).__name__}: {e}"}
+
+    def _run_models(self):
+        while True:
+            item = self._queue.get()
+            if item is _CLOSE:
+                return
+
+            # Everything waiting now goes into the same model calls
+            pending, count = [item], len(item[0])
+            while count < self.max_texts:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _CLOSE:
+                    self._queue.put(_CLOSE)
+                    break
+                pending.append(item)
+                count += len(item[0])
+
+            groups = {}
+            for texts, batch_size, future in pending:
+                groups.setdefault(batch_size, []).append((texts, future))
+            for batch_size, requests in groups.items():
+                self._analyze(requests, batch_size)
+
+    def _analyze(self, requests: List, batch_size: int):
+        texts = [text for request_texts, _ in requests for text in request_texts]
+        with self._lock:
+            self.batches += 1
+            self.texts += len(texts)
+        try:
+            results = self.analyzer.analyze_batch(texts, batch_size=batch_size)
+        except Exception as e:
+            for _, future in requests:
+                future.set_exception(e)
+            return
+
+        start = 0
+        for request_texts, future in requests:
+            future.set_result(results[start:start + len(request_texts)])
+            start += len(request_texts)
+
+
+class SemanticClient:
+    """
+    SemanticAnalyzer stand-in that has a SemanticServer do the work.
+
+    analyze and analyze_batch take the same arguments and return the same
+    results as SemanticAnalyzer's, so a client can be passed wherever an
+    analyzer is expected, e.g. as AnalysisRouter's semantic_analyzer. It
+    imports no model code and costs a worker a socket. The connection is
+    opened on first use, again after a fork, and once more when the
+    server was restarted. Server-side failures raise RuntimeError; a
+    server that can't be reached, or doesn't answer within timeout,
+    raises ConnectionError.
+    """
+
+    def __init__(self, path: str = SEMANTIC_SERVER_SOCKET, timeout: Optional[float] = SEMANTIC_SERVER_TIMEOUT,
+                 connect_timeout: float = SEMANTIC_SERVER_CONNECT_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self._sock = None
+        self._stream = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def analyze(self, text: str) -> Dict:
+        """
+        Perform deep semantic analysis of the text
+        """
+        return self.analyze_batch([text])[0]
+
+    def analyze_batch(self, texts: List[str], batch_size: int = SEMANTIC_BATCH_SIZE) -> List[Dict]:
+        """
+        Perform deep semantic analysis of many texts at once
+        """
+        texts = list(texts)
+        if not texts:
+            return []
+        response = self._request({"texts": texts, "batch_size": batch_size})
+        if "error" in response:
+            raise RuntimeError(f"Semantic server failed: {response['error']}")
+        return response["results"]
+
+    def close(self):
+        """Close the connection"""
+        with self._lock:
+            self._disconnect()
+
+    def _request(self, request: Dict) -> Dict:
+        with self._lock:
+            for attempt in range(2):
+                fresh = self._connect()
+                try:
+                    _send(self._sock, request)
+                    response = _receive(self._stream)
+                except socket.timeout as e:
+                    # The server may still be working on it; asking again
+                    # would run the same analysis twice
+                    self._disconnect()
+                    raise ConnectionError(
+                        f"No answer from the semantic server on {self.path} within {self.timeout}s"
+                    ) from e
+                except OSError:
+                    response = None
+                if response is not None:
+                    return response
+                self._disconnect()
+                # Only a connection that had been idle may have gone stale
+                if fresh:
+                    break
+            raise ConnectionError(f"No answer from the semantic server on {self.path}")
+
+    def _connect(self) -> bool:
+        """Open the connection if needed; True if it was opened now"""
+        if self._sock is not None and self._pid == os.getpid():
+            return False
+        # A connection inherited through fork belongs to the parent
+        self._sock, self._stream = None, None
+        deadline = time.monotonic() + self.connect_timeout
+        delay = 0.01
+        while True:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            try:
+                sock.connect(self.path)
+                break
+            except OSError as e:
+                sock.close()
+                # A full backlog (EAGAIN) or a server mid-restart is worth
+                # waiting for; anything else, or waiting too long, is not
+                busy = e.errno in (errno.EAGAIN, errno.ECONNREFUSED)
+                if not busy or time.monotonic() + delay > deadline:
+                    raise ConnectionError(f"Cannot connect to the semantic server on {self.path}: {e}") from e
+            time.sleep(delay)
+            delay = min(delay * 2, 0.5)
+        self._sock, self._stream, self._pid = sock, sock.makefile("rb"), os.getpid()
+        return True
+
+    def _disconnect(self):
+        if self._sock is not None and self._pid == os.getpid():
+            self._stream.close()
+            self._sock.close()
+        self._sock, self._stream = None, None
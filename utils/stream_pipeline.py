@@ -0,0 +1,191 @@
+import queue
+import threading
+import time
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+from app import EmotionAnalyzer
+from config import STREAM_CHUNK_SIZE, STREAM_QUEUE_SIZE
+
+# How often blocked stages check whether the consumer went away
+_POLL_INTERVAL = 0.1
+
+# End of input marker passed down the stages
+_DONE = object()
+# Returned by _get when its timeout ran out
+_TIMEOUT = object()
+
+
+class Result(NamedTuple):
+    """One analyzed message"""
+    text: str
+    emotion: str
+    scores: Dict[str, float]
+    response: Optional[str]
+
+
+class _Failure:
+    """Carries an exception from a stage to the consumer"""
+
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+class _Stopped(Exception):
+    """Raised inside a stage once the consumer has stopped reading"""
+
+
+def analyze_stream(messages: Iterable[str],
+                   analyzer: Optional[EmotionAnalyzer] = None,
+                   chunk_size: int = STREAM_CHUNK_SIZE,
+                   queue_size: int = STREAM_QUEUE_SIZE,
+                   max_delay: float = 0.05,
+                   respond: bool = True) -> Iterator[Result]:
+    """
+    Analyze an unbounded stream of messages, yielding a Result per message.
+
+    Messages are consumed lazily by a read stage, grouped into micro-batches
+    of up to chunk_size by a score stage (a batch is closed early once
+    max_delay seconds have passed since its first message, so a slow source
+    does not hold results back) and answered by a respond stage. The stages
+    run in their own threads, connected by bounded queues: when the consumer
+    falls behind, every stage blocks instead of buffering, so memory stays
+    flat however long the stream is. Results keep the input order.
+
+    Exceptions raised by the source or a stage are re-raised to the consumer
+    after the results before them. Closing the generator stops the stages.
+    """
+    analyzer = analyzer or EmotionAnalyzer()
+    generator = analyzer.response_generator if respond else None
+
+    stop = threading.Event()
+    texts = queue.Queue(maxsize=chunk_size * queue_size)
+    scored = queue.Queue(maxsize=queue_size)
+    results = queue.Queue(maxsize=queue_size)
+
+    stages = [
+        (_read_stage, (messages,), texts),
+        (_score_stage, (analyzer, texts, chunk_size, max_delay), scored),
+        (_respond_stage, (generator, scored), results),
+    ]
+    for stage, args, sink in stages:
+        threading.Thread(
+            target=_run_stage,
+            args=(stage, args, sink, stop),
+            name=f"stream-{stage.__name__.strip('_')}",
+            daemon=True
+        ).start()
+
+    try:
+        while True:
+            batch = results.get()
+            if batch is _DONE:
+                return
+            if isinstance(batch, _Failure):
+                raise batch.error
+            yield from batch
+    finally:
+        stop.set()
+
+
+def _run_stage(stage, args: Tuple, sink: queue.Queue, stop: threading.Event):
+    """Run one stage, forwarding any error to the next one"""
+    try:
+        stage(*args, sink, stop)
+    except _Stopped:
+        pass
+    except Exception as e:
+        try:
+            _put(sink, _Failure(e), stop)
+        except _Stopped:
+            pass
+
+
+def _read_stage(messages: Iterable[str], sink: queue.Queue, stop: threading.Event):
+    for message in messages:
+        if not isinstance(message, str):
+            raise TypeError(f"Messages must be str, not {type(message).__name__}")
+        _put(sink, message, stop)
+    _put(sink, _DONE, stop)
+
+
+def _score_stage(analyzer: EmotionAnalyzer, source: queue.Queue, chunk_size: int,
+                 max_delay: float, sink: queue.Queue, stop: threading.Event):
+    end = None
+    while end is None:
+        batch, end = _next_batch(source, chunk_size, max_delay, stop)
+        if batch:
+            _put(sink, list(zip(batch, analyzer.analyze_batch(batch))), stop)
+    _put(sink, end, stop)
+
+
+def _respond_stage(generator, source: queue.Queue, sink: queue.Queue, stop: threading.Event):
+    while True:
+        batch = _get(source, stop)
+        if not isinstance(batch, list):
+            _put(sink, batch, stop)
+            return
+        _put(sink, [
+            Result(
+                text,
+                emotion,
+                scores,
+                generator.generate_response(emotion, text) if generator else None
+            )
+            for text, (emotion, scores) in batch
+        ], stop)
+
+
+def _next_batch(source: queue.Queue, chunk_size: int, max_delay: float,
+                stop: threading.Event) -> Tuple[List[str], object]:
+    """
+    Collect up to chunk_size messages, waiting at most max_delay after the
+    first one. Returns the batch and the end marker if the input ended.
+    """
+    batch = []
+    item = _get(source, stop)
+    deadline = time.monotonic() + max_delay
+    while isinstance(item, str):
+        batch.append(item)
+        if len(batch) >= chunk_size:
+            return batch, None
+        try:
+            item = source.get_nowait()
+        except queue.Empty:
+            item = _get(source, stop, deadline - time.monotonic())
+    return batch, None if item is _TIMEOUT else item
+
+
+def _put(channel: queue.Queue, item, stop: threading.Event):
+    """Block until there is room for item, unless the pipeline stops"""
+    try:
+        channel.put_nowait(item)
+        return
+    except queue.Full:
+        pass
+    while True:
+        if stop.is_set():
+            raise _Stopped
+        try:
+            channel.put(item, timeout=_POLL_INTERVAL)
+            return
+        except queue.Full:
+            pass
+
+
+def _get(channel: queue.Queue, stop: threading.Event, timeout: Optional[float] = None):
+    """Next item of channel, or _TIMEOUT once timeout seconds have passed"""
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        if stop.is_set():
+            raise _Stopped
+        wait = _POLL_INTERVAL
+        if deadline is not None:
+            wait = min(wait, deadline - time.monotonic())
+            if wait <= 0:
+                try:
+                    return channel.get_nowait()
+                except queue.Empty:
+                    return _TIMEOUT
+        try:
+            return channel.get(timeout=wait)
+        except queue.Empty:
+            pass
@@ -0,0 +1,113 @@
+import json
+import time
+from typing import Optional, Tuple
+
+
+def parse_sse_line(line: str) -> Tuple[bool, str]:
+    """(done, text) of one line of a chat completions event stream; raises
+    ValueError for a data line that is not a JSON event"""
+    if not line.startswith("data:"):
+        # Blank separators, comments and keep-alives carry no text
+        return False, ""
+    payload = line[5:].strip()
+    if payload == "[DONE]":
+        return True, ""
+    event = json.loads(payload)
+    if not isinstance(event, dict):
+        raise ValueError(f"Malformed stream event: {payload[:100]!r}")
+    choices = event.get("choices") or [{}]
+    return False, (choices[0].get("delta") or {}).get("content") or ""
+
+
+class _StreamState:
+    """Timing and whitespace handling shared by both kinds of stream"""
+
+    def __init__(self, open_chunks):
+        self._open = open_chunks
+        self._chunks = None
+        self._started = None
+        self._pending = ""
+        self.text = ""
+        self.failed = False
+        self.time_to_first_token: Optional[float] = None
+        self.latency: Optional[float] = None
+
+    def _start(self):
+        self._started = time.perf_counter()
+        self._chunks = self._open(self)
+
+    def _emit(self, delta: str) -> str:
+        """What of delta can be yielded: leading whitespace of the response
+        is dropped and trailing whitespace held back until more text follows,
+        so the chunks join to the stripped response"""
+        if not self.text:
+            delta = delta.lstrip()
+        text = self._pending + delta
+        chunk = text.rstrip()
+        self._pending = text[len(chunk):]
+        if chunk:
+            if self.time_to_first_token is None:
+                self.time_to_first_token = time.perf_counter() - self._started
+            self.text += chunk
+        return chunk
+
+    def _finish(self):
+        if self.latency is None and self._started is not None:
+            self.latency = time.perf_counter() - self._started
+
+
+class TextStream(_StreamState):
+    """
+    Iterator over a completion as it is generated.
+
+    The request is sent when iteration starts and chunks are yielded as
+    they arrive; joined, they equal what generate_text returns. Once the
+    stream is exhausted, time_to_first_token and latency hold seconds since
+    the request was sent and text the whole response. failed is set when
+    the API call failed: the request was refused, the stream broke off
+    before its end or carried a malformed event. The stream then ends with
+    the fallback response generate_text would have returned, after
+    whatever text arrived before the failure.
+    """
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> str:
+        if self._chunks is None:
+            self._start()
+        for delta in self._chunks:
+            chunk = self._emit(delta)
+            if chunk:
+                return chunk
+        self._finish()
+        raise StopIteration
+
+    def close(self):
+        """Stop early and release the connection"""
+        if self._chunks is not None:
+            self._chunks.close()
+        self._finish()
+
+
+class AsyncTextStream(_StreamState):
+    """TextStream for async for"""
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> str:
+        if self._chunks is None:
+            self._start()
+        async for delta in self._chunks:
+            chunk = self._emit(delta)
+            if chunk:
+                return chunk
+        self._finish()
+        raise StopAsyncIteration
+
+    async def aclose(self):
+        """Stop early and release the connection"""
+        if self._chunks is not None:
+            await self._chunks.aclose()
+        self._finish()